@@ -1,14 +1,11 @@
 import sys
 import os
-import json
 import asyncio
 import datetime
+from contextlib import asynccontextmanager
 import uvicorn
-import requests
-import httpx
 from fastapi import FastAPI, BackgroundTasks, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from dateutil import parser as date_parser
 from typing import List
 from pydantic import BaseModel
 
@@ -24,15 +21,47 @@ else:
     print("DEBUG: No .env file found. Utilizing Render/System Environment Variables.")
 
 
-from services.rss_service import fetch_latest_headlines
+from services.rss_service import RSS_SOURCES, stream_latest_headlines, poll_feed
 from services.news_api_service import fetch_news_api_headlines
 from services.news_data_service import fetch_news_data_headlines
-from services.hacker_news_service import fetch_hacker_news_headlines
-from services.social_media_service import fetch_social_media_headlines
-from services.ai_service import identify_high_impact_events, perform_deep_analysis, start_new_cycle
-from services.scraper_service import fetch_article_content
+from services.hacker_news_service import fetch_hacker_news_headlines, HN_POLL_COST
+from services.social_media_service import fetch_social_media_headlines, SUBREDDITS
+from services.ai_service import stream_high_impact_events, perform_deep_analysis, start_new_cycle, remember_alerts, load_vector_index
+from services.scraper_service import fetch_article_content, shutdown_executor
+from services.feed_scheduler import FeedScheduler
+from services.pipeline import merge_streams, from_fetcher, from_list, normalize_headline
+from services.http_client import get_client, close_clients
+from services.llm_cache import llm_cache
+from services.article_cache import article_cache
+from services.story_clusters import story_clusters
+from services.seen_links import SeenLinkStore
+from services.checkpoint import Checkpoint
+from services.database import db
+from services.prefilter import prefilter
+from services.entity_matcher import get_mention_extractor
+from functools import partial
 
-app = FastAPI(title="ALPHA IMPACT API")
+# Keep strong references to background tasks to prevent garbage collection
+background_tasks_set = set()
+
+@asynccontextmanager
+async def lifespan(app):
+    task1 = asyncio.create_task(background_scheduler())
+    background_tasks_set.add(task1)
+    task2 = asyncio.create_task(self_ping())
+    background_tasks_set.add(task2)
+    task3 = asyncio.create_task(analysis_worker())
+    background_tasks_set.add(task3)
+    # The dense retrieval index may need a rebuild; don't hold up the event loop for it
+    task4 = asyncio.create_task(asyncio.to_thread(load_vector_index))
+    background_tasks_set.add(task4)
+    yield
+    for task in background_tasks_set:
+        task.cancel()
+    await close_clients()
+    shutdown_executor()
+
+app = FastAPI(title="ALPHA IMPACT API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -55,65 +84,13 @@ from fastapi.responses import Response
 async def favicon():
     return Response(status_code=204)
 
-# File-based persistence
+# Persistence: alerts, processed links, devices and run cursors live in SQLite (services/database.py)
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
-ALERTS_FILE = os.path.join(DATA_DIR, "cached_alerts.json")
-PROCESSED_FILE = os.path.join(DATA_DIR, "processed_links.json")
-DEVICES_FILE = os.path.join(DATA_DIR, "devices.json")
-LAST_RUN_FILE = os.path.join(DATA_DIR, "last_run_time.json")
 
 # Ensure DATA_DIR exists
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def load_alerts():
-    if os.path.exists(ALERTS_FILE):
-        try:
-            with open(ALERTS_FILE, "r") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"ERROR loading alerts: {e}")
-    return []
-
-def save_alerts(alerts):
-    try:
-        with open(ALERTS_FILE, "w") as f:
-            json.dump(alerts, f, indent=2)
-    except Exception as e:
-        print(f"ERROR saving alerts: {e}")
-
-def load_processed():
-    if os.path.exists(PROCESSED_FILE):
-        try:
-            with open(PROCESSED_FILE, "r") as f:
-                return set(json.load(f))
-        except Exception as e:
-            print(f"ERROR loading processed links: {e}")
-    return set()
-
-def save_processed(links):
-    try:
-        with open(PROCESSED_FILE, "w") as f:
-            json.dump(list(links), f)
-    except Exception as e:
-        print(f"ERROR saving processed links: {e}")
-
-def load_devices():
-    if os.path.exists(DEVICES_FILE):
-        try:
-            with open(DEVICES_FILE, "r") as f:
-                return set(json.load(f))
-        except Exception as e:
-            print(f"ERROR loading devices: {e}")
-    return set()
-
-def save_devices(devices):
-    try:
-        with open(DEVICES_FILE, "w") as f:
-            json.dump(list(devices), f)
-    except Exception as e:
-        print(f"ERROR saving devices: {e}")
-
-def send_onesignal_notification(alerts, devices):
+async def send_onesignal_notification(alerts, devices):
     if not alerts:
         return
     app_id = "7087a2bc-e285-49a9-a404-15be244a893f"
@@ -143,215 +120,300 @@ def send_onesignal_notification(alerts, devices):
     }
     
     try:
-        req = requests.post("https://onesignal.com/api/v1/notifications", headers=headers, json=payload, timeout=10)
+        req = await get_client().post("https://onesignal.com/api/v1/notifications", headers=headers, json=payload, timeout=10)
         print(f"DEBUG: OneSignal push sent. Response: {req.status_code} {req.text}")
     except Exception as e:
         print(f"ERROR: Failed to send OneSignal push: {e}")
 
 def load_last_run_time():
-    if os.path.exists(LAST_RUN_FILE):
-        try:
-            with open(LAST_RUN_FILE, "r") as f:
-                data = json.load(f)
-                return data.get("last_run_time")
-        except:
-            pass
+    last_run = db.get_cursor("last_run_time")
+    if last_run:
+        return last_run
     # Default to 2 hours ago if no record exists
     return (datetime.datetime.now() - datetime.timedelta(hours=2)).isoformat()
 
-def save_last_run_time(iso_time):
-    try:
-        with open(LAST_RUN_FILE, "w") as f:
-            json.dump({"last_run_time": iso_time}, f)
-    except Exception as e:
-        print(f"ERROR saving last run time: {e}")
-
-def parse_published_date(date_str):
-    """Normalize various date formats from news providers."""
-    if not date_str:
-        return None
-    try:
-        # 1. ISO format (NewsAPI: 2026-02-21T12:34:56Z)
-        if "T" in date_str:
-            clean_date = date_str.replace("Z", "+00:00")
-            dt = datetime.datetime.fromisoformat(clean_date)
-            return dt.replace(tzinfo=None) # Convert to naive for comparison
-        # 2. Space format (NewsData: 2026-02-21 12:34:56)
-        if " " in date_str and ":" in date_str and not "," in date_str:
-            return datetime.datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-        # 3. RFC 2822 (RSS: Sat, 21 Feb 2026 12:34:56 +0000)
-        # We use a simple slice for now or trust fromisoformat/strptime if we can
-        # But for robustness with RSS dates, let's try a common strip or use the built-in email.utils
-        import email.utils
-        tup = email.utils.parsedate_to_datetime(date_str)
-        return tup.replace(tzinfo=None) # Convert to naive for comparison
-    except:
-        return None
-
 # Global State
-cached_alerts = [a for a in load_alerts() if a.get("probability", 0) >= 50]
-processed_links = load_processed()
-registered_devices = load_devices()
+cached_alerts = [a for a in db.load_alerts() if a.get("probability", 0) >= 50]
+remember_alerts(cached_alerts)
+processed_links = SeenLinkStore()
+mention_extractor = get_mention_extractor()
+registered_devices = db.load_devices()
 last_search_end = load_last_run_time()
 analysis_lock = asyncio.Lock()
-
-async def run_analysis(source="AUTOMATED"):
+# (headlines, checkpoint) batches discovered by the feed scheduler, waiting for analysis
+headline_queue = asyncio.Queue()
+
+def stream_all_sources():
+    """Merges every source into one stream; RSS yields feed by feed, API sources in one batch each."""
+    return merge_streams(
+        stream_latest_headlines(),
+        from_fetcher(fetch_news_api_headlines),
+        from_fetcher(fetch_news_data_headlines),
+        from_fetcher(fetch_hacker_news_headlines),
+        from_fetcher(fetch_social_media_headlines),
+    )
+
+def attach_source(cluster, link):
+    """
+    Records another outlet's link on the alert already raised for this story, if any.
+    Returns True if an alert changed; the caller saves the alerts once per cycle.
+    """
+    for alert in cached_alerts:
+        if alert.get('cluster') == cluster:
+            sources = alert.setdefault('sources', [alert.get('link')])
+            if link not in sources:
+                sources.append(link)
+                return True
+            return False
+    return False
+
+def settle_cluster(h, ok):
+    """Pass 1 is done with h: its story counts as analyzed only if the LLM actually answered."""
+    if h.get('cluster') is not None:
+        story_clusters.settle(h['cluster'], ok)
+
+async def fresh_headline_stream(source, headlines, today):
+    """
+    Normalization, dedup and freshness filtering as a streaming stage.
+    Each headline that survives is marked processed and yielded immediately.
+    """
+    seen_links = set()
+    live_headlines = []
+    stats = {"seen": 0, "stale": 0, "dupes": 0, "clustered": 0, "fresh": 0}
+    sources_added = False
+    story_clusters.begin_cycle()
+    # Start of the 72-hour window (local midnight two days ago), as epoch seconds
+    freshness_cutoff = datetime.datetime.combine(today - datetime.timedelta(days=2), datetime.time()).timestamp()
+
+    async for h in headlines:
+        stats["seen"] += 1
+        h = normalize_headline(h)
+        if not h['title'] or not h['link']:
+            continue
+
+        # Remove duplicates by link
+        if h['link'] in seen_links:
+            stats["dupes"] += 1
+            continue
+        seen_links.add(h['link'])
+
+        # 72-hour window (gapless filtering happens per source, against its cursor)
+        if h['published_ts'] and h['published_ts'] < freshness_cutoff:
+            stats["stale"] += 1
+            continue
+        live_headlines.append(h)
+
+        if h['link'] in processed_links:
+            continue
+
+        # IMMEDIATELY mark as processed to prevent race conditions during long AI runs
+        processed_links.add(h['link'])
+        # Cheap local tagging: listed companies named in the headline
+        h['mentions'] = [{"company": name, "symbol": symbol} for name, symbol in mention_extractor.mentions(h['title'])]
+
+        # Near-duplicate of a story already sent to the LLM (this cycle or an earlier one)?
+        h['cluster'], is_new = story_clusters.assign(h['title'], h['link'], [m['company'] for m in h['mentions']])
+        if not is_new:
+            stats["clustered"] += 1
+            sources_added = attach_source(h['cluster'], h['link']) or sources_added
+            continue
+        stats["fresh"] += 1
+        yield h
+
+    print(f"Stream Filter: {stats['fresh']} fresh / {stats['seen']} seen ({stats['stale']} outside window, {stats['dupes']} duplicate links, {stats['clustered']} near-duplicate stories)")
+    processed_links.flush()
+    story_clusters.save()
+    if sources_added:
+        db.save_alerts(cached_alerts)
+
+    # Backup for empty cache
+    if not stats["fresh"] and source == "USER REQUESTED" and not cached_alerts:
+        print("DEBUG: Empty cache. Forcing re-analysis of top 5 items.")
+        for h in live_headlines[:5]:
+            yield h
+
+# Pass 2 stage limits: article downloads start as soon as a Pass 1 candidate
+# qualifies; deep-dive LLM calls get their own, smaller limit.
+ARTICLE_PREFETCH_CONCURRENCY = int(os.environ.get("ARTICLE_PREFETCH_CONCURRENCY", "4"))
+PASS2_CONCURRENCY = int(os.environ.get("PASS2_CONCURRENCY", "2"))
+
+async def run_analysis(source="AUTOMATED", headlines=None, checkpoint=None):
+    """
+    Runs Pass 1 / Pass 2 over a stream of headlines.
+    With no headlines given, performs a full sweep of every source; headlines
+    flow into Pass 1 as soon as each source has parsed them. The checkpoint
+    (feed validators, source cursors) is committed only if the run succeeds.
+    """
     global cached_alerts
     global processed_links
     global last_search_end
     async with analysis_lock:
         start_new_cycle()
+        full_sweep = headlines is None
         print("\n" + "="*50)
         print(f"STARTING {source} ALPHA IMPACT ANALYSIS")
-        print(f"WINDOW START: {last_search_end}")
+        if full_sweep:
+            print(f"LAST RUN: {last_search_end}")
         print("="*50)
-        try:
-            start_time = datetime.datetime.now()
-            today = start_time.date()
-            print(f"DEBUG: Today's date: {today}")
-            
-            # Fetch headlines concurrently
-            results = await asyncio.gather(
-                fetch_news_api_headlines(),
-                fetch_news_data_headlines(),
-                fetch_hacker_news_headlines(),
-                fetch_social_media_headlines(),
-                return_exceptions=True
-            )
-            
-            # RSS headlines (separate thread)
-            loop = asyncio.get_event_loop()
-            rss_headlines = await loop.run_in_executor(None, fetch_latest_headlines)
-            
-            headlines = rss_headlines
-            for res in results:
-                if isinstance(res, list):
-                    headlines.extend(res)
-                else:
-                    print(f"ERROR: Source failed: {res}")
-            
-            # --- GAPLESS FILTERING ---
-            # Filter headlines by timestamp (Only keep news since last_search_end)
+        # Source state staged while fetching (full sweep) or by the polls that fed this batch
+        checkpoint = checkpoint or Checkpoint()
+        with checkpoint.active():
             try:
-                window_start = datetime.datetime.fromisoformat(last_search_end)
-                fresh_headlines = []
-                for h in headlines:
-                    h_date = parse_published_date(h.get("published"))
-                    # If date parsing fails or it's newer than window_start, keep it
-                    if not h_date or h_date > window_start:
-                        fresh_headlines.append(h)
-                
-                print(f"Gapless Filter: Kept {len(fresh_headlines)} / {len(headlines)} headlines (Window Start: {last_search_end})")
-                headlines = fresh_headlines
-            except Exception as e:
-                print(f"Warning: Gapless filtering failed: {e}")
+                start_time = datetime.datetime.now()
+                today = start_time.date()
+                print(f"DEBUG: Today's date: {today}")
             
-            # Remove duplicates by link
-            unique_headlines = []
-            seen_links = set()
-            for h in headlines:
-                if h['link'] not in seen_links:
-                    unique_headlines.append(h)
-                    seen_links.add(h['link'])
-            headlines = unique_headlines
-            print(f"DEBUG: {len(headlines)} unique headlines after deduplication.")
-
-            # 72-hour window
-            live_headlines = []
-            three_days_ago = today - datetime.timedelta(days=2)
-            for h in headlines:
-                try:
-                    pub_dt = date_parser.parse(h['published'])
-                    if pub_dt.date() >= three_days_ago:
-                        live_headlines.append(h)
-                except:
-                    live_headlines.append(h)
-
-            new_headlines = [h for h in live_headlines if h['link'] not in processed_links]
-            
-            # Backup for empty cache
-            if not new_headlines and source == "USER REQUESTED" and not cached_alerts:
-                print("DEBUG: Empty cache. Forcing re-analysis of top 5 items.")
-                new_headlines = live_headlines[:5]
-
-            print(f"DEBUG: {len(new_headlines)} fresh items for analysis.")
-            
-            if not new_headlines:
-                print(f"DEBUG: Auto-Scanner activated at {datetime.datetime.now().time()} but found 0 new headlines.")
-                print("DEBUG: All articles already processed. Skipping AI run.")
-                print("="*50 + "\n")
-                return # Keep the return here to prevent unnecessary AI calls
-
-            # IMMEDIATELY mark as processed to prevent race conditions during long AI runs
-            print(f"DEBUG: Pre-emptively marking {len(new_headlines)} headlines as processed.")
-            for h in new_headlines:
-                processed_links.add(h['link'])
-            save_processed(processed_links)
-
-            # Identify high impact events (Pass 1)
-            high_impact_events = await identify_high_impact_events(new_headlines)
-            
-            # Filter by probability: Only keep >= 50%
-            filtered_high_impact = [e for e in high_impact_events if e.get("probability", 0) >= 50]
-            print(f"Probability Filter: Kept {len(filtered_high_impact)} / {len(high_impact_events)} alerts (>= 50%)")
-            
-            final_alerts = []
+                # Every source only hands over entries newer than its own cursor
+                # (services/source_cursors.py), so no global time window is needed here.
+                if full_sweep:
+                    stream = stream_all_sources()
+                else:
+                    print(f"DEBUG: Analyzing {len(headlines)} headlines from scheduled feed polls.")
+                    stream = from_list(headlines)
             
-            # Only process the top 20 filtered high-impact events for deep dive
-            for event in filtered_high_impact:
-                # The AI already confirmed in Pass 1 this impacts stocks. We now do a full article Deep Dive on ALL of them.
-                print(f"  --> DEEP DIVE: {event['event']}")
-                full_text = await fetch_article_content(event['link'])
-                deep_report = await perform_deep_analysis(full_text, event['event'])
+                previous_alerts = cached_alerts
+                final_alerts = []
+                candidates = 0
+                deep_dives = []
+                prefetches = []
+                # Content hash -> event, so syndicated copies of one story get a single deep dive
+                analyzed_hashes = {a['content_hash']: a.get('event') for a in previous_alerts if a.get('content_hash')}
+                prefetch_slots = asyncio.Semaphore(ARTICLE_PREFETCH_CONCURRENCY)
+                pass2_slots = asyncio.Semaphore(PASS2_CONCURRENCY)
+
+                async def prefetch(link):
+                    async with prefetch_slots:
+                        return await fetch_article_content(link)
+
+                async def deep_dive(event, article):
+                    """Pass 2 for one candidate; publishes it as soon as it clears the bar."""
+                    global cached_alerts
+                    full_text = await article
+                    digest = article_cache.hash_for(event['link'])
+                    if digest:
+                        if digest in analyzed_hashes:
+                            print(f"    Skipped syndicated duplicate of: {analyzed_hashes[digest]}")
+                            return
+                        analyzed_hashes[digest] = event['event']
+                        event['content_hash'] = digest
+                    async with pass2_slots:
+                        deep_report = await perform_deep_analysis(full_text, event['event'])
                 
-                if deep_report:
-                    event.update(deep_report)
+                    if deep_report:
+                        event.update(deep_report)
                 
-                event['timestamp'] = event.get('published', datetime.datetime.now().isoformat())
-                event['article_summary'] = event.get('article_summary', event.get('reason', ''))
+                    event['timestamp'] = event.get('published', datetime.datetime.now().isoformat())
+                    # Every outlet that carried this story so far (attach_source adds later ones)
+                    event['sources'] = story_clusters.links(event.get('cluster')) or [event['link']]
+                    event['article_summary'] = event.get('article_summary', event.get('reason', ''))
                 
-                # Double check probability after deep dive
-                if event.get("probability", 0) >= 50:
-                    final_alerts.append(event)
-
-            # Update Processed Links - Moved to start of function to prevent race conditions
-            # for h in new_headlines:
-            #     processed_links.add(h['link'])
-            # save_processed(processed_links)
-
-            if final_alerts:
-                # Sort by probability DESC so the top_alert is truly the most important
-                final_alerts.sort(key=lambda x: x.get("probability", 0), reverse=True)
-                
-                # Combine and filter existing cache for 50% threshold globally
-                combined = final_alerts + cached_alerts
-                cached_alerts = [a for a in combined if a.get("probability", 0) >= 50]
-                cached_alerts = cached_alerts[:100]
-                
-                save_alerts(cached_alerts)
-                send_onesignal_notification(final_alerts, registered_devices)
-            else:
-                print("DEBUG: No impact detected.")
+                    # Double check probability after deep dive
+                    if event.get("probability", 0) >= 50:
+                        final_alerts.append(event)
+                        # Publish right away so /alerts shows it before the cycle ends.
+                        # Sort by probability DESC so the top_alert is truly the most important
+                        final_alerts.sort(key=lambda x: x.get("probability", 0), reverse=True)
+                    
+                        # Combine and filter existing cache for 50% threshold globally
+                        combined = final_alerts + previous_alerts
+                        cached_alerts = [a for a in combined if a.get("probability", 0) >= 50]
+                        cached_alerts = cached_alerts[:100]
+                        db.save_alerts(cached_alerts)
+                        remember_alerts(cached_alerts)
+
+                try:
+                    # Identify high impact events (Pass 1) while sources are still downloading.
+                    # Each candidate's article download starts at once and its deep dive runs
+                    # in the background, so Pass 1, scraping and Pass 2 all overlap.
+                    async for event in stream_high_impact_events(fresh_headline_stream(source, stream, today), settle_cluster):
+                        candidates += 1
+                        # Filter by probability: Only keep >= 50%
+                        if event.get("probability", 0) < 50:
+                            print(f"    Probability Filter: Dropped {event.get('event')} ({event.get('probability', 0)}% < 50%)")
+                            continue
+                    
+                        # The AI already confirmed in Pass 1 this impacts stocks. We now do a full article Deep Dive on ALL of them.
+                        print(f"  --> DEEP DIVE: {event['event']}")
+                        article = asyncio.create_task(prefetch(event['link']))
+                        prefetches.append(article)
+                        deep_dives.append(asyncio.create_task(deep_dive(event, article)))
+
+                    for result in await asyncio.gather(*deep_dives, return_exceptions=True):
+                        if isinstance(result, Exception):
+                            print(f"ERROR: Deep dive failed: {result}")
+                finally:
+                    for task in deep_dives + prefetches:
+                        task.cancel()
+
+                print(f"DEBUG: {candidates} Pass 1 candidates, {len(final_alerts)} alerts after deep dive.")
+
+                if final_alerts:
+                    await send_onesignal_notification(final_alerts, registered_devices)
+                else:
+                    print("DEBUG: No impact detected.")
             
-            # Update last run time on success
-            last_search_end = start_time.isoformat()
-            save_last_run_time(last_search_end)
+                # Update last run time on success (full sweeps only)
+                if full_sweep:
+                    last_search_end = start_time.isoformat()
+                    db.set_cursor("last_run_time", last_search_end)
+                # The batch is analyzed: now the feed state that produced it can be saved
+                checkpoint.commit()
                 
-        except Exception as e:
-            print(f"ERROR: {e}")
+            except Exception as e:
+                print(f"ERROR: {e}")
+        llm_cache.save()
+        article_cache.save()
+        story_clusters.save()    # Pass 1 outcomes settled after the stream stage saved
+        print(f"DEBUG: LLM cache stats: {llm_cache.stats()}")
+        print(f"DEBUG: Article cache stats: {article_cache.stats()}")
         print("="*50 + "\n")
 
+def build_feed_scheduler():
+    """One poll job per RSS feed, plus one per API source (quota-bound ones get a higher floor)."""
+    scheduler = FeedScheduler()
+    for category, urls in RSS_SOURCES.items():
+        for url in urls:
+            scheduler.add_feed(url, partial(poll_feed, category, url))
+    scheduler.add_feed("newsapi", fetch_news_api_headlines, min_interval=1800)
+    scheduler.add_feed("newsdata", fetch_news_data_headlines, min_interval=1800)
+    scheduler.add_feed("hackernews", fetch_hacker_news_headlines, cost=HN_POLL_COST)
+    scheduler.add_feed("reddit", fetch_social_media_headlines, cost=len(SUBREDDITS))
+    return scheduler
+
 async def background_scheduler():
     await asyncio.sleep(5)
-    print("DEBUG: background_scheduler initialized and waiting for intervals.")
+    scheduler = build_feed_scheduler()
+    print(f"DEBUG: background_scheduler initialized with {len(scheduler.feeds)} adaptive poll jobs.")
     while True:
         try:
-            print(f"DEBUG: background_scheduler triggering AUTOMATED analysis at {datetime.datetime.now()}")
-            await run_analysis(source="AUTOMATED")
+            due = scheduler.due_feeds()
+            if due:
+                checkpoint = Checkpoint()
+                with checkpoint.active():
+                    results = await asyncio.gather(*(scheduler.poll(key) for key in due))
+                scheduler.save_schedule()
+                headlines = [h for res in results for h in res]
+                if headlines:
+                    print(f"DEBUG: background_scheduler polled {len(due)} feeds, queued {len(headlines)} headlines.")
+                    headline_queue.put_nowait((headlines, checkpoint))
+                else:
+                    checkpoint.commit()
         except Exception as e:
             print(f"ERROR: background_scheduler caught exception: {e}")
-        print("DEBUG: background_scheduler sleeping for 120 minutes...")
-        await asyncio.sleep(7200) # Run every 120 minutes (2 hours) as requested
+        await asyncio.sleep(max(1.0, scheduler.seconds_until_next_poll()))
+
+async def analysis_worker():
+    """Drains headline batches from the scheduler as they arrive and analyzes them together."""
+    while True:
+        batch, checkpoint = await headline_queue.get()
+        while not headline_queue.empty():
+            more, staged = headline_queue.get_nowait()
+            batch.extend(more)
+            checkpoint.merge(staged)
+        try:
+            await run_analysis(source="AUTOMATED", headlines=batch, checkpoint=checkpoint)
+        except Exception as e:
+            print(f"ERROR: analysis_worker caught exception: {e}")
 
 async def self_ping():
     # Ping the health endpoint every 10 minutes to prevent Render free-tier from sleeping
@@ -366,23 +428,12 @@ async def self_ping():
             external_url = os.environ.get("RENDER_EXTERNAL_URL")
             ping_url = f"{external_url}/health" if external_url else url
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                await client.get(ping_url)
+            await get_client().get(ping_url, timeout=10.0)
             print(f"DEBUG: Self-ping successful to {ping_url}")
         except Exception as e:
             print(f"DEBUG: Self-ping failed: {e}")
         await asyncio.sleep(600)  # 10 minutes
 
-# Keep strong references to background tasks to prevent garbage collection
-background_tasks_set = set()
-
-@app.on_event("startup")
-async def startup_event():
-    task1 = asyncio.create_task(background_scheduler())
-    background_tasks_set.add(task1)
-    task2 = asyncio.create_task(self_ping())
-    background_tasks_set.add(task2)
-
 @app.get("/")
 async def root():
     return {"message": "ALPHA IMPACT API is running"}
@@ -395,7 +446,10 @@ async def health():
 async def get_status():
     return {
         "is_analyzing": analysis_lock.locked(),
-        "last_run_time": last_search_end
+        "last_run_time": last_search_end,
+        "llm_cache": llm_cache.stats(),
+        "article_cache": article_cache.stats(),
+        "prefilter": prefilter.stats()
     }
 
 @app.get("/alerts")
@@ -411,7 +465,7 @@ async def register_device(req: DeviceRequest):
     global registered_devices
     if req.player_id and req.player_id not in registered_devices:
         registered_devices.add(req.player_id)
-        save_devices(registered_devices)
+        db.add_device(req.player_id)
         print(f"DEBUG: Registered new device. Total devices: {len(registered_devices)}")
     return {"status": "ok"}
 
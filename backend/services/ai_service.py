@@ -1,12 +1,23 @@
-import httpx
 import json
 import re
 import os
 import asyncio
+import time
 import datetime
+import hashlib
+import threading
+import numpy as np
 from dotenv import load_dotenv
-from thefuzz import process
 from bytez import Bytez
+from services.http_client import get_client
+from services.pipeline import ordered_map, batched
+from services.llm_cache import llm_cache, normalize_text
+from services.key_scheduler import KeyScheduler, AUTH_COOLDOWN
+from services.model_router import ModelRouter
+from services.prefilter import prefilter, log_verdict
+from services.example_index import ExampleIndex
+from services.vector_index import VectorIndex, VECTOR_INDEX_DIR
+from services.company_resolver import CompanyResolver, load_aliases
 
 # Environment variables are managed by main.py
 # Only load here if running standalone
@@ -34,24 +45,16 @@ except Exception as e:
     print(f"Warning: Could not load company data: {e}")
 
 
+# Pre-normalized names, alias/exact maps, rapidfuzz tier and memo (see services/company_resolver.py)
+company_resolver = CompanyResolver(COMPANY_NAMES, COMPANY_SYMBOLS, load_aliases())
+
 def validate_company_name(name):
     """
     Fuzzy matches the AI-generated company name against the official list.
     Returns the official name if a high-confidence match is found.
     """
-    if not name or not COMPANY_NAMES: return name
-    
-    # Quick exact match check
-    if name in COMPANY_NAMES: return name
-    
-    # Fuzzy match
-    match, score = process.extractOne(name, COMPANY_NAMES)
-    if score >= 85: # High confidence threshold
-        # print(f"  DEBUG: Corrected '{name}' -> '{match}' (Score: {score})")
-        return match
-    return name
-
-# Updated API Keys logic: Find ALL OpenRouter keys dynamically
+    return company_resolver.resolve(name)[0]
+
 API_KEYS = []
 for key, value in os.environ.items():
     if key.startswith("OPENROUTER_API_KEY") and value and value.strip():
@@ -109,54 +112,146 @@ def clean_json_string(content: str) -> str:
     content = re.sub(r',\s*([}\]])', r'\1', content)
     return content
 
+# BM25 index over TRAINING_EXAMPLES, built once at load (see services/example_index.py).
+example_index = ExampleIndex(TRAINING_EXAMPLES)
+# Dense (LSA) index over the same examples, for paraphrases that share no
+# keywords (see services/vector_index.py). Loaded, or rebuilt when the data
+# changed, by load_vector_index() in a worker thread at startup; until it is
+# ready retrieval is BM25-only.
+vector_index = None
+vector_index_lock = threading.Lock()
+
+def load_vector_index(path=VECTOR_INDEX_DIR):
+    """Loads or builds the dense index. Blocking (a rebuild takes seconds): run it off the event loop."""
+    global vector_index
+    if vector_index is not None or not TRAINING_EXAMPLES:
+        return vector_index
+    count = len(TRAINING_EXAMPLES)
+    index = VectorIndex.load_or_build([ex.get('news', '') for ex in TRAINING_EXAMPLES[:count]], path)
+    with vector_index_lock:
+        # Examples added at runtime while the index was being built
+        if len(TRAINING_EXAMPLES) > count:
+            index.add([ex.get('news', '') for ex in TRAINING_EXAMPLES[count:]])
+        vector_index = index
+    remember_alerts(alert_memory)
+    print(f"DEBUG: Vector index ready ({len(index)} examples)")
+    return index
+
+RRF_K = 60            # Reciprocal rank fusion constant
+CANDIDATE_POOL = 20   # Matches taken from each index before fusing
+
+def add_training_example(ex):
+    """Adds an example at runtime to both retrieval indexes."""
+    with vector_index_lock:
+        TRAINING_EXAMPLES.append(ex)
+        example_index.add(ex)
+        if vector_index is not None:
+            vector_index.add([ex.get('news', '')])
+
+def relevant_example_ids(query, limit=3):
+    """
+    Fuses the BM25 and dense rankings (reciprocal rank fusion) and skips
+    examples repeating an event already picked, so the few-shot block isn't
+    three copies of one templated story.
+    """
+    rankings = [example_index.search(query, k=CANDIDATE_POOL, pad=False)]
+    if vector_index is not None:
+        rankings.append([doc_id for doc_id, _ in vector_index.search(query, k=CANDIDATE_POOL)])
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+    picked, events = [], set()
+    for doc_id in sorted(fused, key=lambda d: (-fused[d], d)):
+        event = example_index.examples[doc_id].get('event')
+        if event not in events:
+            events.add(event)
+            picked.append(doc_id)
+        if len(picked) >= limit:
+            return picked
+    # Nothing matched well enough: fall back to dataset order, as before
+    for doc_id in range(len(example_index)):
+        if len(picked) >= limit:
+            break
+        if doc_id not in fused:
+            picked.append(doc_id)
+    return picked
+
 def get_relevant_examples(headline, limit=3):
     """
     Returns the most relevant training examples for a given headline.
-    Uses simple keyword matching for RAG-lite.
+    Hybrid BM25 + dense retrieval (RAG-lite).
     """
-    if not TRAINING_EXAMPLES: return []
-    
-    # Simple keyword extraction
-    keywords = set(headline.lower().split())
-    
-    scored_examples = []
-    for ex in TRAINING_EXAMPLES:
-        # Match against event, sector, or reason keywords
-        content = (ex['event'] + " " + ex.get('sector', '') + " " + ex.get('reason', '')).lower()
-        score = sum(1 for k in keywords if k in content and len(k) > 3)
-        scored_examples.append((score, ex))
-        
-    # Sort by score descending
-    scored_examples.sort(key=lambda x: x[0], reverse=True)
-    
-    # Return top N examples
-    return [ex for score, ex in scored_examples[:limit]]
-
-# Track keys that are out of credits to avoid retrying them in the same session
-depleted_keys = set()
-# Track keys that failed in the current analysis cycle
-cycle_failed_keys = set()
+    return [example_index.examples[i] for i in relevant_example_ids(headline, limit)]
+
+# Past alerts embedded in the same space as the examples. They are real Pass 2
+# outputs, so the closest one is shown to the deep dive as an extra example.
+# main.py refreshes this whenever cached_alerts changes.
+ALERT_EXAMPLE_MIN_SCORE = 0.6
+PASS2_FIELDS = ("event", "article_summary", "impact_description", "company", "sector", "stocks",
+                "impact_direction", "probability", "event_date", "impact_date_est", "impact", "strength", "reason")
+alert_memory = []
+alert_vectors = None
+
+def remember_alerts(alerts):
+    global alert_memory, alert_vectors
+    alert_memory = list(alerts)
+    if vector_index is None:
+        return  # Embedded by load_vector_index once the index is ready
+    alert_vectors = vector_index.embed([f"{a.get('event', '')} {a.get('article_summary', '')}" for a in alert_memory])
+
+def similar_alerts(query, k=1, min_score=ALERT_EXAMPLE_MIN_SCORE):
+    if alert_vectors is None or not len(alert_memory):
+        return []
+    q = vector_index.embed([query])[0]
+    scores = alert_vectors @ q
+    top = np.argsort(-scores, kind="stable")[:k]
+    return [alert_memory[i] for i in top if scores[i] >= min_score]
+
+# Key scheduling: token buckets, in-flight caps and circuit breakers per key
+# (see services/key_scheduler.py). Replaces the old depleted/per-cycle blacklists.
+openrouter_keys = KeyScheduler(API_KEYS)
+bytez_keys = KeyScheduler(BYTEZ_API_KEYS, max_in_flight=1)
+# Orders MODELS by observed latency/success and decides when to hedge
+model_router = ModelRouter(MODELS)
+
+def pass1_concurrency():
+    """Worker count for Pass 1: per-key in-flight cap times the keys that are currently healthy."""
+    usable = openrouter_keys.usable_count()
+    if not usable:
+        return max(1, bytez_keys.usable_count())
+    return usable * openrouter_keys.max_in_flight
 
 def start_new_cycle():
-    """Reset the per-cycle failure tracking."""
-    global cycle_failed_keys
-    print("  DEBUG: Starting new analysis cycle - Resetting per-cycle API key blacklists.")
-    cycle_failed_keys.clear()
-
-async def analyze_headline(headline_text):
-    # Current date for context
-    current_date = datetime.datetime.now().strftime("%Y-%m-%d")
-    
-    # RAG-lite: Fetch relevant training examples
-    relevant_examples = get_relevant_examples(headline_text, limit=3)
+    """Logs key health at the start of a cycle (recovery is handled by the circuit breakers)."""
+    print(f"  DEBUG: Starting new analysis cycle - OpenRouter keys: {openrouter_keys.summary() or 'none'}")
+    if bytez_keys.keys:
+        print(f"  DEBUG: Bytez keys: {bytez_keys.summary()}")
+    print(f"  DEBUG: Model router: {model_router.summary()}")
+
+def format_examples(query, current_date, limit=3):
+    """Few-shot block for the prompt, built from the pre-serialized snippets of the best matches."""
     examples_text = ""
-    for i, ex in enumerate(relevant_examples):
-        # Dynamically inject current date to prevent AI from copying hardcoded old dates
-        if "event_date" in ex: ex["event_date"] = current_date
-        if "impact_date_est" in ex: ex["impact_date_est"] = current_date
-        examples_text += f"\n    Example {i+1}:\n    News: {ex.get('news')}\n    Output: {json.dumps(ex)}\n"
+    for i, doc_id in enumerate(relevant_example_ids(query, limit)):
+        # Date fields get the current date injected so the AI doesn't copy hardcoded old dates
+        examples_text += f"\n    Example {i+1}:\n    News: {example_index.examples[doc_id].get('news')}\n    Output: {example_index.snippet(doc_id, current_date)}\n"
+    return examples_text
 
-    prompt = f"""
+def format_alert_examples(query, current_date, start=4):
+    """Extra examples from similar past alerts, numbered after the training examples."""
+    examples_text = ""
+    for i, alert in enumerate(similar_alerts(query)):
+        output = {f: alert[f] for f in PASS2_FIELDS if f in alert}
+        for field in ("event_date", "impact_date_est"):
+            if field in output:
+                output[field] = current_date
+        examples_text += f"\n    Example {start+i}:\n    News: {alert.get('event')}\n    Output: {json.dumps(output)}\n"
+    return examples_text
+
+def pass1_instructions(current_date):
+    """Theories, Master Formula and rules shared by single and batched Pass 1 prompts."""
+    return f"""
     Today's Date: {current_date}
     You are an AI that detects whether a news event may impact publicly traded stocks or sectors.
     Analyze the news and return a structured JSON response.
@@ -214,14 +309,9 @@ async def analyze_headline(headline_text):
     5. Use "NSE:SYMBOL" format for stocks if known (e.g., "NSE:RELIANCE").
     6. "probability" is confidence event happened (1-100).
     7. "confidence" is analysis confidence (1-100).
+"""
 
-    TRAINING EXAMPLES (Relevant to this news):
-    {examples_text}
-
-    TODAY IS: {current_date}.
-    
-    Return JSON only in this REQUIRED format:
-    {{
+PASS1_SCHEMA = """{
      "event": "Short title of the event",
      "company": "Primary Indian company (if any)",
      "sector": "Indian sector affected",
@@ -235,7 +325,23 @@ async def analyze_headline(headline_text):
      "impact": "positive/negative/neutral",
      "strength": "low/medium/high",
      "confidence": 1-100
-    }}
+    }"""
+
+def build_pass1_prompt(headline_text):
+    # Current date for context
+    current_date = datetime.datetime.now().strftime("%Y-%m-%d")
+    
+    # RAG-lite: Fetch relevant training examples
+    examples_text = format_examples(headline_text, current_date)
+
+    return f"""{pass1_instructions(current_date)}
+    TRAINING EXAMPLES (Relevant to this news):
+    {examples_text}
+
+    TODAY IS: {current_date}.
+    
+    Return JSON only in this REQUIRED format:
+    {PASS1_SCHEMA}
 
     If no stock impact → return {{"impact":"no impact"}}.
     
@@ -243,178 +349,369 @@ async def analyze_headline(headline_text):
 
     Headline: "{headline_text}"
     """
+
+def build_pass1_batch_prompt(headline_texts):
+    current_date = datetime.datetime.now().strftime("%Y-%m-%d")
+    examples_text = format_examples(" ".join(headline_texts), current_date)
+    numbered = "\n".join(f'    {i}: "{text}"' for i, text in enumerate(headline_texts))
+    batch_schema = PASS1_SCHEMA.replace("{\n", '{\n     "index": 0,\n', 1)
+
+    return f"""{pass1_instructions(current_date)}
+    TRAINING EXAMPLES (Relevant to these news items):
+    {examples_text}
+
+    TODAY IS: {current_date}.
+
+    You will receive {len(headline_texts)} numbered headlines. Analyze EACH one independently.
+    Return a JSON ARRAY only, with exactly one object per headline, each in this REQUIRED format
+    ("index" is the headline's number):
+    [
+    {batch_schema},
+    ...
+    ]
+
+    If a headline has no stock impact → its object is {{"index": N, "impact":"no impact"}}.
     
-    print(f"  DEBUG: Prompting AI for: {headline_text[:50]}...")
-    
-    async with httpx.AsyncClient(timeout=35.0) as client:
-        # Multi-layer fallback: Try Primary Model with all keys, then Backup Model with all keys
-        for model_idx, model in enumerate(MODELS):
-            if model_idx > 0:
-                print(f"  --> Falling back to next OpenRouter model: {model}")
-            else:
-                print(f"  --> Attempting primary OpenRouter model: {model}")
-                
-            for i, api_key in enumerate(API_KEYS):
-                if not api_key: continue
-                # Skip keys that are out of credits OR failed in this specific cycle
-                is_free_model = model.endswith(":free")
-                if api_key in depleted_keys and not is_free_model:
-                    continue
-                if api_key in cycle_failed_keys:
-                    continue
-                try:
-                    display_key = f"{api_key[:6]}...{api_key[-4:]}"
-                    print(f"      >> Trying Key {i+1} ({display_key}) on model {model}")
-                    
-                    response = await client.post(
-                        url="https://openrouter.ai/api/v1/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {api_key.strip()}",
-                            "Content-Type": "application/json",
-                        },
-                        json={
-                            "model": model,
-                            "messages": [
-                                {"role": "user", "content": prompt}
-                            ]
-                        },
-                        timeout=35
-                    )
-                    
-                    if response.status_code != 200:
-                        print(f"      >> AI Error {response.status_code}: {response.text}")
-
-                    if response.status_code == 200:
-                        print(f"      >> SUCCESS: OpenRouter Model {model} with Key {i+1} responded.")
-                        result = response.json()
-                        if 'choices' not in result:
-                            print(f"      >> Unexpected response structure: {result}")
-                            continue
-                        content = result['choices'][0]['message']['content']
-                        content = content.strip().replace('```json', '').replace('```', '')
-
-                        data = json.loads(content)
-                        
-                        # Validate company name against official list
-                        if 'company' in data and data['company']:
-                            validated_name = validate_company_name(data['company'])
-                            data['company'] = validated_name
-                            
-                            # Auto-inject symbol if known
-                            if validated_name in COMPANY_SYMBOLS:
-                                data['stocks'] = [COMPANY_SYMBOLS[validated_name]]
-                            
-                        return data
-                    elif response.status_code == 402:
-                        print(f"      >> FAILED: Key {i+1} is out of credits (402 Payment Required).")
-                        depleted_keys.add(api_key)
-                        continue
-                    elif response.status_code == 401:
-                        print(f"      >> FAILED: Key {i+1} is Unauthorized (401). Check if the key is valid.")
-                        cycle_failed_keys.add(api_key)
-                        continue
-                    elif response.status_code == 404:
-                        print(f"      >> FAILED: Model/Resource not found (404) on Key {i+1}.")
-                        err_text = response.text
-                        if "Free model" in err_text:
-                            print(f"         DETAIL: Check OpenRouter Privacy Settings (Allow free models).")
-                        continue
-                    elif response.status_code == 429:
-                        print(f"      >> FAILED: Rate Limited (429) on {model} with Key {i+1}.")
-                        print(f"         RESPONSE: {response.text[:200]}")
-                        cycle_failed_keys.add(api_key)
-                        continue
-                    elif str(response.status_code).startswith('5'):
-                        print(f"      >> FAILED: Provider Outage ({response.status_code}) for model {model}.")
-                        continue
-                    else:
-                        print(f"      >> FAILED: Error {response.status_code} on model {model}: {response.text[:200]}")
-                        continue
-                except Exception as e:
-                    print(f"      >> EXCEPTION with Key {i+1} on model {model}: {str(e)}")
-                    continue
+    CRITICAL: YOU MUST RESPOND ONLY WITH A JSON ARRAY. NO MARKDOWN. NO BACKTICKS. NO OTHER TEXT.
+
+    Headlines:
+{numbered}
+    """
+
+class MalformedReply(ValueError):
+    """A reply that parsed as text but holds no usable result (e.g. a batch with no items)."""
+
+# openrouter_attempt's parsed value for a malformed reply: other keys won't
+# make this model's answer parse, so the caller moves on to the next model
+MALFORMED = object()
+
+def parse_json_content(content):
+    """Parses a model reply into a dict; raises on malformed output so the next key/model is tried."""
+    if isinstance(content, dict):
+        return content
+    return json.loads(clean_json_string(content))
+
+def parse_json_batch(content):
+    """
+    Parses a batched reply into a list of result dicts. Raises MalformedReply
+    when it is not JSON or holds no results: the model is recorded as failed
+    and the next model is tried once, rather than the same prompt on every key.
+    """
+    try:
+        data = parse_json_content(content)
+    except (json.JSONDecodeError, TypeError):
+        raise MalformedReply(f"batch reply is not valid JSON: {str(content)[:100]}...")
+    if isinstance(data, dict):
+        data = data.get("results") or data.get("headlines") or []
+    items = [item for item in data if isinstance(item, dict)] if isinstance(data, list) else []
+    if not items:
+        raise MalformedReply(f"batch reply has no results: {str(content)[:100]}...")
+    return items
+
+def finalize_result(data, provider):
+    """Shared post-processing for every Pass 1 / Pass 2 result."""
+    if provider == "bytez" and data.get('impact', '').lower() in ['positive', 'negative'] and data.get('probability', 0) < 50:
+        data['probability'] = 75
+        print(f"      >> Normalizing probability to 75")
+
+    # Validate company name against official list
+    if 'company' in data and data['company']:
+        validated_name, symbol = company_resolver.resolve(data['company'])
+        data['company'] = validated_name
+        
+        # Auto-inject symbol if known
+        if symbol:
+            data['stocks'] = [symbol]
+    return data
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+async def openrouter_attempt(model, ks, prompt, parse, timeout, headers):
+    """
+    One OpenRouter call on a leased key. Does the key bookkeeping, records
+    the outcome with the model router and returns (ok, parsed).
+    """
+    client = get_client("llm")
+    started = time.monotonic()
+    try:
+        print(f"      >> Trying {ks.display} on model {model}")
+        response = await client.post(
+            url=OPENROUTER_URL,
+            headers={**headers, "Authorization": f"Bearer {ks.key.strip()}"},
+            json={
+                "model": model,
+                "messages": [
+                    {"role": "user", "content": prompt}
+                ]
+            },
+            timeout=timeout
+        )
+    except asyncio.CancelledError:
+        # Lost a hedge race: count it as a slow failure so a degraded model drops in the ranking
+        model_router.record(model, time.monotonic() - started, False)
+        raise
+    except Exception as e:
+        print(f"      >> EXCEPTION with {ks.display} on model {model}: {str(e)}")
+        model_router.record(model, time.monotonic() - started, False)
+        return False, None
+    finally:
+        await openrouter_keys.release(ks)
+    latency = time.monotonic() - started
+
+    if response.status_code == 200:
+        openrouter_keys.record_success(ks, response.headers)
+        print(f"      >> SUCCESS: OpenRouter Model {model} with {ks.display} responded in {latency:.1f}s.")
+        try:
+            result = response.json()
+            if 'choices' not in result:
+                print(f"      >> Unexpected response structure: {result}")
+                model_router.record(model, latency, False)
+                return False, None
+            content = result['choices'][0]['message']['content']
+            parsed = parse(content)
+        except MalformedReply as e:
+            print(f"      >> FAILED: Malformed reply from {model}: {str(e)}")
+            model_router.record(model, latency, False)
+            return False, MALFORMED
+        except Exception as e:
+            print(f"      >> FAILED: Could not parse reply from {model}: {str(e)}")
+            model_router.record(model, latency, False)
+            return False, None
+        model_router.record(model, latency, True)
+        return True, parsed
+    elif response.status_code == 402:
+        print(f"      >> FAILED: {ks.display} is out of credits (402 Payment Required).")
+        openrouter_keys.record_depleted(ks)
+    elif response.status_code == 401:
+        print(f"      >> FAILED: {ks.display} is Unauthorized (401). Check if the key is valid.")
+        openrouter_keys.record_failure(ks, cooldown=AUTH_COOLDOWN)
+    elif response.status_code == 404:
+        print(f"      >> FAILED: Model/Resource not found (404) on {ks.display}.")
+        err_text = response.text
+        if "Free model" in err_text:
+            print(f"         DETAIL: Check OpenRouter Privacy Settings (Allow free models).")
+        model_router.record(model, latency, False)
+    elif response.status_code == 429:
+        print(f"      >> FAILED: Rate Limited (429) on {model} with {ks.display}.")
+        print(f"         RESPONSE: {response.text[:200]}")
+        openrouter_keys.record_rate_limit(ks, response.headers)
+    elif str(response.status_code).startswith('5'):
+        print(f"      >> FAILED: Provider Outage ({response.status_code}) for model {model}.")
+        model_router.record(model, latency, False)
+    else:
+        print(f"      >> FAILED: Error {response.status_code} on model {model}: {response.text[:200]}")
+        model_router.record(model, latency, False)
+    return False, None
+
+async def hedged_attempt(model, ks, call):
+    """
+    Runs call(model, ks). If it is still pending past the model's observed
+    p95, races a duplicate on the next-best model (and another key when one
+    is free), keeps the first good answer and cancels the loser.
+    """
+    primary = asyncio.create_task(call(model, ks))
+    delay = model_router.hedge_delay(model)
+    if delay is None:
+        return await primary
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+
+    alt_model = model_router.hedge_model(model)
+    alt_ks = None
+    if alt_model:
+        paid_model = not alt_model.endswith(":free")
+        alt_ks = await openrouter_keys.acquire(paid_model=paid_model, exclude={ks.key}, max_wait=0)
+        if alt_ks is None:
+            alt_ks = await openrouter_keys.acquire(paid_model=paid_model, max_wait=0)
+    if alt_ks is None:
+        return await primary
+
+    print(f"      >> HEDGE: {model} past p95 ({delay:.1f}s). Racing {alt_model} on {alt_ks.display}.")
+    pending = {primary, asyncio.create_task(call(alt_model, alt_ks))}
+    outcome = (False, None)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                outcome = task.result()
+                if outcome[0]:
+                    return outcome
+        return outcome
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def request_completion(prompt, parse=parse_json_content, label="", timeout=35, bytez_timeout=35.0, extra_headers=None):
+    """
+    Sends a prompt down the fallback chain: every model (fastest expected
+    first) with every usable key, then Bytez. Returns (parsed, provider),
+    or (None, None) when every model and key failed.
+    """
+    headers = {"Content-Type": "application/json"}
+    headers.update(extra_headers or {})
+
+    async def call(model, ks):
+        return await openrouter_attempt(model, ks, prompt, parse, timeout, headers)
+
+    # Multi-layer fallback: Try the best-ranked model with all keys, then the next one
+    for model_idx, model in enumerate(model_router.ranked_models()):
+        if model_idx > 0:
+            print(f"  --> {label}Falling back to next OpenRouter model: {model}")
+        else:
+            print(f"  --> {label}Attempting primary OpenRouter model: {model}")
+
+        # Keys that are out of credits are only skipped for paid models
+        paid_model = not model.endswith(":free")
+        tried = set()
+        while True:
+            ks = await openrouter_keys.acquire(paid_model=paid_model, exclude=tried)
+            if ks is None:
+                break
+            tried.add(ks.key)
+            ok, parsed = await hedged_attempt(model, ks, call)
+            if ok:
+                return parsed, "openrouter"
+            if parsed is MALFORMED:
+                break
             
     # --- FALLBACK TO BYTEZ ---
-    if BYTEZ_API_KEYS:
-        print("  --> ALL OpenRouter models failed. Falling back to Bytez...")
-        for b_key_idx, b_key in enumerate(BYTEZ_API_KEYS):
-            if b_key in cycle_failed_keys: continue
+    if bytez_keys.keys:
+        print(f"  --> {label}ALL OpenRouter models failed. Falling back to Bytez...")
+        tried = set()
+        while True:
+            ks = await bytez_keys.acquire(exclude=tried)
+            if ks is None:
+                break
+            tried.add(ks.key)
             try:
-                sdk = Bytez(b_key)
+                sdk = Bytez(ks.key)
                 # Primary Bytez model selection
                 b_model_name = "google/gemma-3-12b-it" if "gemma" in MODELS[0].lower() else "openai/gpt-oss-20b"
-                print(f"  --> Attempting primary Bytez model: {b_model_name} (Key {b_key_idx+1})")
+                print(f"  --> {label}Attempting primary Bytez model: {b_model_name} ({ks.display})")
                 
                 model = sdk.model(b_model_name)
                 # Bytez SDK is synchronous, so run in executor to avoid blocking the loop
                 loop = asyncio.get_event_loop()
                 results = await asyncio.wait_for(
                     loop.run_in_executor(None, lambda: model.run([{"role": "user", "content": prompt}])),
-                    timeout=35.0
+                    timeout=bytez_timeout
                 )
                 
                 if results and hasattr(results, 'output') and results.output:
-                    print(f"      >> SUCCESS: Bytez analysis successful! Key {b_key_idx+1}")
+                    print(f"      >> SUCCESS: Bytez analysis successful! {ks.display}")
+                    bytez_keys.record_success(ks)
                     
                     if isinstance(results.output, dict):
                         content = results.output.get("content", "")
                         if not content and "message" in results.output:
                             content = results.output["message"].get("content", "")
-                        
-                        if content:
-                            content = clean_json_string(content)
-                            try:
-                                data = json.loads(content)
-                            except json.JSONDecodeError as je:
-                                print(f"      >> FAILED: Bytez JSON Parse Error: {je}. Content: {content[:100]}...")
-                                continue
-                        else:
-                            data = results.output
+                        if not content:
+                            content = results.output
                     else:
-                        content = clean_json_string(str(results.output))
-                        try:
-                            data = json.loads(content)
-                        except json.JSONDecodeError as je:
-                            print(f"      >> FAILED: Bytez JSON Parse Error: {je}.")
-                            continue
-                        
-                    if data.get('impact', '').lower() in ['positive', 'negative'] and data.get('probability', 0) < 50:
-                        data['probability'] = 75
-                        print(f"      >> Normalizing probability to 75")
+                        content = str(results.output)
                         
-                    if 'company' in data and data['company']:
-                        validated_name = validate_company_name(data['company'])
-                        data['company'] = validated_name
-                        if validated_name in COMPANY_SYMBOLS:
-                            data['stocks'] = [COMPANY_SYMBOLS[validated_name]]
-                    return data
+                    try:
+                        return parse(content), "bytez"
+                    except (json.JSONDecodeError, MalformedReply) as je:
+                        print(f"      >> FAILED: Bytez JSON Parse Error: {je}. Content: {str(content)[:100]}...")
+                        continue
                 else:
                     err = getattr(results, 'error', 'Empty response')
-                    print(f"      >> FAILED: Bytez error with Key {b_key_idx+1}: {err}")
-                    cycle_failed_keys.add(b_key)
+                    print(f"      >> FAILED: Bytez error with {ks.display}: {err}")
+                    bytez_keys.record_failure(ks)
             except Exception as e:
-                print(f"      >> EXCEPTION: Bytez key {b_key_idx+1} failed: {str(e)}")
-                cycle_failed_keys.add(b_key)
-                continue
+                print(f"      >> EXCEPTION: Bytez {ks.display} failed: {str(e)}")
+                bytez_keys.record_failure(ks)
+            finally:
+                await bytez_keys.release(ks)
+
+    return None, None
+
+# Bump these whenever the corresponding prompt template changes, so cached
+# verdicts produced by the old wording are not reused.
+PASS1_PROMPT_VERSION = "pass1-v1"
+PASS2_PROMPT_VERSION = "pass2-v2"
+
+def pass1_cache_key(headline_text):
+    return llm_cache.key(PASS1_PROMPT_VERSION, ",".join(MODELS), normalize_text(headline_text))
 
-    print("  ERROR: All models (OpenRouter & Bytez) and keys failed.")
-    return {"impact": "no impact"}
+def pass2_cache_key(full_content, headline):
+    content_hash = hashlib.sha1(full_content[:4000].encode("utf-8")).hexdigest()
+    return llm_cache.key(PASS2_PROMPT_VERSION, ",".join(MODELS), normalize_text(headline), content_hash)
+
+async def analyze_headline(headline_text):
+    cache_key = pass1_cache_key(headline_text)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        print(f"  CACHE HIT: Pass 1 verdict reused for: {headline_text[:50]}...")
+        return cached
+
+    prompt = build_pass1_prompt(headline_text)
+    
+    print(f"  DEBUG: Prompting AI for: {headline_text[:50]}...")
+    data, provider = await request_completion(prompt)
+    if data is None:
+        print("  ERROR: All models (OpenRouter & Bytez) and keys failed.")
+        return {"impact": "no impact", "failed": True}
+    data = finalize_result(data, provider)
+    llm_cache.put(cache_key, data)
+    log_verdict(headline_text, data)
+    return data
+
+# Batched Pass 1: several headlines share one copy of the instruction prompt.
+# The batch size adapts - it shrinks when the model returns malformed or
+# incomplete arrays and grows back while replies stay well-formed.
+# PASS1_BATCH_SIZE=1 turns batching off.
+PASS1_BATCH_SIZE = max(1, int(os.environ.get("PASS1_BATCH_SIZE", "8")))
+PASS1_MAX_BATCH_SIZE = max(PASS1_BATCH_SIZE, 16)
+pass1_batch_size = PASS1_BATCH_SIZE
+
+async def analyze_headline_batch(headline_texts):
+    """
+    Classifies several headlines in one request. Returns a list aligned with
+    headline_texts; entries the model did not answer are None.
+    """
+    results = [llm_cache.get(pass1_cache_key(text)) for text in headline_texts]
+    pending = [i for i, r in enumerate(results) if r is None]
+    if len(pending) < len(headline_texts):
+        print(f"  CACHE HIT: {len(headline_texts) - len(pending)}/{len(headline_texts)} batch verdicts reused.")
+    if not pending:
+        return results
+
+    texts = [headline_texts[i] for i in pending]
+    prompt = build_pass1_batch_prompt(texts)
+    print(f"  DEBUG: Prompting AI for a batch of {len(texts)} headlines...")
+    data, provider = await request_completion(prompt, parse=parse_json_batch, label="Batch ")
+
+    # Resolve every company in the reply at once; finalize_result then hits the memo
+    company_resolver.resolve_many([item.get('company') for item in data or [] if item.get('company')])
+    for item in data or []:
+        idx = item.pop("index", None)
+        if isinstance(idx, str) and idx.isdigit():
+            idx = int(idx)
+        if isinstance(idx, int) and 0 <= idx < len(pending) and results[pending[idx]] is None:
+            results[pending[idx]] = finalize_result(item, provider)
+            llm_cache.put(pass1_cache_key(texts[idx]), results[pending[idx]])
+            log_verdict(texts[idx], results[pending[idx]])
+    return results
 
 async def perform_deep_analysis(full_content, headline):
     """
     PASS 2: Performs a deep dive on full article content.
     """
+    # Checked before retrieval and prompt assembly, which a cached report doesn't need
+    cache_key = pass2_cache_key(full_content, headline)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        print(f"  CACHE HIT: Deep Dive report reused for: {headline[:50]}...")
+        return cached
+
     # Current date for context
     current_date = datetime.datetime.now().strftime("%Y-%m-%d")
     
     # RAG-lite: Fetch relevant training examples
-    relevant_examples = get_relevant_examples(headline, limit=3)
-    examples_text = ""
-    for i, ex in enumerate(relevant_examples):
-        # Dynamically inject current date to prevent AI from copying hardcoded old dates
-        if "event_date" in ex: ex["event_date"] = current_date
-        if "impact_date_est" in ex: ex["impact_date_est"] = current_date
-        examples_text += f"\n    Example {i+1}:\n    News: {ex.get('news')}\n    Output: {json.dumps(ex)}\n"
+    examples_text = format_examples(headline, current_date) + format_alert_examples(headline, current_date)
 
     prompt = f"""
     You are a Senior Financial Analyst focused on the Indian Stock Market (NSE/BSE).
@@ -502,167 +799,111 @@ async def perform_deep_analysis(full_content, headline):
     """
     
     print(f"  DEBUG: Deep Dive Analysis for: {headline[:50]}...")
-    async with httpx.AsyncClient(timeout=35.0) as client:
-        for model_idx, model in enumerate(MODELS):
-            if model_idx > 0:
-                print(f"  --> Deep Dive Falling back to next OpenRouter model: {model}")
-            else:
-                print(f"  --> Deep Dive Attempting primary OpenRouter model: {model}")
-                
-            for i, api_key in enumerate(API_KEYS):
-                if not api_key: continue
-                # Skip depleted or cycle-failed keys
-                is_free_model = model.endswith(":free")
-                if api_key in depleted_keys and not is_free_model:
-                    continue
-                if api_key in cycle_failed_keys:
-                    continue
-                try:
-                    display_key = f"{api_key[:6]}...{api_key[-4:]}"
-                    print(f"      >> Trying Key {i+1} ({display_key}) for DEEP analysis")
-                    response = await client.post(
-                        url="https://openrouter.ai/api/v1/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {api_key.strip()}",
-                            "Content-Type": "application/json",
-                            "HTTP-Referer": "https://market-impact-alerts.onrender.com",
-                            "X-Title": "Market Impact Alerts",
-                        },
-                        json={
-                            "model": model, 
-                            "messages": [{"role": "user", "content": prompt}]
-                        },
-                        timeout=50
-                    )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        if 'choices' not in result:
-                            print(f"      >> Unexpected response: {result}")
-                            continue
-                        content = result['choices'][0]['message']['content']
-                        content = content.replace('```json', '').replace('```', '').strip()
-                        data = json.loads(content)
-                        
-                        # Validate company name against official list
-                        if 'company' in data and data['company']:
-                            validated_name = validate_company_name(data['company'])
-                            data['company'] = validated_name
-                            
-                            # Auto-inject symbol if known
-                            if validated_name in COMPANY_SYMBOLS:
-                                data['stocks'] = [COMPANY_SYMBOLS[validated_name]]
-                            
-                        return data
-                    elif response.status_code == 402:
-                        print(f"      >> Key {i+1} is out of credits (402). Skipping.")
-                        depleted_keys.add(api_key)
-                        continue
-                    elif response.status_code == 429:
-                        print(f"      >> Rate limit (429) on DEEP analysis. Blacklisting key for this cycle.")
-                        cycle_failed_keys.add(api_key)
-                        continue
-                    elif str(response.status_code).startswith('5'):
-                        print(f"      >> Deep Analysis Model Outage ({response.status_code}) on {model}. Trying next...")
-                        continue
-                    else:
-                        print(f"      >> Deep Analysis Error {response.status_code} with Key {i+1}")
-                        if response.status_code == 401:
-                            cycle_failed_keys.add(api_key)
-                        continue
-                except Exception as e:
-                    print(f"      >> Deep Analysis Exception with Key {i+1} on {model}: {e}")
-                    continue
-    # --- FALLBACK TO BYTEZ ---
-    if BYTEZ_API_KEYS:
-        print("  --> ALL OpenRouter models failed for DEEP analysis. Falling back to Bytez...")
-        for b_key_idx, b_key in enumerate(BYTEZ_API_KEYS):
-            if b_key in cycle_failed_keys: continue
-            try:
-                sdk = Bytez(b_key)
-                b_model_name = "google/gemma-3-12b-it" if "gemma" in MODELS[0].lower() else "openai/gpt-oss-20b"
-                print(f"  --> Deep Dive Attempting primary Bytez model: {b_model_name} (Key {b_key_idx+1})")
-                
-                model = sdk.model(b_model_name)
-                loop = asyncio.get_event_loop()
-                results = await asyncio.wait_for(
-                    loop.run_in_executor(None, lambda: model.run([{"role": "user", "content": prompt}])),
-                    timeout=45.0
-                )
-                
-                if results and hasattr(results, 'output') and results.output:
-                    print(f"      >> Bytez DEEP analysis successful! RAW Output: {str(results.output)[:150]}...")
-                    
-                    if isinstance(results.output, dict):
-                        content = results.output.get("content", "")
-                        if not content and "message" in results.output:
-                            content = results.output["message"].get("content", "")
-                            
-                        if content:
-                            content = clean_json_string(content)
-                            try:
-                                data = json.loads(content)
-                            except json.JSONDecodeError as je:
-                                print(f"      >> Bytez DEEP JSON Parse Error: {je}. Raw content: {content}")
-                                cycle_failed_keys.add(b_key)
-                                continue
-                        else:
-                            data = results.output
-                    else:
-                        content = clean_json_string(str(results.output))
-                        try:
-                            data = json.loads(content)
-                        except json.JSONDecodeError as je:
-                            print(f"      >> Bytez DEEP JSON Parse Error: {je}. Raw content: {content}")
-                            cycle_failed_keys.add(b_key)
-                            continue
-                    
-                    # Ensure probability carries over
-                    if data.get('impact', '').lower() in ['positive', 'negative'] and data.get('probability', 0) < 50:
-                        data['probability'] = 75
-                        print(f"      >> Forcing DEEP probability to 75 since impact was {data.get('impact')}")
-
-                    if 'company' in data and data['company']:
-                        validated_name = validate_company_name(data['company'])
-                        data['company'] = validated_name
-                        if validated_name in COMPANY_SYMBOLS:
-                            data['stocks'] = [COMPANY_SYMBOLS[validated_name]]
-                    return data
-            except Exception as e:
-                print(f"      >> Bytez DEEP analysis exception: {e}")
-                cycle_failed_keys.add(b_key)
-                continue
-
-    return None
+    data, provider = await request_completion(
+        prompt,
+        label="Deep Dive ",
+        timeout=50,
+        bytez_timeout=45.0,
+        extra_headers={
+            "HTTP-Referer": "https://market-impact-alerts.onrender.com",
+            "X-Title": "Market Impact Alerts",
+        }
+    )
+    if data is None:
+        return None
+    data = finalize_result(data, provider)
+    llm_cache.put(cache_key, data)
+    return data
+
+def tag_candidate(h, analysis):
+    """Turns a Pass 1 result into an alert candidate, or None for "no impact"."""
+    if analysis.get('impact', '').lower() == "no impact":
+        return None
+    # Tag as a candidate for Pass 2 if probability or strength is high
+    analysis['id'] = h['link']
+    analysis['link'] = h['link']
+    analysis['published'] = h['published']
+    if h.get('cluster') is not None:
+        analysis['cluster'] = h['cluster']
+    # Fall back to locally matched tickers when the model named none
+    if not analysis.get('stocks') and h.get('mentions'):
+        analysis['stocks'] = [m['symbol'] for m in h['mentions'] if m.get('symbol')]
+    
+    # Ensure event title exists for logging and display
+    if not analysis.get('event') or analysis.get('event') == "None":
+        analysis['event'] = analysis.get('article_summary', h['title'][:50])
+    return analysis
+
+async def classify_headline(h):
+    """Pass 1 for a single headline; a crashed call counts as "no impact" (flagged as failed)."""
+    try:
+        return await analyze_headline(h['title'])
+    except Exception as e:
+        print(f"      >> EXCEPTION during Pass 1 for {h['title'][:50]}: {e}")
+        return {"impact": "no impact", "failed": True}
+
+async def classify_batch(batch):
+    """
+    Pass 1 for a list of headlines in one request. Adapts the shared batch
+    size to how well the model handled it, and falls back to single-headline
+    calls for anything it did not answer.
+    """
+    global pass1_batch_size
+    if len(batch) == 1:
+        return [await classify_headline(batch[0])]
+
+    try:
+        results = await analyze_headline_batch([h['title'] for h in batch])
+    except Exception as e:
+        print(f"      >> EXCEPTION during batched Pass 1: {e}")
+        results = [None] * len(batch)
+
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        pass1_batch_size = max(1, len(batch) // 2)
+        print(f"      >> Batch answered {len(batch) - len(missing)}/{len(batch)}. Shrinking batch size to {pass1_batch_size}; retrying the rest one by one.")
+        singles = await asyncio.gather(*(classify_headline(batch[i]) for i in missing))
+        for i, r in zip(missing, singles):
+            results[i] = r
+    elif len(batch) >= pass1_batch_size:
+        pass1_batch_size = min(PASS1_MAX_BATCH_SIZE, pass1_batch_size + 2)
+    return results
 
-async def identify_high_impact_events(headlines):
+async def prefiltered(headlines, settle=None):
     """
-    PASS 1: Quickly identifies which headlines are highly impactful for the app.
+    Drops headlines the local pre-filter is confident have no market impact.
+    Headlines naming a listed company (h['mentions'], tagged in run_analysis)
+    always go to the LLM.
     """
-    results = []
-    print(f"PASS 1: Identifying high-impact candidates from {len(headlines)} headlines...")
-    
-    # Analyze all headlines provided (Pass 1 filtering)
-    for i, h in enumerate(headlines):
-        print(f"  Check ({i+1}/{len(headlines)}): {h['title'][:50]}...")
-        analysis = await analyze_headline(h['title'])
-        if analysis.get('impact', '').lower() != "no impact":
-            # Tag as a candidate for Pass 2 if probability or strength is high
-            analysis['id'] = h['link']
-            analysis['link'] = h['link']
-            analysis['published'] = h['published']
-            
-            # Ensure event title exists for logging and display
-            if not analysis.get('event') or analysis.get('event') == "None":
-                analysis['event'] = analysis.get('article_summary', h['title'][:50])
-            
-            results.append(analysis)
-            print(f"    --> Candidate found: {analysis.get('event')}")
+    async for h in headlines:
+        if h.get('mentions') or prefilter.should_analyze(h['title']):
+            yield h
         else:
-            print(f"    Result: No impact")
-            
-    return results
+            print(f"  PREFILTER: Skipped as no impact: {h['title'][:50]}...")
+            if settle:
+                settle(h, True)
 
-# analyze_headlines_bulk is now a legacy wrapper or can be removed if we update main.py
-async def analyze_headlines_bulk(headlines):
-    return await identify_high_impact_events(headlines)
+async def stream_high_impact_events(headlines, settle=None):
+    """
+    PASS 1 (streaming): classifies headlines from an async iterable with a
+    bounded worker pool sized to the usable keys. Candidates are yielded in
+    input order as soon as everything before them has been classified.
+    settle(h, ok) is called for every headline once Pass 1 is done with it;
+    ok is False when the LLM call failed rather than answered.
+    """
+    workers = pass1_concurrency()
+    print(f"PASS 1: Streaming high-impact classification with {workers} workers (batch size {pass1_batch_size})...")
+    checked = 0
+    async for batch, analyses in ordered_map(classify_batch, batched(prefiltered(headlines, settle), lambda: pass1_batch_size), workers):
+        for h, analysis in zip(batch, analyses):
+            checked += 1
+            if settle:
+                settle(h, not analysis.get('failed'))
+            print(f"  Check ({checked}): {h['title'][:50]}...")
+            analysis = tag_candidate(h, analysis)
+            if analysis:
+                print(f"    --> Candidate found: {analysis.get('event')}")
+                yield analysis
+            else:
+                print(f"    Result: No impact")
+    print(f"PASS 1: Finished after {checked} headlines. Pre-filter: {prefilter.stats()}")
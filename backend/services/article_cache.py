@@ -0,0 +1,178 @@
+import os
+import re
+import json
+import hashlib
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# On-disk cache of extracted article text, keyed by canonical URL. Each
+# article is one small file under data/article_cache/; the index (URL aliases,
+# content hashes, LRU order) is a single JSON file saved once per cycle.
+# The content hash identifies syndicated copies of the same story published
+# under different URLs. Short texts and paywall, cookie-consent or bot-check
+# interstitials get no hash: unrelated stories behind the same wall would
+# otherwise share one digest and be dropped as "duplicates".
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+ARTICLE_CACHE_DIR = os.path.join(DATA_DIR, "article_cache")
+
+ARTICLE_CACHE_MAX_BYTES = int(os.environ.get("ARTICLE_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid", "ocid", "cmpid",
+    "ref", "ref_src", "referrer", "taid", "ito", "_ga", "guccounter", "smid",
+}
+_WHITESPACE = re.compile(r"\s+")
+
+MIN_DEDUP_CHARS = 600             # Anything shorter is a stub, teaser or error page
+BOILERPLATE = re.compile(
+    r"subscribe to (continue|read)|subscribers only|already a subscriber|create a free account to"
+    r"|accept (all )?cookies|cookie (policy|settings|preferences)|we value your privacy"
+    r"|enable javascript|are you a robot|verify you are (a )?human|unusual traffic|access denied"
+    r"|could not extract clean text|error during scraping|failed to fetch content",
+    re.IGNORECASE
+)
+
+def canonical_url(url):
+    """https, lowercased host without www., no fragment, tracking params dropped, the rest sorted."""
+    parts = urlsplit((url or "").strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_"))
+    path = parts.path.rstrip("/") or "/"
+    scheme = "https" if parts.scheme.lower() in ("http", "https") else parts.scheme.lower()
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+def content_hash(text):
+    """Hash of the article text, insensitive to case and whitespace."""
+    return hashlib.sha1(_WHITESPACE.sub(" ", text).strip().lower().encode("utf-8")).hexdigest()
+
+def dedup_hash(text):
+    """content_hash for text substantial enough to identify a story, else None."""
+    if len(text.strip()) < MIN_DEDUP_CHARS or BOILERPLATE.search(text[:2000]):
+        return None
+    return content_hash(text)
+
+class ArticleCache:
+    def __init__(self, path=ARTICLE_CACHE_DIR, max_bytes=ARTICLE_CACHE_MAX_BYTES):
+        self.path = path
+        self.index_file = os.path.join(path, "index.json")
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()   # entry key -> {"url", "hash", "bytes"}, least recently used first
+        self.aliases = {}              # canonical URL (as linked or after redirects) -> entry key
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.dirty = False
+        self.load()
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha1(canonical_url(url).encode("utf-8")).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.txt")
+
+    def load(self):
+        if not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, "r") as f:
+                data = json.load(f)
+            self.entries = OrderedDict(data.get("entries", []))
+            self.aliases = data.get("aliases", {})
+            self.total_bytes = sum(e["bytes"] for e in self.entries.values())
+        except Exception as e:
+            print(f"ERROR loading article cache index: {e}")
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            tmp_path = self.index_file + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"entries": list(self.entries.items()), "aliases": self.aliases}, f)
+            os.replace(tmp_path, self.index_file)
+            self.dirty = False
+        except Exception as e:
+            print(f"ERROR saving article cache index: {e}")
+
+    def _resolve(self, url):
+        return self.aliases.get(canonical_url(url))
+
+    def get(self, url):
+        """Cached article text for url (or any URL that redirected to the same page), else None."""
+        key = self._resolve(url)
+        if key is None or key not in self.entries:
+            self.misses += 1
+            return None
+        try:
+            with open(self._file(key), "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            self._drop(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.dirty = True
+        self.hits += 1
+        return text
+
+    def hash_for(self, url):
+        """Content hash of the cached article behind url, or None (not cached, or not worth deduplicating)."""
+        entry = self.entries.get(self._resolve(url))
+        return entry["hash"] if entry else None
+
+    def put(self, url, text, final_url=None):
+        """Stores extracted text under the canonical URL and, if different, the post-redirect URL."""
+        key = self.key(final_url or url)
+        size = len(text.encode("utf-8"))
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(self._file(key), "w", encoding="utf-8") as f:
+                f.write(text)
+        except OSError as e:
+            print(f"ERROR writing article cache: {e}")
+            return None
+        if key in self.entries:
+            self.total_bytes -= self.entries[key]["bytes"]
+        digest = dedup_hash(text)
+        self.entries[key] = {"url": canonical_url(final_url or url), "hash": digest, "bytes": size}
+        self.entries.move_to_end(key)
+        self.total_bytes += size
+        self.aliases[canonical_url(url)] = key
+        if final_url:
+            self.aliases[canonical_url(final_url)] = key
+        self.dirty = True
+
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            self._drop(next(iter(self.entries)))
+            self.evictions += 1
+        return digest
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.total_bytes -= entry["bytes"]
+        self.aliases = {u: k for u, k in self.aliases.items() if k != key}
+        try:
+            os.remove(self._file(key))
+        except OSError:
+            pass
+        self.dirty = True
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+article_cache = ArticleCache()
@@ -0,0 +1,55 @@
+import contextvars
+from contextlib import contextmanager
+
+# Source state that says "already fetched" (feed validators, high-watermark
+# cursors) must only be saved once the headlines from that fetch have been
+# analyzed; otherwise a crash or failed analysis loses them for good. A poll
+# or sweep runs with an active Checkpoint: stores stage their writes in it,
+# and the caller commits it after the batch has been handed off. With no
+# active checkpoint (one-off scripts, the collector) writes apply at once.
+_active = contextvars.ContextVar("checkpoint", default=None)
+
+class Checkpoint:
+    def __init__(self):
+        self.staged = {}    # store -> {key: value}
+
+    @contextmanager
+    def active(self):
+        """Makes this the checkpoint for the current task (and tasks it creates)."""
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+    def merge(self, other):
+        for store, entries in other.staged.items():
+            for key, value in entries.items():
+                self._stage(store, key, value)
+        other.staged = {}
+        return self
+
+    def _stage(self, store, key, value):
+        entries = self.staged.setdefault(store, {})
+        if isinstance(value, dict) and isinstance(entries.get(key), dict):
+            entries[key].update(value)
+        else:
+            entries[key] = dict(value) if isinstance(value, dict) else value
+
+    def commit(self):
+        staged, self.staged = self.staged, {}
+        for store, entries in staged.items():
+            try:
+                store.apply(entries)
+                store.save()
+            except Exception as e:
+                print(f"ERROR committing source state: {e}")
+
+def stage(store, key, value):
+    """Stages a write in the active checkpoint, or applies it now if there is none."""
+    checkpoint = _active.get()
+    if checkpoint is None:
+        store.apply({key: value})
+        store.save()
+    else:
+        checkpoint._stage(store, key, value)
@@ -0,0 +1,119 @@
+import os
+import re
+import json
+import numpy as np
+from rapidfuzz import process, fuzz
+
+# Resolves the company names the LLM writes ("Reliance", "HUL", "Tata Consultancy
+# Services Ltd.") to the official listed name and its NSE symbol.
+#   1. exact match on the normalized name (suffixes like Limited/Ltd/India dropped)
+#   2. aliases: data/company_aliases.json and the bare ticker ("TCS", "SBIN")
+#   3. fuzzy match (rapidfuzz WRatio) against the pre-normalized names
+# Every answer is memoized, and resolve_many() fuzzy-matches all the misses
+# of a batch in one cdist call.
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+ALIASES_FILE = os.path.join(DATA_DIR, "company_aliases.json")
+
+FUZZY_THRESHOLD = 85       # Same confidence bar as the old thefuzz extractOne check
+MEMO_MAX_ENTRIES = 20000
+MIN_FUZZY_LENGTH = 4       # Applies to both sides of a fuzzy match (characters, spaces ignored)
+
+_NON_WORD = re.compile(r"[^a-z0-9& ]+")
+_WHITESPACE = re.compile(r"\s+")
+LEGAL_SUFFIXES = {"limited", "ltd", "pvt", "private", "plc", "inc", "corp", "co", "company"}
+# What the LLM writes when there is no company; never fuzzy-matched (normalized form)
+PLACEHOLDERS = {"n a", "na", "none", "null", "nil", "unknown", "not applicable", "not available",
+                "various", "multiple", "general"}
+
+def normalize_company(name):
+    """Lowercase, punctuation-free name without legal suffixes or a trailing "India"."""
+    words = _WHITESPACE.sub(" ", _NON_WORD.sub(" ", (name or "").lower())).split()
+    if words and words[0] == "the":
+        words = words[1:]
+    while words:
+        if words[-1] in LEGAL_SUFFIXES:
+            words.pop()
+        elif words[-1] == "india" and len(words) > 1 and words[-2] != "of":
+            # "Maruti Suzuki India" -> "maruti suzuki", but keep "Bank of India"
+            words.pop()
+        else:
+            break
+    return " ".join(words)
+
+class CompanyResolver:
+    def __init__(self, names, symbols, aliases=None):
+        self.names = list(names)
+        self.symbols = dict(symbols)
+        self.exact = {}
+        for name in self.names:
+            self.exact.setdefault(name, name)
+            self.exact.setdefault(normalize_company(name), name)
+        for name, symbol in self.symbols.items():
+            ticker = symbol.split(":")[-1].lower()
+            self.exact.setdefault(ticker, name)
+        for alias, name in (aliases or {}).items():
+            if name in self.symbols or name in self.names:
+                self.exact[normalize_company(alias)] = name
+        # Very short names ("t t", "3m") make WRatio's partial matching fire on
+        # almost anything; they are still reachable through the exact/alias maps.
+        self.choices = [c for c in dict.fromkeys(normalize_company(n) for n in self.names) if len(c) >= MIN_FUZZY_LENGTH]
+        self.choice_names = [self.exact[c] for c in self.choices]
+        self.memo = {}
+
+    def _lookup(self, name):
+        if name in self.exact:
+            return self.exact[name]
+        return self.exact.get(normalize_company(name))
+
+    def _remember(self, name, official):
+        if len(self.memo) >= MEMO_MAX_ENTRIES:
+            self.memo.clear()
+        result = (official or name, self.symbols.get(official))
+        self.memo[name] = result
+        return result
+
+    def resolve(self, name):
+        """(official name, "NSE:SYMBOL" or None). Unknown names come back unchanged."""
+        return self.resolve_many([name])[0]
+
+    @staticmethod
+    def fuzzy_eligible(normalized):
+        """Short queries ("LIC", "IT") and placeholders ("N/A") match unrelated names on WRatio."""
+        return len(normalized.replace(" ", "")) >= MIN_FUZZY_LENGTH and normalized not in PLACEHOLDERS
+
+    def resolve_many(self, names):
+        """resolve() for a list; all fuzzy lookups share one vectorized cdist call."""
+        results = [None] * len(names)
+        fuzzy = {}
+        for i, name in enumerate(names):
+            if not name or not self.names:
+                results[i] = (name, None)
+            elif name in self.memo:
+                results[i] = self.memo[name]
+            else:
+                official = self._lookup(name)
+                if official or not self.fuzzy_eligible(normalize_company(name)):
+                    results[i] = self._remember(name, official)
+                else:
+                    fuzzy.setdefault(name, []).append(i)
+
+        if fuzzy and self.choices:
+            queries = list(fuzzy)
+            scores = process.cdist([normalize_company(q) for q in queries], self.choices, scorer=fuzz.WRatio, dtype=np.uint8)
+            for row, query in enumerate(queries):
+                best = int(scores[row].argmax())
+                official = self.choice_names[best] if scores[row][best] >= FUZZY_THRESHOLD else None
+                result = self._remember(query, official)
+                for i in fuzzy[query]:
+                    results[i] = result
+        return results
+
+def load_aliases(path=ALIASES_FILE):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Warning: Could not load company aliases: {e}")
+        return {}
@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+
+# Embedded SQLite store (WAL mode) for the service's state: published alerts,
+# processed links, registered devices, run cursors and the Hacker News item
+# cache. Every write touches only the rows that changed and runs in a single
+# transaction, so a crash leaves the previous state intact instead of a
+# half-written JSON file.
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+DB_FILE = os.path.join(DATA_DIR, "alpha_impact.db")
+
+# JSON files used before the database, next to the database file; imported
+# once, then renamed to *.migrated
+LEGACY_ALERTS_FILE = "cached_alerts.json"
+LEGACY_PROCESSED_FILE = "processed_links.json"
+LEGACY_DEVICES_FILE = "devices.json"
+LEGACY_LAST_RUN_FILE = "last_run_time.json"
+LEGACY_SEEN_LINKS_DIR = "seen_links"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id TEXT PRIMARY KEY,
+    rank REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alerts_rank ON alerts (rank);
+CREATE TABLE IF NOT EXISTS seen_links (
+    link TEXT PRIMARY KEY,
+    bucket INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS seen_links_bucket ON seen_links (bucket);
+CREATE TABLE IF NOT EXISTS devices (
+    player_id TEXT PRIMARY KEY,
+    registered REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hn_items (
+    id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    fetched REAL NOT NULL
+);
+"""
+
+class Database:
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.data_dir = os.path.dirname(path)
+        os.makedirs(self.data_dir, exist_ok=True)
+        # Autocommit mode; writes are grouped explicitly with transaction()
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.saved_alerts = {}   # alert id -> (rank, serialized data) as last written
+        self.migrate_legacy_files()
+
+    @contextmanager
+    def transaction(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    # --- Alerts ---
+
+    def load_alerts(self):
+        alerts = []
+        self.saved_alerts = {}
+        for alert_id, rank, data in self.conn.execute("SELECT id, rank, data FROM alerts ORDER BY rank"):
+            self.saved_alerts[alert_id] = (rank, data)
+            alerts.append(json.loads(data))
+        return alerts
+
+    @staticmethod
+    def alert_id(alert):
+        return alert.get('id') or alert.get('link')
+
+    def _ranks(self, ids):
+        """
+        Ranks that keep ids in list order while reusing every stored rank that
+        still fits. New alerts are prepended each cycle, so normally only their
+        rows are written; a reordering of stored alerts renumbers everything.
+        """
+        ranks = [self.saved_alerts[i][0] if i in self.saved_alerts else None for i in ids]
+        known = [r for r in ranks if r is not None]
+        if any(a >= b for a, b in zip(known, known[1:])):
+            return [float(n) for n in range(len(ids))]
+        for n, rank in enumerate(ranks):
+            if rank is not None:
+                continue
+            prev = ranks[n - 1] if n else None
+            following = next((r for r in ranks[n + 1:] if r is not None), None)
+            if prev is None:
+                rank = following - 1.0 if following is not None else 0.0
+            elif following is None:
+                rank = prev + 1.0
+            else:
+                rank = (prev + following) / 2
+                if not prev < rank < following:
+                    return [float(n) for n in range(len(ids))]
+            ranks[n] = rank
+        return ranks
+
+    def save_alerts(self, alerts):
+        """Writes only the alerts that are new, changed or moved, and deletes dropped ones."""
+        try:
+            self.write_alerts(alerts)
+        except Exception as e:
+            print(f"ERROR saving alerts: {e}")
+
+    def write_alerts(self, alerts):
+        """save_alerts, but raises if the transaction fails."""
+        alerts = [a for a in alerts if self.alert_id(a)]
+        ids = [self.alert_id(a) for a in alerts]
+        ranks = self._ranks(ids)
+        rows = {}
+        for alert_id, rank, alert in zip(ids, ranks, alerts):
+            data = json.dumps(alert)
+            if self.saved_alerts.get(alert_id) != (rank, data):
+                rows[alert_id] = (rank, data)
+        current = set(ids)
+        removed = [i for i in self.saved_alerts if i not in current]
+        if not rows and not removed:
+            return
+        with self.transaction() as conn:
+            conn.executemany("DELETE FROM alerts WHERE id = ?", [(i,) for i in removed])
+            conn.executemany("INSERT OR REPLACE INTO alerts (id, rank, data) VALUES (?, ?, ?)",
+                             [(i, rank, data) for i, (rank, data) in rows.items()])
+        for i in removed:
+            del self.saved_alerts[i]
+        self.saved_alerts.update(rows)
+
+    # --- Seen links ---
+
+    def load_seen_links(self, oldest_bucket):
+        return self.conn.execute("SELECT link, bucket FROM seen_links WHERE bucket >= ?", (oldest_bucket,))
+
+    def has_seen_link(self, link):
+        return self.conn.execute("SELECT 1 FROM seen_links WHERE link = ?", (link,)).fetchone() is not None
+
+    def add_seen_links(self, rows):
+        """rows: (link, bucket) pairs."""
+        with self.transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO seen_links (link, bucket) VALUES (?, ?)", rows)
+
+    def expire_seen_links(self, oldest_bucket):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM seen_links WHERE bucket < ?", (oldest_bucket,))
+
+    # --- Devices ---
+
+    def load_devices(self):
+        return {row[0] for row in self.conn.execute("SELECT player_id FROM devices")}
+
+    def add_device(self, player_id):
+        try:
+            with self.transaction() as conn:
+                conn.execute("INSERT OR IGNORE INTO devices (player_id, registered) VALUES (?, ?)", (player_id, time.time()))
+        except Exception as e:
+            print(f"ERROR saving device: {e}")
+
+    # --- Run cursors ---
+
+    def get_cursor(self, name, default=None):
+        row = self.conn.execute("SELECT value FROM cursors WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_cursors(self, values):
+        """Stores several cursors ({name: JSON-serializable value}) in one transaction."""
+        try:
+            with self.transaction() as conn:
+                conn.executemany("INSERT OR REPLACE INTO cursors (name, value, updated) VALUES (?, ?, ?)",
+                                 [(name, json.dumps(value), time.time()) for name, value in values.items()])
+        except Exception as e:
+            print(f"ERROR saving cursors: {e}")
+
+    def set_cursor(self, name, value):
+        self.set_cursors({name: value})
+
+    # --- Hacker News items ---
+
+    def load_hn_items(self, ids):
+        """{id: item} for the ids already cached."""
+        ids = list(ids)
+        rows = self.conn.execute(f"SELECT id, data FROM hn_items WHERE id IN ({','.join('?' * len(ids))})", ids)
+        return {item_id: json.loads(data) for item_id, data in rows}
+
+    def add_hn_items(self, items):
+        """items: HN item dicts (with 'id')."""
+        with self.transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO hn_items (id, data, fetched) VALUES (?, ?, ?)",
+                             [(item['id'], json.dumps(item), time.time()) for item in items])
+
+    def prune_hn_items(self, keep_ids, older_than):
+        """Forgets items fetched before older_than, except keep_ids."""
+        keep_ids = list(keep_ids)
+        with self.transaction() as conn:
+            conn.execute(f"DELETE FROM hn_items WHERE fetched < ? AND id NOT IN ({','.join('?' * len(keep_ids))})",
+                         [older_than] + keep_ids)
+
+    # --- One-time migration ---
+
+    def migrate_legacy_files(self):
+        """
+        Imports each legacy file in its own transaction and renames it to
+        *.migrated only after that transaction has committed. A file whose
+        import fails stays in place and is retried on the next start; every
+        import is idempotent, so a crash between commit and rename is harmless.
+        """
+        def read_json(path):
+            with open(path, "r") as f:
+                return json.load(f)
+
+        def import_devices(devices):
+            with self.transaction() as conn:
+                conn.executemany("INSERT OR IGNORE INTO devices (player_id, registered) VALUES (?, ?)",
+                                 [(d, time.time()) for d in devices])
+
+        def import_last_run(data):
+            if data.get("last_run_time"):
+                with self.transaction() as conn:
+                    conn.execute("INSERT OR REPLACE INTO cursors (name, value, updated) VALUES (?, ?, ?)",
+                                 ("last_run_time", json.dumps(data["last_run_time"]), time.time()))
+
+        def import_alerts(alerts):
+            self.load_alerts()
+            self.write_alerts(alerts)
+
+        # Processed links carry no timestamp; they count as seen today
+        bucket = int(time.time() // 86400)
+        steps = [
+            (LEGACY_ALERTS_FILE, import_alerts),
+            (LEGACY_DEVICES_FILE, import_devices),
+            (LEGACY_LAST_RUN_FILE, import_last_run),
+            (LEGACY_PROCESSED_FILE, lambda links: self.add_seen_links([(link, bucket) for link in links])),
+        ]
+        for name, import_file in steps:
+            path = os.path.join(self.data_dir, name)
+            if not os.path.exists(path):
+                continue
+            try:
+                import_file(read_json(path))
+                os.replace(path, path + ".migrated")
+                print(f"DEBUG: Migrated {name} into {os.path.basename(self.path)}")
+            except Exception as e:
+                print(f"ERROR migrating {name} (left in place, retried on next start): {e}")
+
+        seen_links_dir = os.path.join(self.data_dir, LEGACY_SEEN_LINKS_DIR)
+        if not os.path.isdir(seen_links_dir):
+            return
+        for name in sorted(os.listdir(seen_links_dir)):
+            log_file = os.path.join(seen_links_dir, name)
+            try:
+                if name.endswith(".log"):
+                    with open(log_file, "r", encoding="utf-8") as f:
+                        self.add_seen_links([(line.rstrip("\n"), int(name[:-4])) for line in f if line.strip()])
+                os.remove(log_file)
+            except Exception as e:
+                print(f"ERROR migrating seen_links/{name} (left in place, retried on next start): {e}")
+        try:
+            os.rmdir(seen_links_dir)
+            print(f"DEBUG: Migrated seen_links/ into {os.path.basename(self.path)}")
+        except OSError:
+            pass
+
+class LazyDatabase:
+    """
+    The shared Database, opened on first use: importing a module that uses
+    `db` does not create (or migrate) the database file. Tests point it at a
+    temporary file with open(path).
+    """
+    def __init__(self):
+        self._db = None
+
+    def open(self, path=None):
+        self.close()
+        self._db = Database(path or DB_FILE)
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.conn.close()
+            self._db = None
+
+    def __getattr__(self, name):
+        if self._db is None:
+            self.open()
+        return getattr(self._db, name)
+
+db = LazyDatabase()
@@ -0,0 +1,155 @@
+import os
+import re
+import json
+from collections import deque
+from services.company_resolver import normalize_company, load_aliases, LEGAL_SUFFIXES
+
+# Finds every listed-company mention in a headline in one pass over the text.
+# Names, their suffix-free forms and aliases are matched case-insensitively;
+# NSE tickers and short all-caps names ("TCS", "ITC", "HUL") only when they are
+# written in capitals, so "Page" or "Idea" in ordinary prose don't count.
+# Patterns and text are both reduced to space-separated words with a space on
+# either side, so a match always lines up with word boundaries.
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+MIN_NAME_LENGTH = 4        # Shorter case-insensitive names are too ambiguous
+MIN_TICKER_LENGTH = 3
+# Tickers that are also everyday capitalised words in headlines
+TICKER_STOPLIST = {"IDEA", "ONE", "NEW", "CEO", "IPO", "GDP", "RBI", "SEBI", "USA", "THE", "AND", "FOR", "BUY", "SELL"}
+
+_NON_ALNUM = re.compile(r"[^A-Za-z0-9]+")
+
+def _words(text):
+    return " " + " ".join(_NON_ALNUM.sub(" ", text).split()) + " "
+
+class AhoCorasick:
+    """Multi-pattern string matcher: build once, then scan text in linear time."""
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        self.built = False
+
+    def add(self, pattern, value):
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        self.out[node].append((len(pattern), value))
+        self.built = False
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0) if node else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+        self.built = True
+
+    def finditer(self, text):
+        """Yields (start, end, value) for every occurrence, overlapping ones included."""
+        if not self.built:
+            self.build()
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for length, value in self.out[node]:
+                yield i + 1 - length, i + 1, value
+
+class MentionExtractor:
+    def __init__(self, names, symbols, aliases=None):
+        self.symbols = dict(symbols)
+        self.folded = AhoCorasick()       # Lowercased names and aliases
+        self.exact_case = AhoCorasick()   # Tickers and short all-caps names
+        known = set(names)
+        for name in list(names) + [n for n in self.symbols if n not in known]:
+            self._add_name(name, name)
+            full = _words(name.lower()).split()
+            legal = list(full)
+            while len(legal) > 1 and legal[-1] in LEGAL_SUFFIXES:
+                legal.pop()
+            if legal != full:
+                self._add_name(" ".join(legal), name)
+            # "Coal India" -> "coal" is an ordinary word; only keep single-word
+            # short forms when just a legal suffix was removed
+            stripped = _words(normalize_company(name)).split()
+            if stripped and stripped != legal and len(stripped) > 1:
+                self._add_name(" ".join(stripped), name)
+        for name, symbol in self.symbols.items():
+            ticker = symbol.split(":")[-1]
+            if len(ticker) >= MIN_TICKER_LENGTH and ticker not in TICKER_STOPLIST:
+                self.exact_case.add(_words(ticker), name)
+        for alias, name in (aliases or {}).items():
+            if name in self.symbols or name in known:
+                self._add_name(alias, name)
+
+    def _add_name(self, text, name):
+        words = _words(text)
+        if len(words.strip()) >= MIN_NAME_LENGTH:
+            self.folded.add(words.lower(), name)
+        elif text.isupper() and len(words.strip()) >= 2:
+            self.exact_case.add(words, name)
+
+    def mentions(self, text):
+        """
+        Companies mentioned in text, in order of first appearance:
+        [(official name, "NSE:SYMBOL" or None)]. Overlapping matches keep the
+        longest ("Tata Motors Passenger Vehicles" over "Tata Motors").
+        """
+        words = _words(text or "")
+        hits = list(self.folded.finditer(words.lower()))
+        letters = [c for c in words if c.isalpha()]
+        # An all-caps headline would make every word look like a ticker
+        if letters and sum(c.isupper() for c in letters) < 0.6 * len(letters):
+            hits += self.exact_case.finditer(words)
+
+        # Leftmost-longest, non-overlapping. Patterns carry their boundary
+        # spaces, so adjacent matches share one space character.
+        hits.sort(key=lambda h: (h[0], -(h[1] - h[0])))
+        found, end = [], 0
+        for start, stop, name in hits:
+            if start + 1 < end:
+                continue
+            end = stop
+            if name not in found:
+                found.append(name)
+        return [(name, self.symbols.get(name)) for name in found]
+
+    def first(self, text):
+        """(name, symbol) of the first company mentioned, or (None, None)."""
+        found = self.mentions(text)
+        return found[0] if found else (None, None)
+
+_extractor = None
+
+def get_mention_extractor():
+    """Shared extractor built from data/company_names.json, company_symbols.json and aliases."""
+    global _extractor
+    if _extractor is None:
+        names, symbols = [], {}
+        try:
+            names_path = os.path.join(DATA_DIR, "company_names.json")
+            if os.path.exists(names_path):
+                with open(names_path, "r", encoding="utf-8") as f:
+                    names = json.load(f)
+            symbols_path = os.path.join(DATA_DIR, "company_symbols.json")
+            if os.path.exists(symbols_path):
+                with open(symbols_path, "r", encoding="utf-8") as f:
+                    symbols = json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not load company data for mention extraction: {e}")
+        _extractor = MentionExtractor(names, symbols, load_aliases())
+    return _extractor
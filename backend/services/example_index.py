@@ -0,0 +1,97 @@
+import re
+import json
+import math
+import heapq
+
+# Inverted index over the training examples used as few-shot prompts.
+# Examples are tokenized once when added; a query only touches the postings
+# of its own terms and keeps the best k with a heap, so retrieval cost grows
+# with the query, not with the size of the dataset. Each example's JSON
+# snippet is serialized once here instead of on every prompt build.
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_ALERT_ID = re.compile(r"\s*\[Alert ID: \d+\]\s*$")
+# Examples carrying these get today's date injected, so they can't be pre-serialized
+DATE_FIELDS = ("event_date", "impact_date_est")
+STOPWORDS = {
+    "the", "and", "for", "with", "from", "that", "this", "are", "was", "has", "have",
+    "its", "his", "her", "after", "over", "into", "amid", "says", "said", "will", "new",
+}
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall((text or "").lower()) if len(t) > 2 and t not in STOPWORDS]
+
+class ExampleIndex:
+    def __init__(self, examples=()):
+        self.examples = []
+        self.snippets = []
+        self.doc_lengths = []
+        self.total_length = 0
+        self.postings = {}   # term -> {doc_id: term frequency}
+        for ex in examples:
+            self.add(ex)
+
+    def __len__(self):
+        return len(self.examples)
+
+    def add(self, ex):
+        """Indexes one example; safe to call at any time as the dataset grows."""
+        doc_id = len(self.examples)
+        text = " ".join([
+            ex.get('event', ''), ex.get('company', ''), ex.get('sector', ''),
+            ex.get('reason', ''), _ALERT_ID.sub("", ex.get('news', '')),
+        ])
+        tokens = tokenize(text)
+        counts = {}
+        for t in tokens:
+            counts[t] = counts.get(t, 0) + 1
+        for t, tf in counts.items():
+            self.postings.setdefault(t, {})[doc_id] = tf
+
+        self.examples.append(ex)
+        self.snippets.append(None if any(f in ex for f in DATE_FIELDS) else json.dumps(ex))
+        self.doc_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        return doc_id
+
+    def search(self, query, k=3, pad=True):
+        """
+        Doc ids of the k best BM25 matches, best first. Ties (and, with pad, a
+        query with too few matches) fall back to dataset order, as the old
+        linear scan did.
+        """
+        n = len(self.examples)
+        if not n:
+            return []
+        avg_length = self.total_length / n or 1.0
+        scores = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        best = [doc_id for _, doc_id in heapq.nsmallest(k, ((-s, d) for d, s in scores.items()))]
+        for doc_id in range(n if pad else 0):
+            if len(best) >= k:
+                break
+            if doc_id not in scores:
+                best.append(doc_id)
+        return best
+
+    def snippet(self, doc_id, current_date):
+        """JSON for the prompt; examples with date fields are re-dumped with today's date."""
+        snippet = self.snippets[doc_id]
+        if snippet is not None:
+            return snippet
+        ex = dict(self.examples[doc_id])
+        for field in DATE_FIELDS:
+            if field in ex:
+                ex[field] = current_date
+        return json.dumps(ex)
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+from services.checkpoint import stage
+
+# Per-feed HTTP validators (ETag / Last-Modified) plus a hash of the last body
+# we parsed. Lets pollers send conditional GETs and skip parsing feeds that
+# have not changed since the previous cycle. Each consumer (and so each
+# process) has its own namespace and file: a feed polled by both the analysis
+# service and the impact collector must look "changed" to each of them.
+# New validators are staged in the active checkpoint and only saved once the
+# headlines parsed from that body have been handed off.
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+class FeedCache:
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.path = os.path.join(DATA_DIR, f"feed_cache_{namespace}.json")
+        self.validators = self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"ERROR loading feed cache ({self.namespace}): {e}")
+        return {}
+
+    def save(self):
+        try:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.validators, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"ERROR saving feed cache ({self.namespace}): {e}")
+
+    def apply(self, entries):
+        self.validators.update(entries)
+
+    def conditional_headers(self, url):
+        """Returns the If-None-Match / If-Modified-Since headers for a known feed."""
+        entry = self.validators.get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def body_changed(self, url, response):
+        """
+        Stages the validators from a 200/304 response.
+        Returns False on a 304 or when the body hashes to the same value as last time.
+        """
+        if response.status_code == 304:
+            return False
+
+        body_hash = hashlib.sha1(response.content).hexdigest()
+        changed = self.validators.get(url, {}).get("hash") != body_hash
+        stage(self, url, {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "hash": body_hash
+        })
+        return changed
+
+    async def conditional_get(self, client, url, headers=None, **kwargs):
+        """
+        GETs a feed with the stored validators.
+        Returns (response, changed); changed is False when the feed can be skipped.
+        """
+        request_headers = dict(headers or {})
+        request_headers.update(self.conditional_headers(url))
+        response = await client.get(url, headers=request_headers, **kwargs)
+        if response.status_code not in (200, 304):
+            return response, False
+        return response, self.body_changed(url, response)
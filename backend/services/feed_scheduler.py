@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import random
+import statistics
+
+# Adaptive per-feed polling: every feed gets its own interval, learned from the
+# gaps between the entry timestamps it publishes (remembered across polls,
+# since a cursor-filtered poll usually returns only one or two), and bounded so the fleet as a
+# whole never sends more HTTP requests than the old fixed 2-hour sweep did.
+# Jobs are weighted by their request cost (Reddit is one request per subreddit,
+# a single RSS feed is one).
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+SCHEDULE_FILE = os.path.join(DATA_DIR, "feed_schedule.json")
+
+MIN_POLL_INTERVAL = 180           # 3 minutes
+MAX_POLL_INTERVAL = 6 * 3600      # 6 hours
+DEFAULT_POLL_INTERVAL = 1800      # Starting point until a cadence is learned
+LEGACY_SWEEP_INTERVAL = 7200      # The old background_scheduler period
+POLL_FACTOR = 0.5                 # Poll twice per expected new entry
+CADENCE_SAMPLE = 10               # Newest N entry timestamps used to estimate cadence
+BACKOFF = 1.5                     # Stretch interval when a poll finds nothing
+JITTER = 0.15                     # +/- 15% to avoid thundering herds per host
+
+class FeedScheduler:
+    def __init__(self, budget_per_hour=None):
+        self.feeds = {}
+        self.learned = self.load_schedule()
+        # Total HTTP requests/hour across all jobs; defaults to what the fixed sweep cost
+        self.budget_per_hour = budget_per_hour
+
+    def load_schedule(self):
+        if os.path.exists(SCHEDULE_FILE):
+            try:
+                with open(SCHEDULE_FILE, "r") as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"ERROR loading feed schedule: {e}")
+        return {}
+
+    def save_schedule(self):
+        try:
+            os.makedirs(os.path.dirname(SCHEDULE_FILE), exist_ok=True)
+            tmp_path = SCHEDULE_FILE + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({key: {"interval": state["interval"], "recent": state["recent"]}
+                           for key, state in self.feeds.items()}, f, indent=2)
+            os.replace(tmp_path, SCHEDULE_FILE)
+        except Exception as e:
+            print(f"ERROR saving feed schedule: {e}")
+
+    def add_feed(self, key, fetch, min_interval=MIN_POLL_INTERVAL, max_interval=MAX_POLL_INTERVAL, cost=1):
+        """
+        Registers a poll job. fetch is a zero-argument coroutine function
+        returning headlines; cost is the number of HTTP requests one poll makes.
+        """
+        learned = self.learned.get(key, {})
+        if not isinstance(learned, dict):
+            learned = {"interval": learned}    # Schedule files that stored only the interval
+        interval = learned.get("interval", DEFAULT_POLL_INTERVAL)
+        self.feeds[key] = {
+            "fetch": fetch,
+            "cost": cost,
+            "interval": min(max(interval, min_interval), max_interval),
+            "recent": learned.get("recent", []),    # Newest entry timestamps seen, newest first
+            "min_interval": min_interval,
+            "max_interval": max_interval,
+            # Stagger the first round so all feeds don't fire in the same second
+            "next_poll": time.time() + random.uniform(0, 30),
+        }
+
+    def _budget(self):
+        if self.budget_per_hour:
+            return self.budget_per_hour
+        return sum(s["cost"] for s in self.feeds.values()) * 3600 / LEGACY_SWEEP_INTERVAL
+
+    def effective_interval(self, key):
+        """Learned interval, stretched uniformly if the fleet would exceed the request budget."""
+        state = self.feeds[key]
+        total_rate = sum(s["cost"] * 3600 / s["interval"] for s in self.feeds.values())
+        scale = max(1.0, total_rate / self._budget())
+        return min(state["interval"] * scale, state["max_interval"])
+
+    def due_feeds(self, now=None):
+        now = now or time.time()
+        return [key for key, state in self.feeds.items() if state["next_poll"] <= now]
+
+    def seconds_until_next_poll(self, now=None):
+        now = now or time.time()
+        if not self.feeds:
+            return LEGACY_SWEEP_INTERVAL
+        return max(0.0, min(state["next_poll"] for state in self.feeds.values()) - now)
+
+    def record_poll(self, key, headlines, now=None):
+        """Updates the feed's interval from the entries it just returned and schedules the next poll."""
+        now = now or time.time()
+        state = self.feeds[key]
+
+        stamps = [ts for ts in (h.get("published_ts") for h in headlines) if ts]
+        recent = sorted(set(state["recent"]) | set(stamps), reverse=True)[:CADENCE_SAMPLE]
+        state["recent"] = recent
+        gaps = [a - b for a, b in zip(recent, recent[1:]) if a - b > 0]
+
+        if len(gaps) >= 2:
+            target = statistics.median(gaps) * POLL_FACTOR
+            if not headlines:
+                # Quieter than usual: stretch towards the time since the newest entry
+                target = max(target, (now - recent[0]) * POLL_FACTOR)
+            # Smooth so one bursty batch doesn't swing the interval
+            interval = 0.5 * state["interval"] + 0.5 * target
+        elif stamps:
+            interval = state["interval"] * 0.8
+        elif headlines:
+            # New entries without publish times say nothing about cadence
+            interval = state["interval"]
+        else:
+            interval = state["interval"] * BACKOFF
+
+        state["interval"] = min(max(interval, state["min_interval"]), state["max_interval"])
+        delay = self.effective_interval(key) * random.uniform(1 - JITTER, 1 + JITTER)
+        state["next_poll"] = now + delay
+
+    async def poll(self, key):
+        """Runs one feed's fetch and reschedules it. Never raises."""
+        state = self.feeds[key]
+        try:
+            headlines = await state["fetch"]()
+        except Exception as e:
+            print(f"ERROR: Poll failed for {key}: {e}")
+            headlines = []
+        self.record_poll(key, headlines or [])
+        return headlines or []
@@ -1,44 +1,90 @@
 import httpx
+from services.http_client import get_client
+from services.database import db
+from services.source_cursors import source_cursors
+from services.timestamps import epoch_to_iso
 import asyncio
-import datetime
+import time
+
+# Incremental Hacker News ingestion. Items are cached by ID (hn_items table),
+# so a poll only downloads topstories.json plus the few stories that are new
+# to the top list; the cursor remembers which top stories were already handed
+# over, so only stories that newly reached the top list become headlines.
+HN_API = "https://hacker-news.firebaseio.com/v0"
+HN_TOP_STORIES = 50
+HN_CONCURRENCY = 8                 # Item requests in flight at once
+HN_ITEM_TTL = 3 * 86400            # Matches the 72-hour freshness window
+# Requests per poll, for the feed scheduler's budget: topstories.json plus the
+# stories that are new to the top list (typically a fifth of it between polls)
+HN_POLL_COST = 1 + HN_TOP_STORIES // 5
+
+def to_headline(item):
+    return {
+        "title": item['title'],
+        "link": item['url'],
+        "category": "TECH & STARTUP (HN)",
+        "published": epoch_to_iso(item['time']) if item.get('time') else "",
+        "published_ts": float(item['time']) if item.get('time') else None
+    }
+
+async def fetch_items(client, ids):
+    """Fetches item JSON for ids, at most HN_CONCURRENCY at a time. Failed and null items are left out."""
+    slots = asyncio.Semaphore(HN_CONCURRENCY)
+
+    async def fetch(item_id):
+        async with slots:
+            return await client.get(f"{HN_API}/item/{item_id}.json", timeout=10)
+
+    responses = await asyncio.gather(*(fetch(i) for i in ids), return_exceptions=True)
+    items = []
+    for item_id, res in zip(ids, responses):
+        if isinstance(res, httpx.Response) and res.status_code == 200:
+            try:
+                # A brand-new story can briefly come back as null; leave it out
+                # (not cached) so the next poll asks again
+                item = res.json()
+                if item:
+                    items.append(item)
+            except ValueError:
+                print(f"    -> HN item {item_id}: malformed response")
+    return items
 
 async def fetch_hacker_news_headlines():
     print("Fetching Hacker News top stories...")
     headlines = []
     try:
-        async with httpx.AsyncClient() as client:
-            print("  DEBUG: Fetching Top Stories from Hacker News...")
-            # Get top stories IDs
-            top_ids_url = "https://hacker-news.firebaseio.com/v0/topstories.json"
-            response = await client.get(top_ids_url, timeout=10)
-            
-            if response.status_code == 200:
-                story_ids = response.json()[:50] 
-                print(f"    -> Found {len(story_ids)} top stories. Fetching details...")
-                
-                tasks = []
-                for story_id in story_ids:
-                    story_url = f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json"
-                    tasks.append(client.get(story_url, timeout=10))
-                
-                story_responses = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                for res in story_responses:
-                    if isinstance(res, httpx.Response) and res.status_code == 200:
-                        story = res.json()
-                        if story and 'title' in story and 'url' in story:
-                            headlines.append({
-                                "title": story['title'],
-                                "link": story['url'],
-                                "category": "TECH & STARTUP (HN)",
-                                "published": datetime.datetime.now().isoformat() 
-                            })
-                
-                print(f"    -> Successfully fetched {len(headlines)} HN stories.")
-                return headlines
-            else:
-                print(f"    -> HN Error: {response.status_code}")
-                return []
+        client = get_client()
+        print("  DEBUG: Fetching Top Stories from Hacker News...")
+        # Get top stories IDs
+        response = await client.get(f"{HN_API}/topstories.json", timeout=10)
+
+        if response.status_code == 200:
+            story_ids = response.json()[:HN_TOP_STORIES]
+            # Real items always have a type; bare {"id"} stubs are left over from
+            # when null responses were cached, and are fetched again
+            cached = {i: item for i, item in db.load_hn_items(story_ids).items() if 'type' in item}
+            missing = [i for i in story_ids if i not in cached]
+            print(f"    -> Found {len(story_ids)} top stories; {len(missing)} not cached. Fetching details...")
+            fetched = await fetch_items(client, missing)
+            if fetched:
+                db.add_hn_items(fetched)
+                cached.update((item['id'], item) for item in fetched)
+
+            # Only stories that weren't on the top list last poll become headlines
+            cursor = source_cursors.get("hackernews")
+            already_seen = set(cursor.get("top", []))
+            for story_id in story_ids:
+                story = cached.get(story_id)
+                if story_id not in already_seen and story and 'title' in story and 'url' in story:
+                    headlines.append(to_headline(story))
+            source_cursors.update("hackernews", top=[i for i in story_ids if i in cached])
+            db.prune_hn_items(story_ids, time.time() - HN_ITEM_TTL)
+
+            print(f"    -> Successfully fetched {len(headlines)} new HN stories ({len(fetched)} item requests).")
+            return headlines
+        else:
+            print(f"    -> HN Error: {response.status_code}")
+            return []
     except Exception as e:
         print(f"    -> HN Exception: {e}")
         return []
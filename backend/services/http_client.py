@@ -0,0 +1,72 @@
+import asyncio
+import httpx
+from urllib.parse import urlparse
+
+# Process-wide pooled HTTP clients. Every service borrows a client from here
+# instead of opening its own, so connections (and TLS sessions) are kept alive
+# across calls and cycles. main.py closes them on shutdown.
+try:
+    import h2  # noqa: F401  (httpx only negotiates HTTP/2 when h2 is installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Central timeout policy. Per-call timeouts still override these where a
+# service has a stricter budget (e.g. Pass 1 vs Pass 2 LLM calls).
+CLIENT_PROFILES = {
+    # News APIs, Hacker News, Reddit, OneSignal, self-ping
+    "default": {
+        "timeout": httpx.Timeout(10.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60),
+    },
+    # RSS feeds (many hosts, conditional GETs)
+    "feeds": {
+        "timeout": httpx.Timeout(15.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=20, max_keepalive_connections=20, keepalive_expiry=120),
+        "headers": {'User-Agent': BROWSER_USER_AGENT},
+        "follow_redirects": True,
+    },
+    # Article pages for the deep dive
+    "scraper": {
+        "timeout": httpx.Timeout(15.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=30),
+        "headers": {'User-Agent': BROWSER_USER_AGENT},
+        "follow_redirects": True,
+    },
+    # OpenRouter: one host, many calls per cycle - keep the pool warm
+    "llm": {
+        "timeout": httpx.Timeout(50.0, connect=10.0),
+        "limits": httpx.Limits(max_connections=16, max_keepalive_connections=16, keepalive_expiry=300),
+    },
+}
+
+# Requests allowed in flight to a single host, across every client
+PER_HOST_LIMIT = 3
+
+_clients = {}
+_host_semaphores = {}
+
+def get_client(name="default"):
+    """Returns the shared client for a profile, creating it on first use."""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(http2=HTTP2_AVAILABLE, **CLIENT_PROFILES[name])
+        _clients[name] = client
+    return client
+
+def host_slot(url):
+    """Semaphore limiting concurrent requests to the URL's host. Use with 'async with'."""
+    host = urlparse(url).netloc
+    if host not in _host_semaphores:
+        _host_semaphores[host] = asyncio.Semaphore(PER_HOST_LIMIT)
+    return _host_semaphores[host]
+
+async def close_clients():
+    for name, client in list(_clients.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            print(f"ERROR closing HTTP client '{name}': {e}")
+    _clients.clear()
@@ -0,0 +1,180 @@
+import time
+import asyncio
+import email.utils
+
+# Rate-limit-aware API key scheduling. Each key has a token bucket (requests
+# per minute), an in-flight cap and a circuit breaker:
+#   closed    -> normal service
+#   open      -> cooling down after 429/401/errors (honours Retry-After / reset headers)
+#   half_open -> cooldown elapsed; a single trial request decides closed vs open
+# Callers get the least-loaded healthy key, so concurrent workers keep every
+# key busy without hammering one that is being throttled.
+
+KEY_RATE_PER_MINUTE = 20      # OpenRouter free-tier request rate per key
+KEY_BURST = 5                 # Bucket capacity
+MAX_IN_FLIGHT_PER_KEY = 2
+BASE_COOLDOWN = 30.0          # First breaker trip; doubles per consecutive failure
+MAX_COOLDOWN = 900.0
+AUTH_COOLDOWN = 3600.0        # 401: the key is probably invalid, check again hourly
+ACQUIRE_MAX_WAIT = 15.0       # Don't wait longer than this for a key to free up
+
+def parse_retry_after(headers, now=None):
+    """
+    Seconds until a throttled key may be used again, from Retry-After or
+    X-RateLimit-Reset (epoch ms, epoch s or delta s). None if absent.
+    """
+    now = now or time.time()
+    value = headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - now)
+            except Exception:
+                pass
+    value = headers.get("X-RateLimit-Reset")
+    if value:
+        try:
+            reset = float(value)
+        except ValueError:
+            return None
+        if reset > 1e12:
+            reset /= 1000.0
+        return max(0.0, reset - now) if reset > 1e9 else max(0.0, reset)
+    return None
+
+class KeyState:
+    def __init__(self, key, index, burst):
+        self.key = key
+        self.index = index
+        self.tokens = float(burst)
+        self.updated = time.time()
+        self.in_flight = 0
+        self.state = "closed"
+        self.open_until = 0.0
+        self.resume_at = 0.0     # Header-driven throttle (quota exhausted until reset)
+        self.failures = 0
+        self.depleted = False    # 402: no credits left for paid models
+
+    @property
+    def display(self):
+        return f"Key {self.index+1} ({self.key[:6]}...{self.key[-4:]})"
+
+class KeyScheduler:
+    def __init__(self, keys, rate_per_minute=KEY_RATE_PER_MINUTE, burst=KEY_BURST, max_in_flight=MAX_IN_FLIGHT_PER_KEY):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.keys = [KeyState(key, i, burst) for i, key in enumerate(keys) if key]
+        self.cond = asyncio.Condition()
+
+    def _refill(self, ks, now):
+        ks.tokens = min(self.burst, ks.tokens + (now - ks.updated) * self.rate)
+        ks.updated = now
+
+    def _ready_in(self, ks, paid_model, now):
+        """Seconds until this key could serve a request, or None if it can't for this model."""
+        if paid_model and ks.depleted:
+            return None
+        self._refill(ks, now)
+        if ks.state == "open":
+            if now < ks.open_until:
+                return ks.open_until - now
+            ks.state = "half_open"
+        if ks.state == "half_open" and ks.in_flight:
+            return 1.0  # A trial request is already deciding this key's fate
+        if now < ks.resume_at:
+            return ks.resume_at - now
+        if ks.in_flight >= self.max_in_flight:
+            return 1.0
+        if ks.tokens < 1:
+            return (1 - ks.tokens) / self.rate
+        return 0.0
+
+    def usable_count(self, paid_model=False):
+        now = time.time()
+        return sum(1 for ks in self.keys if self._ready_in(ks, paid_model, now) is not None and ks.state != "open")
+
+    async def acquire(self, paid_model=False, exclude=(), max_wait=ACQUIRE_MAX_WAIT):
+        """
+        Leases the least-loaded healthy key not in `exclude`. Waits up to
+        max_wait for one to free up; returns None if none can serve in time.
+        """
+        deadline = time.time() + max_wait
+        async with self.cond:
+            while True:
+                now = time.time()
+                best, soonest = None, None
+                for ks in self.keys:
+                    if ks.key in exclude:
+                        continue
+                    ready_in = self._ready_in(ks, paid_model, now)
+                    if ready_in is None:
+                        continue
+                    if ready_in == 0.0:
+                        if best is None or (ks.in_flight, -ks.tokens) < (best.in_flight, -best.tokens):
+                            best = ks
+                    elif soonest is None or ready_in < soonest:
+                        soonest = ready_in
+
+                if best:
+                    best.tokens -= 1
+                    best.in_flight += 1
+                    return best
+                if soonest is None or now + soonest > deadline:
+                    return None
+                try:
+                    await asyncio.wait_for(self.cond.wait(), timeout=soonest)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(self, ks):
+        # Decrement before the first await so a cancelled caller can't leak the slot
+        ks.in_flight -= 1
+        async with self.cond:
+            self.cond.notify_all()
+
+    def _trip(self, ks, cooldown):
+        ks.failures += 1
+        ks.state = "open"
+        ks.open_until = time.time() + cooldown
+        print(f"      >> {ks.display} circuit OPEN for {cooldown:.0f}s (failure #{ks.failures}).")
+
+    def record_success(self, ks, headers=None):
+        if ks.state != "closed":
+            print(f"      >> {ks.display} recovered; circuit CLOSED.")
+        ks.state = "closed"
+        ks.failures = 0
+        self.observe_headers(ks, headers or {})
+
+    def observe_headers(self, ks, headers):
+        """Stops using a key once its advertised quota hits zero, until the advertised reset."""
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is not None and remaining.strip() in ("0", "0.0"):
+            wait = parse_retry_after(headers)
+            if wait:
+                ks.tokens = 0.0
+                ks.resume_at = time.time() + wait
+
+    def record_rate_limit(self, ks, headers=None):
+        wait = parse_retry_after(headers or {})
+        if wait is None:
+            wait = min(MAX_COOLDOWN, BASE_COOLDOWN * (2 ** ks.failures))
+        ks.tokens = 0.0
+        self._trip(ks, wait)
+
+    def record_failure(self, ks, cooldown=None):
+        self._trip(ks, cooldown or min(MAX_COOLDOWN, BASE_COOLDOWN * (2 ** ks.failures)))
+
+    def record_depleted(self, ks):
+        ks.depleted = True
+
+    def summary(self):
+        now = time.time()
+        parts = []
+        for ks in self.keys:
+            self._refill(ks, now)
+            status = ks.state if ks.state != "open" else f"open {ks.open_until - now:.0f}s"
+            parts.append(f"K{ks.index+1}:{status}/{ks.tokens:.1f}t{'/depleted' if ks.depleted else ''}")
+        return " ".join(parts)
@@ -0,0 +1,106 @@
+import os
+import re
+import json
+import time
+import copy
+import hashlib
+from collections import OrderedDict
+
+# Disk-backed LRU cache of LLM verdicts. The same wire story comes back under
+# different URLs (syndication, Google News redirects, Reddit reposts), so
+# results are keyed by normalized headline text + model chain + prompt version.
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+LLM_CACHE_FILE = os.path.join(DATA_DIR, "llm_cache.json")
+
+LLM_CACHE_MAX_ENTRIES = 5000
+LLM_CACHE_TTL = 72 * 3600  # Matches the 72-hour freshness window in run_analysis
+
+_SOURCE_PREFIX = re.compile(r"^(r/\w+|@\w+):\s*", re.IGNORECASE)
+_PUBLISHER_SUFFIX = re.compile(r"\s+[-|–]\s+[^-|–]{2,40}$")
+_NON_WORD = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text):
+    """
+    Canonical form of a headline: drops "r/sub:" / "@account:" prefixes and a
+    trailing " - Publisher" (Google News style), lowercases and strips punctuation.
+    """
+    text = _SOURCE_PREFIX.sub("", (text or "").strip())
+    text = _PUBLISHER_SUFFIX.sub("", text)
+    text = _NON_WORD.sub(" ", text.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+class LLMCache:
+    def __init__(self, path=LLM_CACHE_FILE, max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    # Saved oldest-first, so insertion order restores the LRU order
+                    self.entries = OrderedDict(json.load(f))
+            except Exception as e:
+                print(f"ERROR loading LLM cache: {e}")
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            print(f"ERROR saving LLM cache: {e}")
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if time.time() - entry["created"] > self.ttl:
+            del self.entries[key]
+            self.dirty = True
+            self.expired += 1
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        # Callers tag and update results in place; never hand out the stored dict
+        return copy.deepcopy(entry["value"])
+
+    def put(self, key, value):
+        self.entries[key] = {"created": time.time(), "value": copy.deepcopy(value)}
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        self.dirty = True
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+llm_cache = LLMCache()
@@ -0,0 +1,67 @@
+import math
+from collections import deque
+
+# Latency-aware model routing. Keeps a rolling window of latency and outcome
+# samples per model, orders models by expected time-to-a-good-answer, and
+# tells callers when a request has run past the model's p95 so they can hedge.
+
+ROUTER_WINDOW = 50         # Samples kept per model
+ROUTER_MIN_SAMPLES = 5     # Below this, a model is not hedged and uses the prior
+PRIOR_LATENCY = 10.0       # Seconds assumed for a model we haven't measured yet
+HEDGE_QUANTILE = 0.95
+MIN_HEDGE_DELAY = 2.0      # Never hedge faster than this, even for very quick models
+
+class ModelRouter:
+    def __init__(self, models):
+        self.models = list(models)
+        self.latencies = {m: deque(maxlen=ROUTER_WINDOW) for m in self.models}
+        self.outcomes = {m: deque(maxlen=ROUTER_WINDOW) for m in self.models}
+
+    def record(self, model, latency, ok):
+        """Stores one call's latency (successful calls only) and outcome."""
+        if model not in self.outcomes:
+            self.latencies[model] = deque(maxlen=ROUTER_WINDOW)
+            self.outcomes[model] = deque(maxlen=ROUTER_WINDOW)
+        if ok:
+            self.latencies[model].append(latency)
+        self.outcomes[model].append(1 if ok else 0)
+
+    def success_rate(self, model):
+        outcomes = self.outcomes.get(model, ())
+        # Laplace smoothing so one early failure doesn't bury a model forever
+        return (sum(outcomes) + 1) / (len(outcomes) + 2)
+
+    def expected_latency(self, model):
+        """Mean successful latency divided by success rate: expected seconds until a usable answer."""
+        latencies = self.latencies.get(model, ())
+        mean = sum(latencies) / len(latencies) if latencies else PRIOR_LATENCY
+        return mean / self.success_rate(model)
+
+    def quantile(self, model, q):
+        latencies = sorted(self.latencies.get(model, ()))
+        if len(latencies) < ROUTER_MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, math.ceil(q * len(latencies)) - 1)]
+
+    def ranked_models(self):
+        """Models ordered by expected latency; configured order breaks ties."""
+        return sorted(self.models, key=lambda m: (self.expected_latency(m), self.models.index(m)))
+
+    def hedge_delay(self, model):
+        """Seconds after which a call to `model` should be hedged, or None if there's not enough data."""
+        p95 = self.quantile(model, HEDGE_QUANTILE)
+        return None if p95 is None else max(MIN_HEDGE_DELAY, p95)
+
+    def hedge_model(self, model):
+        """Best-ranked model other than `model` to send the duplicate to."""
+        for candidate in self.ranked_models():
+            if candidate != model:
+                return candidate
+        return None
+
+    def summary(self):
+        parts = []
+        for m in self.ranked_models():
+            p95 = self.quantile(m, HEDGE_QUANTILE)
+            parts.append(f"{m}: exp {self.expected_latency(m):.1f}s, p95 {'n/a' if p95 is None else f'{p95:.1f}s'}, ok {self.success_rate(m):.0%}")
+        return "; ".join(parts)
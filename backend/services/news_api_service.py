@@ -1,4 +1,6 @@
-import httpx
+from services.http_client import get_client
+from services.timestamps import parse_timestamp
+from services.source_cursors import source_cursors
 import os
 import asyncio
 from dotenv import load_dotenv
@@ -12,27 +14,28 @@ async def fetch_news_api_headlines():
     url = f'https://newsapi.org/v2/top-headlines?country=us&apiKey={NEWS_API_KEY}'
     print("Fetching NewsAPI feeds...")
     try:
-        async with httpx.AsyncClient() as client:
-            print(f"  DEBUG: Querying NewsAPI for top US headlines...") # Modified print statement
-            response = await client.get(url, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                articles = data.get('articles', [])
-                print(f"    -> NewsAPI returned {len(articles)} articles.") # Added print statement
-                headlines = []
-                for article in articles:
-                    if article.get('title') and article.get('url'):
-                        headlines.append({
-                            "title": article['title'],
-                            "link": article['url'],
-                            "category": "US TOP HEADLINES",
-                            "published": article.get('publishedAt', '')
-                        })
-                print(f"Fetched {len(headlines)} headlines from NewsAPI.")
-                return headlines
-            else:
-                print(f"    -> NewsAPI Error: {response.status_code} - {response.text}") # Modified print statement
-                return []
+        client = get_client()
+        print(f"  DEBUG: Querying NewsAPI for top US headlines...") # Modified print statement
+        response = await client.get(url, timeout=10)
+        if response.status_code == 200:
+            data = response.json()
+            articles = data.get('articles', [])
+            print(f"    -> NewsAPI returned {len(articles)} articles.") # Added print statement
+            headlines = []
+            for article, published_ts in source_cursors.take_newer("newsapi", articles, lambda a: parse_timestamp(a.get('publishedAt'))):
+                if article.get('title') and article.get('url'):
+                    headlines.append({
+                        "title": article['title'],
+                        "link": article['url'],
+                        "category": "US TOP HEADLINES",
+                        "published": article.get('publishedAt', ''),
+                        "published_ts": published_ts
+                    })
+            print(f"Fetched {len(headlines)} headlines from NewsAPI.")
+            return headlines
+        else:
+            print(f"    -> NewsAPI Error: {response.status_code} - {response.text}") # Modified print statement
+            return []
     except Exception as e:
         print(f"Exception fetching NewsAPI: {e}")
         return []
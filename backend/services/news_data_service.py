@@ -1,4 +1,6 @@
-import httpx
+from services.http_client import get_client
+from services.timestamps import parse_timestamp
+from services.source_cursors import source_cursors
 import os
 import asyncio
 from dotenv import load_dotenv
@@ -14,29 +16,30 @@ async def fetch_news_data_headlines():
     try:
         # User provided link with space, fixing it
         url = url.replace(" ", "")
-        async with httpx.AsyncClient() as client:
-            print(f"  DEBUG: Querying NewsData.io for 'Indian Economy'...")
-            response = await client.get(url, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                results = data.get('results', [])
-                print(f"    -> NewsData returned {len(results)} results.")
+        client = get_client()
+        print(f"  DEBUG: Querying NewsData.io for 'Indian Economy'...")
+        response = await client.get(url, timeout=10)
+        if response.status_code == 200:
+            data = response.json()
+            results = data.get('results', [])
+            print(f"    -> NewsData returned {len(results)} results.")
                 
-                headlines = []
-                for result in results:
-                    if result.get('title') and result.get('link'):
-                        headlines.append({
-                            "title": result['title'],
-                            "link": result['link'],
-                            "category": "GLOBAL LATEST (NEWSDATA)",
-                            "published": result.get('pubDate', '')
-                        })
-                print(f"Fetched {len(headlines)} headlines from NewsData.io.")
-                return headlines
-            else:
-                print(f"Error fetching NewsData.io: {response.status_code}")
-                print(f"Response: {response.text}")
-                return []
+            headlines = []
+            for result, published_ts in source_cursors.take_newer("newsdata", results, lambda r: parse_timestamp(r.get('pubDate'))):
+                if result.get('title') and result.get('link'):
+                    headlines.append({
+                        "title": result['title'],
+                        "link": result['link'],
+                        "category": "GLOBAL LATEST (NEWSDATA)",
+                        "published": result.get('pubDate', ''),
+                        "published_ts": published_ts
+                    })
+            print(f"Fetched {len(headlines)} headlines from NewsData.io.")
+            return headlines
+        else:
+            print(f"Error fetching NewsData.io: {response.status_code}")
+            print(f"Response: {response.text}")
+            return []
     except Exception as e:
         print(f"Exception fetching NewsData.io: {e}")
         return []
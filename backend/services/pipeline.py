@@ -0,0 +1,137 @@
+import asyncio
+import re
+from services.timestamps import parse_timestamp
+
+# Streaming building blocks for run_analysis: sources are async iterables of
+# headline dicts, merged so downstream stages (filters, Pass 1) see each
+# headline as soon as its source has parsed it.
+
+_WHITESPACE = re.compile(r"\s+")
+_DONE = object()
+
+async def from_list(items):
+    """Turns a plain list of headlines into a stream."""
+    for item in items:
+        yield item
+
+async def from_fetcher(fetch):
+    """Wraps a coroutine function that returns a full list (API sources) as a stream."""
+    for item in await fetch():
+        yield item
+
+async def merge_streams(*streams):
+    """
+    Interleaves several headline streams, yielding items in arrival order.
+    A failing source is logged and dropped; the others keep flowing.
+    """
+    queue = asyncio.Queue()
+
+    async def pump(stream):
+        try:
+            async for item in stream:
+                await queue.put(item)
+        except Exception as e:
+            print(f"ERROR: Source failed: {e}")
+        finally:
+            await queue.put(_DONE)
+
+    tasks = [asyncio.create_task(pump(stream)) for stream in streams]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            item = await queue.get()
+            if item is _DONE:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def ordered_map(func, items, concurrency):
+    """
+    Runs func over a stream with at most `concurrency` calls in flight and
+    yields (item, result) pairs in input order.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    queue = asyncio.Queue()
+    tasks = []
+
+    async def run(item):
+        try:
+            return await func(item)
+        finally:
+            slots.release()
+
+    async def feed():
+        try:
+            async for item in items:
+                await slots.acquire()
+                task = asyncio.create_task(run(item))
+                tasks.append(task)
+                await queue.put((item, task))
+        except Exception as e:
+            print(f"ERROR: Stream failed: {e}")
+        finally:
+            await queue.put(_DONE)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while True:
+            entry = await queue.get()
+            if entry is _DONE:
+                break
+            item, task = entry
+            yield item, await task
+    finally:
+        feeder.cancel()
+        for task in tasks:
+            task.cancel()
+
+async def batched(items, size, linger=2.0):
+    """
+    Groups a stream into lists of up to size() items (size is re-read for
+    every batch so callers can adapt it). A partial batch is flushed once
+    the stream has been idle for `linger` seconds.
+    """
+    queue = asyncio.Queue()
+
+    async def pump():
+        try:
+            async for item in items:
+                await queue.put(item)
+        except Exception as e:
+            print(f"ERROR: Stream failed: {e}")
+        finally:
+            await queue.put(_DONE)
+
+    pumper = asyncio.create_task(pump())
+    batch = []
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=linger if batch else None)
+            except asyncio.TimeoutError:
+                yield batch
+                batch = []
+                continue
+            if item is _DONE:
+                break
+            batch.append(item)
+            if len(batch) >= size():
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        pumper.cancel()
+
+def normalize_headline(h):
+    """Collapses whitespace in title/link and guarantees the keys later stages rely on."""
+    h['title'] = _WHITESPACE.sub(" ", h.get('title') or "").strip()
+    h['link'] = (h.get('link') or "").strip()
+    h['published'] = h.get('published') or ""
+    if 'published_ts' not in h:
+        # Adapters set this at ingestion; parse here only for headlines that arrive without it
+        h['published_ts'] = parse_timestamp(h['published'])
+    return h
@@ -0,0 +1,241 @@
+import os
+import re
+import json
+import time
+import zlib
+import random
+from collections import deque
+import numpy as np
+from services.llm_cache import normalize_text
+
+# Local pre-filter in front of Pass 1. A hashed word n-gram logistic
+# regression scores each headline; anything scoring below the recall
+# threshold is dropped as "no impact" without an LLM round-trip.
+#
+# Training data: training_data.jsonl (impactful examples only) plus every
+# fresh Pass 1 verdict, which is appended to llm_verdicts.jsonl (capped at the
+# newest VERDICT_LOG_MAX lines). Until enough
+# "no impact" verdicts have been logged no model exists and every headline
+# goes to the LLM. Retrain with: python utils/train_prefilter.py
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+TRAINING_DATA_FILE = os.path.join(DATA_DIR, "training_data.jsonl")
+VERDICT_LOG_FILE = os.path.join(DATA_DIR, "llm_verdicts.jsonl")
+MODEL_FILE = os.path.join(DATA_DIR, "prefilter_model.npz")
+
+HASH_BITS = 18
+N_FEATURES = 1 << HASH_BITS
+VERDICT_LOG_MAX = int(os.environ.get("VERDICT_LOG_MAX", "50000"))   # Newest verdicts kept for retraining
+VERDICT_LOG_SLACK = 0.1    # Compact once the log is this much over the cap, not on every write
+MIN_NEGATIVES = 200        # Don't train on fewer logged "no impact" verdicts than this
+MIN_CALIBRATION_POSITIVES = 50
+VALIDATION_SPLIT = 0.2
+EPOCHS = 8
+LEARNING_RATE = 0.5
+L2 = 1e-6
+
+# Fraction of impactful validation headlines that must still reach the LLM.
+# Read at load time, so it can be tuned without retraining.
+PREFILTER_RECALL = float(os.environ.get("PREFILTER_RECALL", "0.97"))
+# Share of filtered headlines sent to the LLM anyway; their verdicts are
+# logged, so misses show up in the next retraining run.
+PREFILTER_AUDIT_RATE = float(os.environ.get("PREFILTER_AUDIT_RATE", "0.05"))
+
+_ALERT_ID = re.compile(r"\s*\[Alert ID: \d+\]\s*$")
+
+def features(text):
+    """Hashed unigram + bigram indices of the normalized headline."""
+    words = normalize_text(_ALERT_ID.sub("", text or "")).split()
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) & (N_FEATURES - 1) for g in grams), dtype=np.int64, count=len(grams)))
+
+def _score(weights, bias, idx):
+    if len(idx) == 0:
+        return 1.0 / (1.0 + np.exp(-bias))
+    z = weights[idx].sum() / np.sqrt(len(idx)) + bias
+    return 1.0 / (1.0 + np.exp(-z))
+
+_verdict_lines = None    # Lines in VERDICT_LOG_FILE, counted on the first write
+
+def compact_verdict_log(keep=None):
+    """Rewrites the verdict log with only its newest `keep` lines. Returns the number kept."""
+    keep = keep or VERDICT_LOG_MAX
+    with open(VERDICT_LOG_FILE, "r") as f:
+        lines = deque(f, maxlen=keep)
+    tmp_path = VERDICT_LOG_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.writelines(lines)
+    os.replace(tmp_path, VERDICT_LOG_FILE)
+    return len(lines)
+
+def log_verdict(headline_text, analysis):
+    """Appends a fresh LLM Pass 1 verdict to the training log, dropping the oldest past VERDICT_LOG_MAX."""
+    global _verdict_lines
+    try:
+        if _verdict_lines is None:
+            _verdict_lines = 0
+            if os.path.exists(VERDICT_LOG_FILE):
+                with open(VERDICT_LOG_FILE, "r") as f:
+                    _verdict_lines = sum(1 for _ in f)
+        with open(VERDICT_LOG_FILE, "a") as f:
+            f.write(json.dumps({"news": headline_text, "impact": (analysis.get("impact") or "").lower(), "ts": int(time.time())}) + "\n")
+        _verdict_lines += 1
+        if _verdict_lines > VERDICT_LOG_MAX * (1 + VERDICT_LOG_SLACK):
+            _verdict_lines = compact_verdict_log()
+    except Exception as e:
+        print(f"ERROR logging LLM verdict: {e}")
+
+def load_labelled_headlines():
+    """
+    (text, label, logged) triples: label 1 = some impact, 0 = "no impact";
+    logged is True for real LLM verdicts. Logged verdicts override earlier rows.
+    """
+    labels = {}
+    if os.path.exists(TRAINING_DATA_FILE):
+        with open(TRAINING_DATA_FILE, "r") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                text = _ALERT_ID.sub("", row.get("news", ""))
+                if text:
+                    labels[normalize_text(text)] = (text, 0 if row.get("impact", "").lower() == "no impact" else 1, False)
+    if os.path.exists(VERDICT_LOG_FILE):
+        with open(VERDICT_LOG_FILE, "r") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if row.get("news") and row.get("impact"):
+                    labels[normalize_text(row["news"])] = (row["news"], 0 if row["impact"] == "no impact" else 1, True)
+    return list(labels.values())
+
+def train(seed=0):
+    """
+    Fits the model on all labelled headlines and writes MODEL_FILE.
+    Returns a report dict, or None if there are too few negatives to train.
+    """
+    rows = load_labelled_headlines()
+    negatives = sum(1 for _, y, _ in rows if y == 0)
+    if negatives < MIN_NEGATIVES:
+        print(f"PREFILTER: Only {negatives} 'no impact' verdicts logged (need {MIN_NEGATIVES}). Not training.")
+        return None
+
+    rng = random.Random(seed)
+    rng.shuffle(rows)
+    X = [features(text) for text, _, _ in rows]
+    y = np.array([label for _, label, _ in rows], dtype=np.float64)
+    logged = np.array([flag for _, _, flag in rows])
+    split = int(len(rows) * (1 - VALIDATION_SPLIT))
+
+    # Class weights so the (large, synthetic) positive set doesn't swamp the negatives
+    pos = y[:split].sum()
+    neg = split - pos
+    class_weight = {1.0: split / (2 * max(pos, 1)), 0.0: split / (2 * max(neg, 1))}
+
+    weights = np.zeros(N_FEATURES, dtype=np.float64)
+    bias = 0.0
+    order = list(range(split))
+    for epoch in range(EPOCHS):
+        rng.shuffle(order)
+        lr = LEARNING_RATE / (1 + epoch)
+        for i in order:
+            idx = X[i]
+            scale = 1.0 / np.sqrt(len(idx)) if len(idx) else 0.0
+            grad = (_score(weights, bias, idx) - y[i]) * class_weight[y[i]]
+            weights[idx] -= lr * (grad * scale + L2 * weights[idx])
+            bias -= lr * grad
+
+    val_scores = np.array([_score(weights, bias, X[i]) for i in range(split, len(rows))])
+    val_y = y[split:]
+    # The synthetic training rows are templated and easy to score; calibrate
+    # recall on real logged positives once there are enough of them.
+    val_pos = val_y == 1
+    if (val_pos & logged[split:]).sum() >= MIN_CALIBRATION_POSITIVES:
+        val_pos &= logged[split:]
+    pos_scores = np.sort(val_scores[val_pos])
+    neg_scores = np.sort(val_scores[val_y == 0])
+
+    tmp_path = MODEL_FILE + ".tmp.npz"
+    np.savez_compressed(tmp_path, weights=weights.astype(np.float32), bias=np.array(bias),
+                        pos_scores=pos_scores, neg_scores=neg_scores, trained_at=np.array(time.time()))
+    os.replace(tmp_path, MODEL_FILE)
+
+    threshold = threshold_for_recall(pos_scores, PREFILTER_RECALL)
+    report = {
+        "examples": len(rows),
+        "negatives": int(negatives),
+        "validation": len(val_y),
+        "calibration_positives": len(pos_scores),
+        "recall_target": PREFILTER_RECALL,
+        "threshold": round(float(threshold), 4),
+        "validation_filter_rate": round(float((val_scores < threshold).mean()), 3) if len(val_scores) else 0.0,
+        "negatives_filtered": round(float((neg_scores < threshold).mean()), 3) if len(neg_scores) else 0.0,
+    }
+    print(f"PREFILTER: Trained. {report}")
+    return report
+
+def threshold_for_recall(pos_scores, recall):
+    """Highest score cut-off that still passes `recall` of the validation positives."""
+    if len(pos_scores) == 0:
+        return 0.0
+    k = int(np.floor((1 - recall) * len(pos_scores)))
+    return float(pos_scores[min(k, len(pos_scores) - 1)])
+
+class Prefilter:
+    def __init__(self, path=MODEL_FILE):
+        self.path = path
+        self.weights = None
+        self.bias = 0.0
+        self.threshold = 0.0
+        self.checked = 0
+        self.skipped = 0
+        self.audited = 0
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            print("PREFILTER: No trained model yet; every headline goes to the LLM.")
+            return
+        try:
+            with np.load(self.path) as model:
+                self.weights = model["weights"]
+                self.bias = float(model["bias"])
+                self.threshold = threshold_for_recall(model["pos_scores"], PREFILTER_RECALL)
+            print(f"PREFILTER: Loaded model (threshold {self.threshold:.3f} for {PREFILTER_RECALL:.0%} recall).")
+        except Exception as e:
+            print(f"ERROR loading prefilter model: {e}")
+            self.weights = None
+
+    def score(self, text):
+        """Probability-like impact score, or None if no model is loaded."""
+        if self.weights is None:
+            return None
+        return float(_score(self.weights, self.bias, features(text)))
+
+    def should_analyze(self, text):
+        """False if the headline can be dropped as "no impact" without asking the LLM."""
+        score = self.score(text)
+        if score is None:
+            return True
+        self.checked += 1
+        if score >= self.threshold:
+            return True
+        if random.random() < PREFILTER_AUDIT_RATE:
+            self.audited += 1
+            return True
+        self.skipped += 1
+        return False
+
+    def stats(self):
+        return {
+            "active": self.weights is not None,
+            "threshold": round(self.threshold, 4),
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "audited": self.audited,
+            "skip_rate": round(self.skipped / self.checked, 3) if self.checked else 0.0
+        }
+
+prefilter = Prefilter()
@@ -10,6 +10,11 @@ from datetime import datetime, timedelta
 # Add parent directory to path to import services
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from services.feed_cache import FeedCache
+from services.checkpoint import Checkpoint
+from services.http_client import get_client
+from services.entity_matcher import get_mention_extractor
+
 # Configuration
 RSS_FEEDS = [
     "https://news.google.com/rss/search?q=stock+market+news&hl=en-US&gl=US&ceid=US:en",
@@ -38,7 +43,9 @@ os.makedirs(DATA_DIR, exist_ok=True)
 class RealImpactCollector:
     def __init__(self):
         self.pending_checks = self.load_pending()
-        self.known_tickers = self.load_ticker_map()
+        self.mention_extractor = get_mention_extractor()
+        # Own validator namespace: the analysis service polls some of the same feeds
+        self.feed_cache = FeedCache("collector")
         
     def load_pending(self):
         if os.path.exists(PENDING_FILE):
@@ -53,28 +60,18 @@ class RealImpactCollector:
         with open(PENDING_FILE, "w") as f:
             json.dump(self.pending_checks, f, indent=2)
 
-    def load_ticker_map(self):
-        # Load local map if exists, otherwise basic map
-        map_file = os.path.join(DATA_DIR, "company_symbols.json")
-        if os.path.exists(map_file):
-            with open(map_file, "r") as f:
-                return json.load(f)
-        return {}
-
     def extract_company_ticker(self, title):
         """
         Simple heuristic to find company/ticker in title.
         Returns (Company, Ticker) or (None, None).
         """
+        # Check known listed companies first (one Aho-Corasick pass over the title)
+        name, symbol = self.mention_extractor.first(title)
+        if symbol:
+            return name, symbol
+
         title_upper = title.upper()
-        
-        # Check known map first
-        for name, data in self.known_tickers.items():
-            if name.upper() in title_upper:
-                # Handle different formats if needed
-                symbol = data if isinstance(data, str) else data.get('symbol')
-                return name, symbol
-                
+
         # Heuristics for common US stocks
         common_stocks = {
             "TESLA": "TSLA", "APPLE": "AAPL", "MICROSOFT": "MSFT", "NVIDIA": "NVDA",
@@ -109,9 +106,24 @@ class RealImpactCollector:
         print("\n[RSS] Fetching feeds...")
         new_items = []
         
-        for url in RSS_FEEDS:
+        client = get_client("feeds")
+        feeds = []
+        # Validators are saved only after the entries below have been tracked
+        checkpoint = Checkpoint()
+        with checkpoint.active():
+            for url in RSS_FEEDS:
+                try:
+                    response, changed = await self.feed_cache.conditional_get(client, url)
+                    if response.status_code == 200 and changed:
+                        feeds.append((url, response.content))
+                    elif response.status_code not in (200, 304):
+                        print(f"  [!] Feed error {url}: HTTP {response.status_code}")
+                except Exception as e:
+                    print(f"  [!] Feed error {url}: {e}")
+
+        for url, content in feeds:
             try:
-                feed = feedparser.parse(url)
+                feed = feedparser.parse(content)
                 for entry in feed.entries: 
                     # Check duplication
                     if entry.link in self.pending_checks:
@@ -139,6 +151,7 @@ class RealImpactCollector:
             self.save_pending()
         else:
             print("  [.] No new trackable items found.")
+        checkpoint.commit()
 
     async def verify_impacts(self):
         print("\n[Verify] Checking pending impacts...")
@@ -1,4 +1,11 @@
+import asyncio
 import feedparser
+from services.http_client import get_client, host_slot
+from services.feed_cache import FeedCache
+from services.timestamps import parse_timestamp, struct_to_epoch
+from services.source_cursors import source_cursors
+
+feed_cache = FeedCache("rss")
 
 RSS_SOURCES = {
     # ------------------
@@ -89,24 +96,66 @@ RSS_SOURCES = {
     ]
 }
 
-def fetch_latest_headlines():
+# Per-feed budget for the whole download; the shared "feeds" client and
+# host_slot handle pooling and per-publisher concurrency.
+FEED_TIMEOUT = 15.0
+
+def entry_timestamp(entry):
+    return struct_to_epoch(entry.get('published_parsed')) or parse_timestamp(entry.get('published'))
+
+async def fetch_feed(client, category, url):
+    """
+    Downloads a single feed and parses it off the event loop.
+    Returns a list of headline dicts (empty on any failure).
+    """
+    try:
+        async with host_slot(url):
+            # wait_for bounds the whole download, not just each socket read
+            response, changed = await asyncio.wait_for(feed_cache.conditional_get(client, url), timeout=FEED_TIMEOUT)
+        if response.status_code not in (200, 304):
+            print(f"    -> RSS Error {response.status_code}: {url}")
+            return []
+        if not changed:
+            # 304 or byte-identical body: nothing new since the last poll
+            return []
+        loop = asyncio.get_running_loop()
+        feed = await loop.run_in_executor(None, feedparser.parse, response.content)
+    except asyncio.TimeoutError:
+        print(f"    -> RSS Timeout after {FEED_TIMEOUT}s: {url}")
+        return []
+    except Exception as e:
+        print(f"    -> RSS Exception for {url}: {e}")
+        return []
+
     headlines = []
-    seen_titles = set()
-    
-    print("Fetching RSS feeds...")
-    for category, urls in RSS_SOURCES.items():
-        print(f"  Category: {category}")
-        for url in urls:
-            feed = feedparser.parse(url)
-            for entry in feed.entries: 
-                if entry.title not in seen_titles:
-                    headlines.append({
-                        "title": entry.title,
-                        "link": entry.link,
-                        "category": category,
-                        "published": entry.published
-                    })
-                    seen_titles.add(entry.title)
-    
-    print(f"Fetched {len(headlines)} total headlines.")
+    # Only entries newer than this feed's watermark; stops early on newest-first feeds
+    for entry, published_ts in source_cursors.take_newer(url, feed.entries, entry_timestamp):
+        if not entry.get('title') or not entry.get('link'):
+            continue
+        headlines.append({
+            "title": entry.title,
+            "link": entry.link,
+            "category": category,
+            "published": entry.get('published', ''),
+            "published_ts": published_ts
+        })
     return headlines
+
+async def poll_feed(category, url):
+    """Fetches a single feed on its own schedule (used by the adaptive feed scheduler)."""
+    return await fetch_feed(get_client("feeds"), category, url)
+
+async def stream_latest_headlines():
+    """
+    Yields RSS headlines feed by feed, as each download finishes, so slow
+    publishers don't hold back the fast ones.
+    """
+    seen_titles = set()
+    feeds = [(category, url) for category, urls in RSS_SOURCES.items() for url in urls]
+    print(f"Streaming {len(feeds)} RSS feeds...")
+    client = get_client("feeds")
+    for next_feed in asyncio.as_completed([fetch_feed(client, category, url) for category, url in feeds]):
+        for h in await next_feed:
+            if h['title'] not in seen_titles:
+                seen_titles.add(h['title'])
+                yield h
@@ -1,27 +1,174 @@
+import os
 import trafilatura
-import httpx
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from services.http_client import get_client
+from services.article_cache import article_cache
 import asyncio
 
+# trafilatura's HTML parsing is CPU-bound, so it runs in a small process pool
+# instead of on the event loop (which also serves /alerts and /status).
+EXTRACT_WORKERS = max(1, int(os.environ.get("EXTRACT_WORKERS", "2")))
+EXTRACT_TIMEOUT = 10.0            # Seconds a single page may take to extract
+
+# Download limits for article pages. Only the first few thousand characters
+# of text reach the deep dive, so there's no point reading multi-megabyte pages.
+ARTICLE_BYTE_BUDGET = int(os.environ.get("ARTICLE_BYTE_BUDGET", "1000000"))
+MAX_REDIRECTS = 5
+HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml"}
+
+_executor = None
+_slots = None     # One per worker: an extraction's timeout only starts once it has a worker
+_stuck = {}       # Timed-out extractions still holding a worker -> releases their slot
+
+def _extract(html):
+    """Runs in a worker process. trafilatura takes the raw bytes and detects the encoding itself."""
+    return trafilatura.extract(html)
+
+def get_executor():
+    global _executor, _slots
+    if _executor is None:
+        # spawn: forking a process that runs an asyncio loop and open sockets is unsafe
+        _executor = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    if _slots is None:
+        _slots = asyncio.Semaphore(EXTRACT_WORKERS)
+    return _executor
+
+def reset_executor():
+    """
+    Replaces the pool. Workers stuck on a pathological page are killed where
+    the executor supports it (terminate_workers, Python 3.14+); otherwise they
+    exit once their page is done. Either way their slots go to the new pool.
+    """
+    global _executor
+    executor, _executor = _executor, None
+    for release in list(_stuck.values()):
+        release()
+    _stuck.clear()
+    if executor is None:
+        return
+    terminate_workers = getattr(executor, "terminate_workers", None)
+    if terminate_workers:
+        terminate_workers()
+    else:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_executor():
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    _slots = None
+    _stuck.clear()
+
+async def extract_text(html):
+    """Extracts the main article text off the event loop. None if it fails or runs out of time."""
+    get_executor()
+    slots = _slots
+    await slots.acquire()
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            slots.release()
+
+    try:
+        future = get_executor().submit(_extract, html)
+    except BrokenProcessPool:
+        release()
+        print("  Extractor pool broke; restarting it.")
+        reset_executor()
+        return None
+    except BaseException:
+        release()
+        raise
+
+    def finished(result):
+        # The worker is free again (the page finished, failed or was cancelled)
+        _stuck.pop(future, None)
+        release()
+        if not result.cancelled():
+            result.exception()  # Retrieved here so a page abandoned on timeout doesn't log it
+
+    result = asyncio.wrap_future(future)
+    result.add_done_callback(finished)
+    try:
+        # Shielded: on timeout the page keeps its worker (and slot) until it finishes
+        return await asyncio.wait_for(asyncio.shield(result), EXTRACT_TIMEOUT)
+    except asyncio.TimeoutError:
+        # Give up on this page only; other extractions share the pool. The
+        # pool is recycled once every worker is tied up by a timed-out page.
+        if not result.done():
+            _stuck[future] = release
+        if len(_stuck) >= EXTRACT_WORKERS:
+            print(f"  Extraction timed out after {EXTRACT_TIMEOUT:.0f}s; all workers stuck, recycling extractor pool.")
+            reset_executor()
+        else:
+            print(f"  Extraction timed out after {EXTRACT_TIMEOUT:.0f}s; skipped page.")
+    except BrokenProcessPool:
+        print("  Extractor pool broke; restarting it.")
+        reset_executor()
+    return None
+
+class FetchError(Exception):
+    pass
+
+async def download_html(url):
+    """
+    Streams an article page and returns (first ARTICLE_BYTE_BUDGET bytes, final URL).
+    Redirects are followed by hand (at most MAX_REDIRECTS hops) and anything
+    whose Content-Type isn't HTML is refused before the body is read.
+    """
+    client = get_client("scraper")
+    for _ in range(MAX_REDIRECTS + 1):
+        async with client.stream("GET", url, timeout=15, follow_redirects=False, headers={
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }) as response:
+            if response.is_redirect:
+                url = str(response.url.join(response.headers.get("Location", "")))
+                continue
+            if response.status_code != 200:
+                raise FetchError(f"Failed to fetch content. Status: {response.status_code}")
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if content_type and content_type not in HTML_CONTENT_TYPES:
+                raise FetchError(f"Skipped non-HTML content ({content_type}).")
+
+            chunks, size = [], 0
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= ARTICLE_BYTE_BUDGET:
+                    # The article body is near the top; the rest is comments, footers and scripts
+                    print(f"  Byte budget reached ({ARTICLE_BYTE_BUDGET} bytes); stopped reading.")
+                    break
+            return b"".join(chunks)[:ARTICLE_BYTE_BUDGET], url
+    raise FetchError(f"Failed to fetch content. Too many redirects (>{MAX_REDIRECTS}).")
+
 async def fetch_article_content(url):
     """
     Fetches the full article content from a URL and extracts clean text.
     """
+    cached = article_cache.get(url)
+    if cached is not None:
+        print(f"  CACHE HIT: Article text reused for: {url}")
+        return cached
+
     print(f"  SCRAPING: {url}")
     try:
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            response = await client.get(url, timeout=15, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            })
-            if response.status_code == 200:
-                downloaded = response.text
-                # trafilatura extracts main content and ignores boilerplate
-                content = trafilatura.extract(downloaded)
-                if content:
-                    # Limit content length to avoid context window issues
-                    return content[:5000] 
-                return "Could not extract clean text content."
-            else:
-                return f"Failed to fetch content. Status: {response.status_code}"
+        downloaded, final_url = await download_html(url)
+        # trafilatura extracts main content and ignores boilerplate
+        content = await extract_text(downloaded)
+        if content:
+            # Limit content length to avoid context window issues
+            content = content[:5000]
+            article_cache.put(url, content, final_url=final_url if final_url != url else None)
+            return content
+        return "Could not extract clean text content."
+    except FetchError as e:
+        return str(e)
     except Exception as e:
         print(f"  Scraping Error: {e}")
         return f"Error during scraping: {str(e)}"
@@ -33,5 +180,5 @@ if __name__ == "__main__":
         content = await fetch_article_content(url)
         print(f"Content length: {len(content)}")
         print(f"Snippet: {content[:200]}...")
-    
+
     asyncio.run(test())
@@ -0,0 +1,101 @@
+import os
+import math
+import time
+import hashlib
+from services.database import db
+
+# Bounded store of links that have already been analyzed. Links are kept in
+# day-sized buckets: the seen_links table holds the links with their bucket,
+# and each bucket has an in-memory Bloom filter in front of it. Buckets older
+# than SEEN_LINK_RETENTION_DAYS are dropped whole. Memory and disk use depend
+# on the retention window, not on how long the service has been running, and
+# each cycle only inserts its new links.
+BUCKET_SECONDS = 86400
+SEEN_LINK_RETENTION_DAYS = int(os.environ.get("SEEN_LINK_RETENTION_DAYS", "7"))   # > the 72-hour freshness window
+BUCKET_CAPACITY = 50000           # Expected links per day, sizes each filter
+FALSE_POSITIVE_RATE = 1e-3        # Per bucket; positives are confirmed against the table
+
+class BloomFilter:
+    def __init__(self, capacity=BUCKET_CAPACITY, error_rate=FALSE_POSITIVE_RATE):
+        self.size = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+class SeenLinkStore:
+    """Set-like (add / in / len) view over the time-bucketed filters."""
+    def __init__(self, database=db, retention_days=SEEN_LINK_RETENTION_DAYS):
+        self.db = database
+        self.retention = retention_days
+        self.filters = {}      # bucket number -> BloomFilter
+        self.pending = {}      # link -> bucket, not yet written
+        self.load()
+
+    @staticmethod
+    def bucket(ts=None):
+        return int((ts or time.time()) // BUCKET_SECONDS)
+
+    def oldest_bucket(self):
+        return self.bucket() - self.retention + 1
+
+    def load(self):
+        self.expire()
+        try:
+            for link, bucket in self.db.load_seen_links(self.oldest_bucket()):
+                self.filters.setdefault(bucket, BloomFilter()).add(link)
+        except Exception as e:
+            print(f"ERROR loading seen links: {e}")
+
+    def expire(self):
+        """Drops buckets that fell out of the retention window (filters and rows)."""
+        oldest = self.oldest_bucket()
+        for bucket in [b for b in self.filters if b < oldest]:
+            del self.filters[bucket]
+        try:
+            self.db.expire_seen_links(oldest)
+        except Exception as e:
+            print(f"ERROR expiring seen links: {e}")
+
+    def add(self, link):
+        if link in self:
+            return
+        bucket = self.bucket()
+        self.filters.setdefault(bucket, BloomFilter()).add(link)
+        self.pending[link] = bucket
+
+    def __contains__(self, link):
+        if not any(link in bloom for bloom in self.filters.values()):
+            return False
+        # Filter hit: rule out a false positive (unless the link is still unwritten)
+        return link in self.pending or self.db.has_seen_link(link)
+
+    def __len__(self):
+        return sum(bloom.count for bloom in self.filters.values())
+
+    def update(self, links):
+        for link in links:
+            self.add(link)
+
+    def flush(self):
+        """Writes links added since the last flush in one transaction and expires old buckets."""
+        if self.pending:
+            try:
+                self.db.add_seen_links(list(self.pending.items()))
+                self.pending = {}
+            except Exception as e:
+                print(f"ERROR saving seen links: {e}")
+        self.expire()
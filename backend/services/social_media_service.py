@@ -1,7 +1,9 @@
-import httpx
+from services.http_client import get_client
 import asyncio
 import feedparser
 import random
+from services.timestamps import struct_to_epoch, epoch_to_iso
+from services.source_cursors import source_cursors
 
 # Subreddits with high signal for market/social trends
 SUBREDDITS = [
@@ -39,24 +41,23 @@ async def fetch_twitter_headlines():
     # User-Agent for Nitter requests
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
 
-    import requests
+    client = get_client("feeds")
 
-    def fetch_feed_sync(url_to_fetch):
+    async def fetch_feed_async(url_to_fetch):
         try:
-            resp = requests.get(url_to_fetch, headers=headers, timeout=10)
+            resp = await client.get(url_to_fetch, headers=headers, timeout=10)
             if resp.status_code == 200:
                 return resp.text
             return None
         except Exception as ex:
-            print(f"      [Sync Fetch Error] {ex}")
+            print(f"      [Fetch Error] {ex}")
             return None
 
     for account in TWITTER_ACCOUNTS:
         url = f"{instance}/{account}/rss"
         try:
             loop = asyncio.get_event_loop()
-            # Fetch content synchronously in a thread
-            xml_content = await loop.run_in_executor(None, fetch_feed_sync, url)
+            xml_content = await fetch_feed_async(url)
             
             if xml_content:
                 feed = await loop.run_in_executor(None, feedparser.parse, xml_content)
@@ -68,7 +69,8 @@ async def fetch_twitter_headlines():
                             "title": f"@{account}: {entry.title}",
                             "link": entry.link,
                             "category": "SOCIAL: X/Twitter",
-                            "published": entry.published if 'published' in entry else ""
+                            "published": entry.published if 'published' in entry else "",
+                            "published_ts": struct_to_epoch(entry.get('published_parsed'))
                         })
                 else:
                     print(f"    -> No tweets found for @{account} (empty feed)")
@@ -82,32 +84,58 @@ async def fetch_twitter_headlines():
     print(f"Fetched {len(headlines)} headlines from X/Twitter.")
     return headlines
 
+# Reddit is read from each subreddit's /new listing, newest first, starting
+# after the newest post seen last time (the `before` fullname cursor).
+REDDIT_PAGE_SIZE = 30
+
+async def fetch_reddit_listing(client, url, headers, before):
+    """Posts newer than `before` (all recent posts if None), or None on an HTTP error."""
+    params = {"limit": REDDIT_PAGE_SIZE}
+    if before:
+        params["before"] = before
+    response = await client.get(url, params=params, headers=headers, timeout=10)
+    if response.status_code != 200:
+        print(f"  Reddit Error {response.status_code}: {url}")
+        return None
+    return response.json().get('data', {}).get('children', [])
+
 async def fetch_social_media_headlines():
     headlines = []
     print("Fetching Reddit feeds...")
     
     # 1. Fetch Reddit
     headers = {'User-Agent': 'MarketImpactAlertsApp/1.0 by User'}
-    async with httpx.AsyncClient() as client:
-        for sub in SUBREDDITS:
-            url = f"https://www.reddit.com/r/{sub}/hot.json?limit=30"
-            try:
-                await asyncio.sleep(0.5)
-                response = await client.get(url, headers=headers, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    posts = data.get('data', {}).get('children', [])
-                    for post in posts:
-                        pdata = post.get('data', {})
-                        if pdata.get('title') and pdata.get('url'):
-                            headlines.append({
-                                "title": f"r/{sub}: {pdata['title']}",
-                                "link": pdata['url'],
-                                "category": f"SOCIAL: Reddit",
-                                "published": "" 
-                            })
-            except Exception as e:
-                print(f"  Exception fetching r/{sub}: {e}")
+    client = get_client()
+    for sub in SUBREDDITS:
+        url = f"https://www.reddit.com/r/{sub}/new.json"
+        key = f"reddit:{sub}"
+        cursor = source_cursors.get(key)
+        try:
+            await asyncio.sleep(0.5)
+            posts = await fetch_reddit_listing(client, url, headers, cursor.get("before"))
+            if posts is None:
+                continue
+            if not posts and cursor.get("before"):
+                # An empty page also means the cursor post was deleted or removed (routine on busy
+                # subreddits), after which `before` never returns anything. Re-read the newest page;
+                # the created_utc watermark drops what was already seen and the cursor moves on.
+                posts = await fetch_reddit_listing(client, url, headers, None) or []
+            if not posts:
+                print(f"  r/{sub}: nothing new since last poll.")
+                continue
+            source_cursors.update(key, before=posts[0].get('data', {}).get('name'))
+            for post, published_ts in source_cursors.take_newer(key, posts, lambda p: p.get('data', {}).get('created_utc')):
+                pdata = post.get('data', {})
+                if pdata.get('title') and pdata.get('url'):
+                    headlines.append({
+                        "title": f"r/{sub}: {pdata['title']}",
+                        "link": pdata['url'],
+                        "category": f"SOCIAL: Reddit",
+                        "published": epoch_to_iso(published_ts) if published_ts else "",
+                        "published_ts": float(published_ts) if published_ts else None
+                    })
+        except Exception as e:
+            print(f"  Exception fetching r/{sub}: {e}")
                 
     # 2. Fetch Twitter
     # twitter_news = await fetch_twitter_headlines()
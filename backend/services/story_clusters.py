@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import zlib
+import numpy as np
+from services.llm_cache import normalize_text
+
+# Near-duplicate clustering of headlines across sources. The same event from
+# ET, Moneycontrol, Mint and Google News is worded slightly differently each
+# time, so exact title/link dedup misses it. Each headline gets a MinHash
+# signature over its word set; an LSH index (banded signatures) finds earlier
+# headlines with similar wording, and only one headline of a cluster goes on
+# to the LLM. A cluster counts as analyzed once Pass 1 has returned a verdict
+# for it; until then (say the first headline's Pass 1 call failed) the next
+# near-duplicate is let through instead. Clusters persist across cycles for
+# the freshness window.
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+CLUSTERS_FILE = os.path.join(DATA_DIR, "story_clusters.json")
+
+NUM_HASHES = 64
+BANDS = 16                  # 16 bands x 4 rows: pairs above ~0.5 Jaccard usually share a band
+ROWS = NUM_HASHES // BANDS
+MATCH_THRESHOLD = 0.6       # Estimated Jaccard needed to join a cluster
+MIN_TOKENS = 4              # Shorter headlines are too generic to cluster
+SHORT_TITLE = 8             # Below this many tokens, only filler words may differ
+CLUSTER_TTL = 72 * 3600     # Matches the 72-hour freshness window in run_analysis
+
+# Headlines about opposite events ("Fed raises rates" / "Fed cuts rates") share
+# almost every word, so a high MinHash score means nothing if their direction
+# or action differs. Words map to a class; two headlines only merge when their
+# classes match exactly.
+ACTION_CLASSES = {
+    "up": {"raise", "raises", "raised", "hike", "hikes", "hiked", "rise", "rises", "rose", "rising",
+           "gain", "gains", "gained", "jump", "jumps", "jumped", "surge", "surges", "surged", "soar",
+           "soars", "soared", "rally", "rallies", "rallied", "climb", "climbs", "climbed", "up",
+           "higher", "increase", "increases", "increased", "boost", "boosts", "boosted", "upgrade",
+           "upgrades", "upgraded", "high"},
+    "down": {"cut", "cuts", "slash", "slashes", "slashed", "fall", "falls", "fell", "falling", "drop",
+             "drops", "dropped", "decline", "declines", "declined", "slump", "slumps", "slumped",
+             "plunge", "plunges", "plunged", "tumble", "tumbles", "tumbled", "sink", "sinks", "sank",
+             "slide", "slides", "slid", "down", "lower", "lowers", "lowered", "reduce", "reduces",
+             "reduced", "crash", "crashes", "crashed", "downgrade", "downgrades", "downgraded", "low"},
+    "hold": {"keep", "keeps", "kept", "hold", "holds", "held", "unchanged", "steady", "pause",
+             "pauses", "paused", "maintain", "maintains", "maintained"},
+    "ban": {"ban", "bans", "banned", "bar", "bars", "barred", "suspend", "suspends", "suspended"},
+    "fine": {"fine", "fines", "fined", "penalty", "penalises", "penalizes", "penalised", "penalized"},
+    "approve": {"approve", "approves", "approved", "clears", "cleared"},
+    "reject": {"reject", "rejects", "rejected", "denies", "denied", "blocks", "blocked"},
+    "buy": {"buy", "buys", "bought", "acquire", "acquires", "acquired", "acquisition"},
+    "sell": {"sell", "sells", "sold", "divest", "divests", "divested", "offload", "offloads"},
+    "beat": {"beat", "beats", "tops", "exceeds"},
+    "miss": {"miss", "misses", "missed"},
+}
+ACTIONS = {word: cls for cls, words in ACTION_CLASSES.items() for word in words}
+# Words that add nothing to a short headline's meaning
+FILLER = {"today", "now", "report", "reports", "reported", "update", "live", "latest", "new", "news",
+          "breaking", "street", "sources", "officially", "just", "here", "what", "know", "why", "all"}
+
+STOPWORDS = {
+    "a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "at", "by", "with", "from",
+    "as", "is", "are", "was", "be", "its", "it", "this", "that", "after", "amid", "over", "says",
+}
+
+# Universal hashes (a*x + b) mod p over 32-bit token hashes; p is the first
+# prime above 2^32, so every product fits in uint64. Fixed seed: signatures
+# saved in earlier cycles must stay comparable.
+_PRIME = np.uint64(4294967311)
+_rng = np.random.default_rng(20240101)
+_A = _rng.integers(1, 1 << 32, NUM_HASHES, dtype=np.uint64)[:, None]
+_B = _rng.integers(0, 1 << 32, NUM_HASHES, dtype=np.uint64)[:, None]
+
+def shingles(title):
+    return {w for w in normalize_text(title).split() if w not in STOPWORDS}
+
+def actions(tokens):
+    return {ACTIONS[t] for t in tokens if t in ACTIONS}
+
+def compatible(tokens, other):
+    """Whether two token sets may describe the same event, whatever their similarity score."""
+    if actions(tokens) != actions(other):
+        return False
+    if min(len(tokens), len(other)) < SHORT_TITLE:
+        return (tokens ^ other) <= FILLER
+    return True
+
+def minhash(tokens):
+    """MinHash signature of a token set (NUM_HASHES uint32 values)."""
+    x = np.array([zlib.crc32(t.encode("utf-8")) for t in tokens], dtype=np.uint64)
+    return ((_A * x[None, :] + _B) % _PRIME).min(axis=1).astype(np.uint32)
+
+class StoryClusters:
+    def __init__(self, path=CLUSTERS_FILE):
+        self.path = path
+        self.clusters = {}    # cluster id -> {"title", "links", "signature", "tokens", "entities", "numbers", "updated", "analyzed"}
+        self.buckets = {}     # band key -> [cluster ids]
+        self.pending = set()  # Clusters with a headline in Pass 1 right now
+        self.next_id = 0
+        self.merged = 0
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            for cid, cluster in data.get("clusters", {}).items():
+                self._insert(cid, cluster)
+            self.next_id = data.get("next_id", 0)
+            self.prune()
+        except Exception as e:
+            print(f"ERROR loading story clusters: {e}")
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            self.prune()
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"next_id": self.next_id, "clusters": self.clusters}, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            print(f"ERROR saving story clusters: {e}")
+
+    @staticmethod
+    def _band_keys(signature):
+        return [f"{i}:" + ",".join(str(v) for v in signature[i * ROWS:(i + 1) * ROWS]) for i in range(BANDS)]
+
+    def _insert(self, cid, cluster):
+        self.clusters[cid] = cluster
+        if not cluster["signature"]:
+            return  # Too short to cluster; kept only for its links
+        for key in self._band_keys(cluster["signature"]):
+            self.buckets.setdefault(key, []).append(cid)
+
+    def prune(self):
+        """Forgets clusters that have not seen a new link within CLUSTER_TTL."""
+        cutoff = time.time() - CLUSTER_TTL
+        stale = [cid for cid, c in self.clusters.items() if c["updated"] < cutoff]
+        if not stale:
+            return
+        for cid in stale:
+            del self.clusters[cid]
+        self.buckets = {k: [c for c in v if c in self.clusters] for k, v in self.buckets.items()}
+        self.buckets = {k: v for k, v in self.buckets.items() if v}
+        self.dirty = True
+
+    def assign(self, title, link, entities=()):
+        """
+        Puts a headline in a cluster. Returns (cluster id, is_new); is_new is
+        False when the headline is a near-duplicate of a story that has been
+        analyzed (or is being analyzed right now) and needs no LLM call. Headlines
+        naming different companies, quoting different figures ("Sensex falls
+        500 points" / "... 600 points") or reporting a different action
+        ("RBI hikes repo rate" / "RBI keeps repo rate unchanged") are never
+        merged, and short headlines only merge if they differ in filler words.
+        """
+        tokens = shingles(title)
+        signature = minhash(tokens) if len(tokens) >= MIN_TOKENS else None
+        entities = sorted(set(entities))
+        numbers = sorted(t for t in tokens if any(ch.isdigit() for ch in t))
+        if signature is not None:
+            best, best_score = None, MATCH_THRESHOLD
+            candidates = {cid for key in self._band_keys(signature.tolist()) for cid in self.buckets.get(key, ())}
+            for cid in candidates:
+                cluster = self.clusters[cid]
+                if entities and cluster["entities"] and not set(entities) & set(cluster["entities"]):
+                    continue
+                if numbers and cluster.get("numbers") and not set(numbers) & set(cluster["numbers"]):
+                    continue
+                # Clusters saved before tokens were stored can't be checked, so they don't match
+                if "tokens" not in cluster or not compatible(tokens, set(cluster["tokens"])):
+                    continue
+                score = float(np.mean(signature == np.array(cluster["signature"], dtype=np.uint32)))
+                if score >= best_score:
+                    best, best_score = cid, score
+            if best is not None:
+                cluster = self.clusters[best]
+                if link not in cluster["links"]:
+                    cluster["links"].append(link)
+                cluster["updated"] = time.time()
+                self.dirty = True
+                # Clusters saved before the flag existed were analyzed
+                if cluster.get("analyzed", True) or best in self.pending:
+                    self.merged += 1
+                    return best, False
+                self.pending.add(best)
+                return best, True
+
+        cid = str(self.next_id)
+        self.next_id += 1
+        self._insert(cid, {"title": title, "links": [link], "signature": [] if signature is None else signature.tolist(),
+                           "tokens": sorted(tokens), "entities": entities, "numbers": numbers, "updated": time.time(), "analyzed": False})
+        self.pending.add(cid)
+        self.dirty = True
+        return cid, True
+
+    def settle(self, cid, analyzed):
+        """Records the Pass 1 outcome for a cluster's headline; if it failed, the next member gets a turn."""
+        self.pending.discard(cid)
+        cluster = self.clusters.get(cid)
+        if analyzed and cluster and not cluster.get("analyzed", True):
+            cluster["analyzed"] = True
+            self.dirty = True
+
+    def begin_cycle(self):
+        """Forgets headlines a crashed run left in Pass 1."""
+        self.pending.clear()
+
+    def links(self, cid):
+        cluster = self.clusters.get(cid)
+        return list(cluster["links"]) if cluster else []
+
+story_clusters = StoryClusters()
@@ -0,0 +1,98 @@
+import re
+import time
+import calendar
+import email.utils
+from functools import lru_cache
+from dateutil import parser as date_parser
+
+# Headline timestamps are normalized once, when a source adapter builds the
+# headline: 'published_ts' holds aware epoch seconds (or None), so every later
+# filter is a plain numeric comparison. Known formats go through compiled
+# fast paths; anything else falls back to email.utils / dateutil. Feeds repeat
+# the same strings every poll, so results are memoized.
+
+# ISO 8601 (NewsAPI "2026-02-21T12:34:56Z") and the NewsData format
+# ("2026-02-21 12:34:56", UTC without an offset)
+_ISO = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.\d+)?)?\s*(Z|[+-]\d{2}:?\d{2})?$", re.I)
+# RFC 2822 (RSS "Sat, 21 Feb 2026 12:34:56 +0000", "... GMT")
+_RFC2822 = re.compile(
+    r"(?:[A-Za-z]{3},\s*)?(\d{1,2})\s+([A-Za-z]{3})\s+(\d{4})\s+(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([+-]\d{4}|[A-Za-z]{1,3})?$")
+
+_MONTHS = {m: n for n, m in enumerate(["jan", "feb", "mar", "apr", "may", "jun",
+                                       "jul", "aug", "sep", "oct", "nov", "dec"], 1)}
+_ZONES = {"gmt": 0, "ut": 0, "utc": 0, "z": 0, "est": -5, "edt": -4, "cst": -6, "cdt": -5,
+          "mst": -7, "mdt": -6, "pst": -8, "pdt": -7, "ist": 5.5}
+
+def _offset_seconds(zone):
+    """Seconds east of UTC for "+05:30" / "-0400" style offsets."""
+    sign = -1 if zone[0] == "-" else 1
+    digits = zone[1:].replace(":", "")
+    return sign * (int(digits[:2]) * 3600 + int(digits[2:4]) * 60)
+
+def _epoch(year, month, day, hour, minute, second):
+    """calendar.timegm, but out-of-range fields raise ValueError instead of rolling over."""
+    if not (1 <= day <= calendar.monthrange(year, month)[1] and hour < 24 and minute < 60 and second < 61):
+        raise ValueError("date field out of range")
+    return calendar.timegm((year, month, day, hour, minute, second))
+
+def _fast_parse(value):
+    m = _ISO.match(value)
+    if m:
+        year, month, day, hour, minute, second, zone = m.groups()
+        ts = _epoch(int(year), int(month), int(day), int(hour), int(minute), int(second or 0))
+        if zone and zone.upper() != "Z":
+            ts -= _offset_seconds(zone)
+        return float(ts)
+
+    m = _RFC2822.match(value)
+    if m:
+        day, month, year, hour, minute, second, zone = m.groups()
+        month = _MONTHS.get(month.lower())
+        if month is None:
+            return None
+        ts = _epoch(int(year), month, int(day), int(hour), int(minute), int(second or 0))
+        if zone:
+            if zone[0] in "+-":
+                ts -= _offset_seconds(zone)
+            elif zone.lower() in _ZONES:
+                ts -= int(_ZONES[zone.lower()] * 3600)
+            else:
+                return None  # Unknown abbreviation; let the slow path decide
+        return float(ts)
+    return None
+
+@lru_cache(maxsize=8192)
+def parse_timestamp(value):
+    """Epoch seconds for a date string, or None. Strings without a zone are taken as UTC."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        ts = _fast_parse(value)
+        if ts is not None:
+            return ts
+    except ValueError:
+        return None
+    try:
+        parsed = email.utils.parsedate_tz(value)
+        if parsed:
+            if parsed[9] is None:
+                # Unknown zone name: mktime_tz would read it as local time
+                parsed = parsed[:9] + (0,)
+            return float(email.utils.mktime_tz(parsed))
+    except (TypeError, ValueError, OverflowError):
+        pass
+    try:
+        dt = date_parser.parse(value)
+        return dt.timestamp() if dt.tzinfo else float(calendar.timegm(dt.timetuple()))
+    except (ValueError, OverflowError):
+        return None
+
+def struct_to_epoch(parsed):
+    """feedparser's *_parsed fields are UTC struct_times."""
+    return float(calendar.timegm(parsed)) if parsed else None
+
+def epoch_to_iso(ts):
+    """ISO 8601 UTC string for display fields, e.g. "2026-02-21T12:34:56Z"."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
@@ -0,0 +1,178 @@
+import os
+import json
+import zlib
+import hashlib
+import numpy as np
+from services.example_index import tokenize
+
+# Offline dense retrieval (latent semantic indexing). Headlines are turned into
+# hashed TF-IDF vectors over word unigrams + bigrams and projected onto the top
+# singular vectors of the training corpus, so paraphrases that share context
+# ("RBI hikes repo" / "central bank tightens") land close together. No network
+# model is involved. Document vectors are saved as .npy files and
+# memory-mapped on load; search is a single matrix-vector product.
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+VECTOR_INDEX_DIR = os.path.join(DATA_DIR, "vector_index")
+
+HASH_BITS = 20
+EMBEDDING_DIMS = 96
+MIN_DF = 2                 # Terms seen in a single document carry no co-occurrence signal
+SVD_OVERSAMPLE = 10
+SVD_POWER_ITERATIONS = 3
+
+def hashed_terms(text):
+    """Hashed unigram + bigram ids of a headline, with counts."""
+    words = tokenize(text)
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    ids = np.fromiter((zlib.crc32(g.encode("utf-8")) & ((1 << HASH_BITS) - 1) for g in grams), dtype=np.int64, count=len(grams))
+    return np.unique(ids, return_counts=True)
+
+def fingerprint(texts):
+    digest = hashlib.sha1()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def _normalize_rows(m):
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+class _SparseRows:
+    """Minimal CSR matrix: just the two products the randomized SVD needs."""
+    def __init__(self, indptr, indices, data, n_cols):
+        self.indptr, self.indices, self.data, self.n_cols = indptr, indices, data, n_cols
+        self.n_rows = len(indptr) - 1
+        self.row_ids = np.repeat(np.arange(self.n_rows), np.diff(indptr))
+        self.col_order = np.argsort(indices, kind="stable")
+
+    @staticmethod
+    def _segment_sum(values, keys_sorted, n_out):
+        out = np.zeros((n_out, values.shape[1]))
+        if len(keys_sorted):
+            starts = np.flatnonzero(np.r_[True, keys_sorted[1:] != keys_sorted[:-1]])
+            out[keys_sorted[starts]] = np.add.reduceat(values, starts, axis=0)
+        return out
+
+    def dot(self, m):
+        """self @ m"""
+        return self._segment_sum(m[self.indices] * self.data[:, None], self.row_ids, self.n_rows)
+
+    def tdot(self, m):
+        """self.T @ m"""
+        order = self.col_order
+        values = m[self.row_ids[order]] * self.data[order, None]
+        return self._segment_sum(values, self.indices[order], self.n_cols)
+
+class VectorIndex:
+    def __init__(self, columns, idf, components, embeddings, fingerprint=""):
+        self.columns = columns          # Sorted hashed term ids kept in the vocabulary
+        self.idf = idf
+        self.components = components    # vocabulary x dims projection
+        self.embeddings = embeddings    # documents x dims, unit rows (memory-mapped when loaded)
+        self.fingerprint = fingerprint
+        self.extra = np.zeros((0, components.shape[1]), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.embeddings) + len(self.extra)
+
+    @classmethod
+    def build(cls, texts, dims=EMBEDDING_DIMS, seed=0):
+        docs = [hashed_terms(t) for t in texts]
+        all_ids = np.concatenate([ids for ids, _ in docs]) if docs else np.zeros(0, dtype=np.int64)
+        vocab, df = np.unique(all_ids, return_counts=True)
+        columns = vocab[df >= MIN_DF]
+        df = df[df >= MIN_DF]
+        idf = (np.log((1 + len(docs)) / (1 + df)) + 1).astype(np.float32)
+
+        indptr, indices, data = [0], [], []
+        for ids, counts in docs:
+            pos = np.searchsorted(columns, ids)
+            pos = np.minimum(pos, len(columns) - 1)
+            known = columns[pos] == ids if len(columns) else np.zeros(len(ids), dtype=bool)
+            weights = (1 + np.log(counts[known])) * idf[pos[known]]
+            norm = np.linalg.norm(weights)
+            indices.append(pos[known])
+            data.append(weights / norm if norm else weights)
+            indptr.append(indptr[-1] + int(known.sum()))
+        matrix = _SparseRows(np.array(indptr), np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+                             np.concatenate(data) if data else np.zeros(0), len(columns))
+
+        # Randomized SVD (Halko et al.): range finder with power iterations
+        dims = max(1, min(dims, len(docs) - 1, len(columns) - 1))
+        rng = np.random.default_rng(seed)
+        q, _ = np.linalg.qr(matrix.dot(rng.standard_normal((len(columns), dims + SVD_OVERSAMPLE))))
+        for _ in range(SVD_POWER_ITERATIONS):
+            z, _ = np.linalg.qr(matrix.tdot(q))
+            q, _ = np.linalg.qr(matrix.dot(z))
+        _, _, vt = np.linalg.svd(matrix.tdot(q).T, full_matrices=False)
+        components = vt[:dims].T.astype(np.float32)
+        embeddings = _normalize_rows(matrix.dot(components)).astype(np.float32)
+        return cls(columns, idf, components, embeddings, fingerprint(texts))
+
+    def save(self, path=VECTOR_INDEX_DIR):
+        os.makedirs(path, exist_ok=True)
+        for name in ("columns", "idf", "components", "embeddings"):
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"fingerprint": self.fingerprint, "documents": len(self.embeddings), "dims": self.components.shape[1]}, f)
+
+    @classmethod
+    def load(cls, path=VECTOR_INDEX_DIR):
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if name == "embeddings" else None)
+                  for name in ("columns", "idf", "components", "embeddings")}
+        return cls(fingerprint=meta["fingerprint"], **arrays)
+
+    @classmethod
+    def load_or_build(cls, texts, path=VECTOR_INDEX_DIR):
+        """Loads the saved index if it was built from exactly these texts, else rebuilds and saves it."""
+        if os.path.exists(os.path.join(path, "meta.json")):
+            try:
+                index = cls.load(path)
+                if index.fingerprint == fingerprint(texts):
+                    return index
+            except Exception as e:
+                print(f"ERROR loading vector index: {e}")
+        print(f"Building vector index over {len(texts)} examples...")
+        index = cls.build(texts)
+        try:
+            index.save(path)
+        except Exception as e:
+            print(f"ERROR saving vector index: {e}")
+        return index
+
+    def embed(self, texts):
+        """Unit vectors for texts in the index's space (fold-in; the projection is not refit)."""
+        out = np.zeros((len(texts), self.components.shape[1]), dtype=np.float32)
+        if not len(self.columns):
+            return out
+        for row, text in enumerate(texts):
+            ids, counts = hashed_terms(text)
+            pos = np.minimum(np.searchsorted(self.columns, ids), len(self.columns) - 1)
+            known = self.columns[pos] == ids
+            if known.any():
+                weights = (1 + np.log(counts[known])) * self.idf[pos[known]]
+                out[row] = weights @ self.components[pos[known]]
+        return _normalize_rows(out).astype(np.float32)
+
+    def add(self, texts):
+        """Appends documents in memory; their ids continue after the saved ones."""
+        self.extra = np.vstack([self.extra, self.embed(texts)])
+
+    def search(self, query, k=3, min_score=0.0):
+        """[(doc_id, cosine)] of the k nearest documents, best first."""
+        if not len(self):
+            return []
+        q = self.embed([query])[0]
+        if not q.any():
+            return []
+        scores = self.embeddings @ q
+        if len(self.extra):
+            scores = np.concatenate([scores, self.extra @ q])
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > min_score]
@@ -0,0 +1,16 @@
+import os
+import sys
+import pytest
+
+# The services import each other as `services.*`, with backend/ on sys.path (as main.py sets up)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Points the shared database at a temporary directory, so no test touches backend/data."""
+    from services import database
+    monkeypatch.setattr(database, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "alpha_impact.db"))
+    database.db.close()
+    yield tmp_path
+    database.db.close()
@@ -0,0 +1,216 @@
+import json
+import asyncio
+import httpx
+import pytest
+from services import ai_service
+from services.pipeline import from_list
+
+EXAMPLES = [
+    {"news": "RBI hikes repo rate by 25 bps", "event": "rbi rate hike"},
+    {"news": "Central bank raises repo rate to curb inflation", "event": "repo raised"},
+    {"news": "Infosys wins large deal from European bank", "event": "infosys deal"},
+    {"news": "TCS bags multi-year contract from UK insurer", "event": "tcs deal"},
+]
+
+@pytest.fixture
+def examples(monkeypatch):
+    monkeypatch.setattr(ai_service, "TRAINING_EXAMPLES", [dict(ex) for ex in EXAMPLES])
+    monkeypatch.setattr(ai_service, "example_index", ai_service.ExampleIndex(ai_service.TRAINING_EXAMPLES))
+    monkeypatch.setattr(ai_service, "vector_index", None)
+    monkeypatch.setattr(ai_service, "alert_memory", [])
+    monkeypatch.setattr(ai_service, "alert_vectors", None)
+
+def test_import_does_not_build_vector_index():
+    assert ai_service.vector_index is None
+
+def test_retrieval_is_bm25_only_until_vector_index_loads(examples, tmp_path):
+    assert ai_service.relevant_example_ids("RBI hikes repo rate", limit=1) == [0]
+    ai_service.remember_alerts([{"event": "RBI hikes repo rate", "article_summary": "repo up 25 bps"}])
+    assert ai_service.alert_vectors is None
+
+    index = ai_service.load_vector_index(str(tmp_path / "vector_index"))
+    assert ai_service.vector_index is index and len(index) == len(EXAMPLES)
+    assert (tmp_path / "vector_index" / "meta.json").exists()
+    # Alerts remembered before the index was ready are embedded once it is
+    assert ai_service.alert_vectors.shape[0] == 1
+
+def test_examples_added_during_build_are_indexed(examples, tmp_path, monkeypatch):
+    build = ai_service.VectorIndex.load_or_build
+
+    def slow_build(texts, path):
+        index = build(texts, path)
+        ai_service.add_training_example({"news": "HDFC Bank posts record quarterly profit", "event": "hdfc profit"})
+        return index
+
+    monkeypatch.setattr(ai_service.VectorIndex, "load_or_build", slow_build)
+    index = ai_service.load_vector_index(str(tmp_path / "vector_index"))
+    assert len(index) == len(EXAMPLES) + 1
+
+# --- Routing, hedging and malformed replies ---
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Two OpenRouter keys, two models and no Bytez, with fresh routing state."""
+    from services.key_scheduler import KeyScheduler
+    from services.model_router import ModelRouter
+    monkeypatch.setattr(ai_service, "openrouter_keys", KeyScheduler(["key-1", "key-2"]))
+    monkeypatch.setattr(ai_service, "bytez_keys", KeyScheduler([]))
+    monkeypatch.setattr(ai_service, "model_router", ModelRouter(["fast", "good"]))
+    return ai_service.model_router
+
+def reply(content):
+    return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+def test_malformed_batch_reply_fails_the_model_once(llm, monkeypatch):
+    calls = []
+
+    def handler(request):
+        model = json.loads(request.content)["model"]
+        calls.append(model)
+        return reply("Sorry, I can't help." if model == "fast" else '{"results": [{"index": 0, "impact": "no impact"}]}')
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(ai_service, "get_client", lambda *args: client)
+    parsed, provider = asyncio.run(ai_service.request_completion("prompt", parse=ai_service.parse_json_batch))
+    assert provider == "openrouter" and parsed == [{"index": 0, "impact": "no impact"}]
+    # Not retried on the second key: another key won't make the reply parse
+    assert calls == ["fast", "good"]
+    assert list(llm.outcomes["fast"]) == [0]
+    assert llm.ranked_models() == ["good", "fast"]
+
+@pytest.mark.parametrize("content", ["[]", '{"results": []}', "not json"])
+def test_parse_json_batch_rejects_replies_without_results(content):
+    with pytest.raises(ai_service.MalformedReply):
+        ai_service.parse_json_batch(content)
+
+def test_slow_call_is_hedged_on_the_next_model(llm, monkeypatch):
+    from services import model_router
+    monkeypatch.setattr(model_router, "MIN_HEDGE_DELAY", 0.0)
+    for _ in range(model_router.ROUTER_MIN_SAMPLES):
+        llm.record("fast", 0.05, True)
+    cancelled = []
+
+    async def call(model, ks):
+        try:
+            if model == "fast":
+                await asyncio.sleep(5)
+            return True, model
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+
+    async def run():
+        ks = await ai_service.openrouter_keys.acquire()
+        return await ai_service.hedged_attempt("fast", ks, call)
+
+    assert asyncio.run(run()) == (True, "good")
+    assert cancelled == ["fast"]
+
+def test_no_hedge_without_enough_samples(llm):
+    async def call(model, ks):
+        await asyncio.sleep(0.05)
+        return True, model
+
+    async def run():
+        ks = await ai_service.openrouter_keys.acquire()
+        return await ai_service.hedged_attempt("fast", ks, call)
+
+    assert asyncio.run(run()) == (True, "fast")
+
+# --- Batched Pass 1 ---
+
+def headlines(n):
+    return [{"title": f"Headline {i}", "link": f"https://example.com/{i}", "published": ""} for i in range(n)]
+
+@pytest.fixture
+def batch_replies(monkeypatch):
+    """Batched calls answer every headline except those listed in `skip`; singles always answer."""
+    state = {"skip": set(), "singles": []}
+
+    async def analyze_headline_batch(texts):
+        return [None if i in state["skip"] else {"impact": "no impact"} for i in range(len(texts))]
+
+    async def classify_headline(h):
+        state["singles"].append(h["title"])
+        return {"impact": "no impact", "single": True}
+
+    monkeypatch.setattr(ai_service, "analyze_headline_batch", analyze_headline_batch)
+    monkeypatch.setattr(ai_service, "classify_headline", classify_headline)
+    monkeypatch.setattr(ai_service, "pass1_batch_size", 8)
+    return state
+
+def test_missing_answers_halve_the_batch_size(batch_replies):
+    batch_replies["skip"] = {2, 5}
+    results = asyncio.run(ai_service.classify_batch(headlines(8)))
+    assert ai_service.pass1_batch_size == 4
+    # The unanswered headlines are retried one by one, in place
+    assert batch_replies["singles"] == ["Headline 2", "Headline 5"]
+    assert [bool(r.get("single")) for r in results] == [i in (2, 5) for i in range(8)]
+
+def test_batch_size_never_drops_below_one(batch_replies):
+    batch_replies["skip"] = {0}
+    asyncio.run(ai_service.classify_batch(headlines(2)))
+    assert ai_service.pass1_batch_size == 1
+
+def test_complete_answers_grow_the_batch_size_up_to_the_cap(batch_replies):
+    asyncio.run(ai_service.classify_batch(headlines(8)))
+    assert ai_service.pass1_batch_size == 10
+    # A short tail batch says nothing about whether bigger batches work
+    asyncio.run(ai_service.classify_batch(headlines(3)))
+    assert ai_service.pass1_batch_size == 10
+    for _ in range(10):
+        asyncio.run(ai_service.classify_batch(headlines(ai_service.pass1_batch_size)))
+    assert ai_service.pass1_batch_size == ai_service.PASS1_MAX_BATCH_SIZE
+    assert not batch_replies["singles"]
+
+# --- Pass 1 worker pool ---
+
+def test_pass1_concurrency_counts_only_healthy_keys(llm):
+    keys = ai_service.openrouter_keys
+    assert ai_service.pass1_concurrency() == 2 * keys.max_in_flight
+    keys.record_failure(keys.keys[0])
+    assert ai_service.pass1_concurrency() == keys.max_in_flight
+    keys.record_failure(keys.keys[1])
+    assert ai_service.pass1_concurrency() == 1
+
+def test_pass1_keeps_at_most_the_worker_count_in_flight(monkeypatch):
+    running, peak = 0, 0
+
+    async def classify_batch(batch):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        # Later batches finish first; results must still come out in order
+        await asyncio.sleep(0.01 * (10 - int(batch[0]["title"].split()[-1])))
+        running -= 1
+        return [{"impact": "positive", "event": h["title"]} for h in batch]
+
+    monkeypatch.setattr(ai_service, "classify_batch", classify_batch)
+    monkeypatch.setattr(ai_service, "pass1_concurrency", lambda: 3)
+    monkeypatch.setattr(ai_service, "pass1_batch_size", 1)
+    items = [dict(h, mentions=[{"symbol": "X"}]) for h in headlines(10)]
+    settled = []
+
+    async def run():
+        stream = ai_service.stream_high_impact_events(from_list(items), settle=lambda h, ok: settled.append(ok))
+        return [a["event"] async for a in stream]
+
+    assert asyncio.run(run()) == [h["title"] for h in items]
+    assert peak == 3
+    assert settled == [True] * 10
+
+# --- Pass 2 ---
+
+def test_cached_deep_dive_skips_retrieval_and_the_llm(monkeypatch, tmp_path):
+    from services.llm_cache import LLMCache
+    monkeypatch.setattr(ai_service, "llm_cache", LLMCache(str(tmp_path / "llm_cache.json")))
+    report = {"event": "RBI hikes repo rate", "impact": "negative"}
+    ai_service.llm_cache.put(ai_service.pass2_cache_key("Article text", "RBI hikes repo rate"), report)
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("cache hit should not build a prompt")
+
+    monkeypatch.setattr(ai_service, "format_examples", unexpected)
+    monkeypatch.setattr(ai_service, "format_alert_examples", unexpected)
+    monkeypatch.setattr(ai_service, "request_completion", unexpected)
+    assert asyncio.run(ai_service.perform_deep_analysis("Article text", "RBI hikes repo rate")) == report
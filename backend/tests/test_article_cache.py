@@ -0,0 +1,25 @@
+from services.article_cache import ArticleCache, MIN_DEDUP_CHARS
+
+STORY = "Tata Motors reported a 40% jump in quarterly profit on strong JLR sales. " * 20
+
+def test_syndicated_copies_share_a_hash(tmp_path):
+    cache = ArticleCache(path=str(tmp_path))
+    cache.put("https://a.example/story", STORY)
+    cache.put("https://b.example/copy", "  " + STORY.upper())
+    assert cache.hash_for("https://a.example/story") == cache.hash_for("https://b.example/copy") is not None
+
+def test_short_text_is_not_hashed(tmp_path):
+    cache = ArticleCache(path=str(tmp_path))
+    cache.put("https://a.example/teaser", STORY[:MIN_DEDUP_CHARS - 1])
+    assert cache.get("https://a.example/teaser") is not None
+    assert cache.hash_for("https://a.example/teaser") is None
+
+def test_interstitial_pages_are_not_hashed(tmp_path):
+    cache = ArticleCache(path=str(tmp_path))
+    for n, wall in enumerate([
+        "Subscribe to continue reading. Already a subscriber? Sign in.",
+        "We value your privacy. Accept all cookies to continue.",
+        "Please enable JavaScript. Are you a robot?",
+    ]):
+        cache.put(f"https://a.example/{n}", wall + " " * 10 + "x" * MIN_DEDUP_CHARS)
+        assert cache.hash_for(f"https://a.example/{n}") is None
@@ -0,0 +1,36 @@
+import pytest
+from services.company_resolver import CompanyResolver, normalize_company
+
+NAMES = ["ALICON CASTALLOY LIMITED", "5PAISA CAPITAL LIMITED", "CRAFTSMAN AUTOMATION LIMITED",
+         "TATA CONSULTANCY SERVICES LIMITED", "HINDUSTAN UNILEVER LIMITED", "RELIANCE INDUSTRIES LIMITED",
+         "T T LIMITED"]
+SYMBOLS = {"ALICON CASTALLOY LIMITED": "NSE:ALICON", "5PAISA CAPITAL LIMITED": "NSE:5PAISA",
+           "CRAFTSMAN AUTOMATION LIMITED": "NSE:CRAFTSMAN", "TATA CONSULTANCY SERVICES LIMITED": "NSE:TCS",
+           "HINDUSTAN UNILEVER LIMITED": "NSE:HINDUNILVR", "RELIANCE INDUSTRIES LIMITED": "NSE:RELIANCE",
+           "T T LIMITED": "NSE:TTL"}
+
+@pytest.fixture
+def resolver():
+    return CompanyResolver(NAMES, SYMBOLS, {"HUL": "HINDUSTAN UNILEVER LIMITED"})
+
+@pytest.mark.parametrize("name", ["LIC", "IT", "N/A", "n.a.", "None", "Unknown", "Various", ""])
+def test_short_and_placeholder_names_are_not_fuzzy_matched(resolver, name):
+    assert resolver.resolve(name) == (name, None)
+
+def test_batch_leaves_short_names_alone(resolver):
+    assert resolver.resolve_many(["LIC", "Reliance Industries Ltd", "IT"]) == [
+        ("LIC", None), ("RELIANCE INDUSTRIES LIMITED", "NSE:RELIANCE"), ("IT", None)]
+
+@pytest.mark.parametrize("name, expected", [
+    ("Tata Consultancy Services Ltd.", ("TATA CONSULTANCY SERVICES LIMITED", "NSE:TCS")),
+    ("TCS", ("TATA CONSULTANCY SERVICES LIMITED", "NSE:TCS")),
+    ("HUL", ("HINDUSTAN UNILEVER LIMITED", "NSE:HINDUNILVR")),
+    ("Tata Consultancy Service", ("TATA CONSULTANCY SERVICES LIMITED", "NSE:TCS")),
+    ("Walmart", ("Walmart", None)),
+])
+def test_exact_alias_and_fuzzy_tiers(resolver, name, expected):
+    assert resolver.resolve(name) == expected
+
+def test_normalize_company_keeps_bank_of_india():
+    assert normalize_company("Maruti Suzuki India Ltd") == "maruti suzuki"
+    assert normalize_company("Bank of India") == "bank of india"
@@ -0,0 +1,46 @@
+import json
+from services import database
+from services.database import Database
+
+def test_shared_database_opens_on_first_use_in_the_data_dir(data_dir):
+    assert not (data_dir / "alpha_impact.db").exists()
+    database.db.set_cursor("last_run_time", "2026-02-21T12:00:00")
+    assert (data_dir / "alpha_impact.db").exists()
+    assert database.db.get_cursor("last_run_time") == "2026-02-21T12:00:00"
+
+def test_legacy_files_are_read_from_the_database_dir_only(tmp_path):
+    (tmp_path / "devices.json").write_text(json.dumps(["player-1"]))
+    other = tmp_path / "other"
+    other.mkdir()
+    assert Database(str(other / "test.db")).load_devices() == set()
+    assert (tmp_path / "devices.json").exists()
+    assert Database(str(tmp_path / "test.db")).load_devices() == {"player-1"}
+
+def test_each_legacy_file_is_renamed_after_its_import_commits(tmp_path, monkeypatch):
+    (tmp_path / "devices.json").write_text(json.dumps(["player-1"]))
+    (tmp_path / "processed_links.json").write_text(json.dumps(["https://example.com/a"]))
+    (tmp_path / "cached_alerts.json").write_text(json.dumps([{"id": "a", "probability": 80}]))
+
+    def broken(self, rows):
+        raise RuntimeError("disk full")
+    add_seen_links = Database.add_seen_links
+    monkeypatch.setattr(Database, "add_seen_links", broken)
+    store = Database(str(tmp_path / "test.db"))
+
+    assert store.load_devices() == {"player-1"}
+    assert [a["id"] for a in store.load_alerts()] == ["a"]
+    assert (tmp_path / "devices.json.migrated").exists()
+    assert (tmp_path / "cached_alerts.json.migrated").exists()
+    # The failed import is left in place and retried on the next start
+    assert (tmp_path / "processed_links.json").exists()
+    monkeypatch.setattr(Database, "add_seen_links", add_seen_links)
+    store = Database(str(tmp_path / "test.db"))
+    assert store.has_seen_link("https://example.com/a")
+    assert (tmp_path / "processed_links.json.migrated").exists()
+
+def test_legacy_seen_link_logs_are_imported(tmp_path):
+    (tmp_path / "seen_links").mkdir()
+    (tmp_path / "seen_links" / "20000.log").write_text("https://example.com/a\nhttps://example.com/b\n")
+    store = Database(str(tmp_path / "test.db"))
+    assert store.has_seen_link("https://example.com/b")
+    assert not (tmp_path / "seen_links").exists()
@@ -0,0 +1,54 @@
+import asyncio
+import httpx
+import pytest
+from services import feed_cache
+from services.checkpoint import Checkpoint
+from services.feed_cache import FeedCache
+
+URL = "https://example.com/feed.xml"
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(feed_cache, "DATA_DIR", str(tmp_path))
+
+def client_for(body):
+    return httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, content=body, headers={"ETag": '"v1"'})))
+
+def poll(cache, body):
+    async def run():
+        async with client_for(body) as client:
+            return (await cache.conditional_get(client, URL))[1]
+    return asyncio.run(run())
+
+def test_validators_are_staged_until_the_checkpoint_commits():
+    cache = FeedCache("rss")
+    checkpoint = Checkpoint()
+    with checkpoint.active():
+        assert poll(cache, b"<rss/>") is True
+    # Not committed (e.g. the analysis failed): the same body still counts as changed
+    assert cache.validators == {}
+    assert poll(cache, b"<rss/>") is True
+
+    checkpoint = Checkpoint()
+    with checkpoint.active():
+        poll(cache, b"<rss/>")
+    checkpoint.commit()
+    assert cache.conditional_headers(URL) == {"If-None-Match": '"v1"'}
+    assert FeedCache("rss").validators == cache.validators
+    with Checkpoint().active():
+        assert poll(cache, b"<rss/>") is False
+
+def test_namespaces_do_not_share_validators():
+    rss, collector = FeedCache("rss"), FeedCache("collector")
+    poll(rss, b"<rss/>")
+    assert poll(collector, b"<rss/>") is True
+    assert rss.path != collector.path
+
+def test_merged_checkpoints_commit_every_staged_write():
+    cache = FeedCache("rss")
+    first, second = Checkpoint(), Checkpoint()
+    with first.active():
+        poll(cache, b"<rss/>")
+    first.merge(second).commit()
+    assert URL in cache.validators
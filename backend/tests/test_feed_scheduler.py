@@ -0,0 +1,77 @@
+import pytest
+from services import feed_scheduler
+from services.feed_scheduler import FeedScheduler, DEFAULT_POLL_INTERVAL, LEGACY_SWEEP_INTERVAL
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch):
+    monkeypatch.setattr(feed_scheduler, "SCHEDULE_FILE", str(tmp_path / "feed_schedule.json"))
+    return FeedScheduler()
+
+async def nothing():
+    return []
+
+def test_budget_counts_requests_not_polls(scheduler):
+    scheduler.add_feed("rss", nothing)
+    scheduler.add_feed("reddit", nothing, cost=6)
+    assert scheduler._budget() == 7 * 3600 / LEGACY_SWEEP_INTERVAL
+
+def test_expensive_job_is_stretched_harder_than_a_cheap_one(scheduler):
+    scheduler.add_feed("rss", nothing)
+    scheduler.add_feed("reddit", nothing, cost=6)
+    for key in scheduler.feeds:
+        scheduler.feeds[key]["interval"] = 600
+    # 7 requests every 10 minutes against a budget of 7 every 2 hours
+    assert scheduler.effective_interval("reddit") == pytest.approx(LEGACY_SWEEP_INTERVAL)
+
+def test_headlines_without_publish_times_keep_the_interval(scheduler):
+    scheduler.add_feed("hackernews", nothing)
+    scheduler.record_poll("hackernews", [{"title": "a", "published_ts": None}], now=0)
+    assert scheduler.feeds["hackernews"]["interval"] == DEFAULT_POLL_INTERVAL
+
+def test_dated_headline_shrinks_and_empty_poll_backs_off(scheduler):
+    scheduler.add_feed("feed", nothing)
+    scheduler.record_poll("feed", [{"published_ts": 1000.0}], now=1000)
+    assert scheduler.feeds["feed"]["interval"] < DEFAULT_POLL_INTERVAL
+    interval = scheduler.feeds["feed"]["interval"]
+    scheduler.record_poll("feed", [], now=2000)
+    assert scheduler.feeds["feed"]["interval"] > interval
+
+def test_cadence_is_learned_from_one_new_entry_per_poll(scheduler):
+    scheduler.add_feed("feed", nothing)
+    # An entry every 20 minutes, but each poll only sees the newest one
+    for n in range(1, 30):
+        scheduler.record_poll("feed", [{"published_ts": n * 1200.0}], now=n * 1200.0 + 1)
+    assert scheduler.feeds["feed"]["interval"] == pytest.approx(600, rel=0.05)
+
+def test_quiet_source_stretches_past_its_learned_cadence(scheduler):
+    scheduler.add_feed("feed", nothing)
+    scheduler.feeds["feed"]["recent"] = [3000.0, 2000.0, 1000.0]
+    scheduler.feeds["feed"]["interval"] = 500
+    scheduler.record_poll("feed", [], now=20000.0)
+    assert scheduler.feeds["feed"]["interval"] > 500
+
+def test_timestamp_history_survives_a_restart(scheduler, tmp_path):
+    scheduler.add_feed("feed", nothing)
+    scheduler.record_poll("feed", [{"published_ts": 1000.0}, {"published_ts": 400.0}], now=1001)
+    scheduler.save_schedule()
+    restarted = FeedScheduler()
+    restarted.add_feed("feed", nothing)
+    assert restarted.feeds["feed"]["recent"] == [1000.0, 400.0]
+    assert restarted.feeds["feed"]["interval"] == scheduler.feeds["feed"]["interval"]
+
+def test_schedule_files_with_only_intervals_still_load(scheduler, tmp_path):
+    (tmp_path / "feed_schedule.json").write_text('{"feed": 900}')
+    restarted = FeedScheduler()
+    restarted.add_feed("feed", nothing)
+    assert restarted.feeds["feed"]["interval"] == 900
+    assert restarted.feeds["feed"]["recent"] == []
+
+def test_save_creates_the_data_dir_and_replaces_atomically(tmp_path, monkeypatch):
+    path = tmp_path / "data" / "feed_schedule.json"
+    monkeypatch.setattr(feed_scheduler, "SCHEDULE_FILE", str(path))
+    scheduler = FeedScheduler()
+    scheduler.add_feed("feed", nothing)
+    scheduler.save_schedule()
+    assert path.exists()
+    assert not (tmp_path / "data" / "feed_schedule.json.tmp").exists()
+    assert FeedScheduler().learned["feed"]["interval"] == DEFAULT_POLL_INTERVAL
@@ -0,0 +1,49 @@
+import asyncio
+import time
+import httpx
+import pytest
+from services import hacker_news_service
+from services.database import Database
+from services.source_cursors import SourceCursors
+
+def story(item_id):
+    return {"id": item_id, "type": "story", "title": f"Story {item_id}",
+            "url": f"https://example.com/{item_id}", "time": int(time.time())}
+
+@pytest.fixture
+def hn(tmp_path, monkeypatch):
+    api = {"top": [], "items": {}, "requests": []}
+
+    def handler(request):
+        path = request.url.path
+        api["requests"].append(path)
+        if path.endswith("/topstories.json"):
+            return httpx.Response(200, json=api["top"])
+        item = api["items"].get(int(path.rsplit("/", 1)[1].split(".")[0]))
+        return httpx.Response(200, content=b"null") if item is None else httpx.Response(200, json=item)
+
+    db = Database(str(tmp_path / "test.db"))
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(hacker_news_service, "get_client", lambda *args: client)
+    monkeypatch.setattr(hacker_news_service, "db", db)
+    monkeypatch.setattr(hacker_news_service, "source_cursors", SourceCursors(db))
+    return api
+
+def fetch():
+    return [h["title"] for h in asyncio.run(hacker_news_service.fetch_hacker_news_headlines())]
+
+def test_only_new_top_stories_are_fetched_and_returned(hn):
+    hn["top"] = [1, 2]
+    hn["items"] = {1: story(1), 2: story(2)}
+    assert fetch() == ["Story 1", "Story 2"]
+    hn["top"] = [3, 1, 2]
+    hn["items"][3] = story(3)
+    hn["requests"].clear()
+    assert fetch() == ["Story 3"]
+    assert hn["requests"] == ["/v0/topstories.json", "/v0/item/3.json"]
+
+def test_story_that_is_briefly_null_is_picked_up_next_poll(hn):
+    hn["top"] = [1]
+    assert fetch() == []
+    hn["items"][1] = story(1)
+    assert fetch() == ["Story 1"]
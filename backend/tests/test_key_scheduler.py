@@ -0,0 +1,126 @@
+import time
+import asyncio
+import email.utils
+import pytest
+from services import key_scheduler
+from services.key_scheduler import KeyScheduler, parse_retry_after, BASE_COOLDOWN
+
+NOW = 1_700_000_000.0
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Frozen time.time() for the scheduler; advance by assigning clock.now."""
+    class Clock:
+        now = NOW
+    monkeypatch.setattr(key_scheduler.time, "time", lambda: Clock.now)
+    return Clock
+
+# --- Retry-After / X-RateLimit-Reset ---
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"Retry-After": "12"}, 12.0),
+    ({"Retry-After": "-5"}, 0.0),
+    ({"Retry-After": email.utils.formatdate(NOW + 90, usegmt=True)}, 90.0),
+    ({"X-RateLimit-Reset": str(int((NOW + 30) * 1000))}, 30.0),   # epoch ms
+    ({"X-RateLimit-Reset": str(NOW + 45)}, 45.0),                 # epoch s
+    ({"X-RateLimit-Reset": "20"}, 20.0),                          # delta s
+    ({"X-RateLimit-Reset": str(NOW - 60)}, 0.0),                  # already passed
+    ({"Retry-After": "7", "X-RateLimit-Reset": "20"}, 7.0),       # Retry-After wins
+    ({"Retry-After": "soon", "X-RateLimit-Reset": "20"}, 20.0),
+])
+def test_parse_retry_after(headers, expected):
+    assert parse_retry_after(headers, now=NOW) == pytest.approx(expected)
+
+@pytest.mark.parametrize("headers", [{}, {"X-RateLimit-Reset": "later"}])
+def test_parse_retry_after_without_a_usable_header(headers):
+    assert parse_retry_after(headers, now=NOW) is None
+
+# --- Token bucket ---
+
+def test_empty_bucket_waits_for_the_next_token(clock):
+    scheduler = KeyScheduler(["key-1"], rate_per_minute=60, burst=2, max_in_flight=10)
+    ks = scheduler.keys[0]
+    assert scheduler._ready_in(ks, False, clock.now) == 0.0
+    ks.tokens = 0.25
+    assert scheduler._ready_in(ks, False, clock.now) == pytest.approx(0.75)
+    # Refill is time-based and capped at the burst size
+    assert scheduler._ready_in(ks, False, clock.now + 1.0) == 0.0
+    assert scheduler._ready_in(ks, False, clock.now + 100.0) == 0.0
+    assert ks.tokens == 2
+
+def test_acquire_waits_for_a_refill_and_gives_up_past_max_wait():
+    async def run():
+        # 600/min = one token every 0.1 s
+        scheduler = KeyScheduler(["key-1"], rate_per_minute=600, burst=1, max_in_flight=10)
+        first = await scheduler.acquire()
+        start = time.monotonic()
+        second = await scheduler.acquire(max_wait=1.0)
+        waited = time.monotonic() - start
+        scheduler.keys[0].tokens = 0.0
+        third = await scheduler.acquire(max_wait=0.01)
+        return first, second, waited, third
+    first, second, waited, third = asyncio.run(run())
+    assert first is not None and second is first
+    assert 0.05 < waited < 0.5
+    assert third is None
+
+def test_acquire_prefers_the_least_loaded_key(clock):
+    async def run():
+        scheduler = KeyScheduler(["key-1", "key-2"], burst=5)
+        return [(await scheduler.acquire()).key for _ in range(4)]
+    assert asyncio.run(run()) == ["key-1", "key-2", "key-1", "key-2"]
+
+def test_in_flight_cap(clock):
+    async def run():
+        scheduler = KeyScheduler(["key-1"], burst=5, max_in_flight=2)
+        leases = [await scheduler.acquire(max_wait=0) for _ in range(3)]
+        await scheduler.release(leases[0])
+        return leases, await scheduler.acquire(max_wait=0)
+    leases, after_release = asyncio.run(run())
+    assert leases[0] and leases[1] and leases[2] is None
+    assert after_release is leases[0]
+
+# --- Circuit breaker ---
+
+def test_breaker_open_half_open_closed(clock):
+    scheduler = KeyScheduler(["key-1"], burst=5)
+    ks = scheduler.keys[0]
+    scheduler.record_rate_limit(ks, {"Retry-After": "60"})
+    assert ks.state == "open"
+    assert scheduler._ready_in(ks, False, clock.now + 10) == pytest.approx(50)
+    assert scheduler.usable_count() == 0
+
+    # Cooldown over: one trial request is let through, others wait on it
+    clock.now += 61
+    assert scheduler._ready_in(ks, False, clock.now) == 0.0
+    assert ks.state == "half_open"
+    ks.in_flight = 1
+    assert scheduler._ready_in(ks, False, clock.now) == 1.0
+
+    scheduler.record_success(ks)
+    assert ks.state == "closed" and ks.failures == 0
+
+def test_failed_trial_reopens_with_a_longer_cooldown(clock):
+    scheduler = KeyScheduler(["key-1"])
+    ks = scheduler.keys[0]
+    scheduler.record_failure(ks)
+    assert ks.open_until == pytest.approx(clock.now + BASE_COOLDOWN)
+    clock.now = ks.open_until
+    scheduler._ready_in(ks, False, clock.now)
+    assert ks.state == "half_open"
+    scheduler.record_failure(ks)
+    assert ks.state == "open"
+    assert ks.open_until == pytest.approx(clock.now + 2 * BASE_COOLDOWN)
+
+def test_exhausted_quota_pauses_a_key_until_the_advertised_reset(clock):
+    scheduler = KeyScheduler(["key-1"])
+    ks = scheduler.keys[0]
+    scheduler.record_success(ks, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int((clock.now + 40) * 1000))})
+    assert ks.state == "closed"
+    assert scheduler._ready_in(ks, False, clock.now) == pytest.approx(40)
+
+def test_depleted_key_is_skipped_for_paid_models_only(clock):
+    scheduler = KeyScheduler(["key-1"])
+    scheduler.record_depleted(scheduler.keys[0])
+    assert scheduler.usable_count(paid_model=True) == 0
+    assert scheduler.usable_count() == 1
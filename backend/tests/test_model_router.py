@@ -0,0 +1,46 @@
+import pytest
+from services import model_router
+from services.model_router import ModelRouter, ROUTER_MIN_SAMPLES, MIN_HEDGE_DELAY, PRIOR_LATENCY
+
+def test_no_hedge_below_the_minimum_sample_count():
+    router = ModelRouter(["a"])
+    for _ in range(ROUTER_MIN_SAMPLES - 1):
+        router.record("a", 30.0, True)
+    assert router.quantile("a", 0.95) is None
+    assert router.hedge_delay("a") is None
+    router.record("a", 30.0, True)
+    assert router.hedge_delay("a") == 30.0
+
+def test_failures_do_not_count_as_latency_samples():
+    router = ModelRouter(["a"])
+    for _ in range(ROUTER_MIN_SAMPLES):
+        router.record("a", 1.0, False)
+    assert router.hedge_delay("a") is None
+
+def test_hedge_delay_is_the_p95_latency():
+    router = ModelRouter(["a"])
+    for latency in range(1, 21):   # 1..20 s
+        router.record("a", float(latency), True)
+    assert router.quantile("a", 0.95) == 19.0
+    assert router.hedge_delay("a") == 19.0
+
+def test_hedge_delay_has_a_floor(monkeypatch):
+    router = ModelRouter(["a"])
+    for _ in range(ROUTER_MIN_SAMPLES):
+        router.record("a", 0.1, True)
+    assert router.hedge_delay("a") == MIN_HEDGE_DELAY
+    monkeypatch.setattr(model_router, "MIN_HEDGE_DELAY", 0.0)
+    assert router.hedge_delay("a") == pytest.approx(0.1)
+
+def test_models_rank_by_expected_time_to_a_good_answer():
+    router = ModelRouter(["slow", "flaky", "fast"])
+    for _ in range(10):
+        router.record("slow", 8.0, True)
+        router.record("fast", 2.0, True)
+        router.record("flaky", 2.0, False)
+    router.record("flaky", 2.0, True)
+    # flaky: 2 s / (2/13 success) = 13 s; unmeasured models use the prior
+    assert router.ranked_models() == ["fast", "slow", "flaky"]
+    assert router.hedge_model("fast") == "slow"
+    assert ModelRouter(["x", "y"]).ranked_models() == ["x", "y"]
+    assert ModelRouter(["x"]).expected_latency("x") == pytest.approx(PRIOR_LATENCY / 0.5)
@@ -0,0 +1,16 @@
+import json
+from services import prefilter
+
+def test_verdict_log_keeps_only_the_newest_verdicts(tmp_path, monkeypatch):
+    log_file = tmp_path / "llm_verdicts.jsonl"
+    log_file.write_text("".join(json.dumps({"news": f"old {n}", "impact": "no impact"}) + "\n" for n in range(5)))
+    monkeypatch.setattr(prefilter, "VERDICT_LOG_FILE", str(log_file))
+    monkeypatch.setattr(prefilter, "VERDICT_LOG_MAX", 10)
+    monkeypatch.setattr(prefilter, "_verdict_lines", None)
+    for n in range(30):
+        prefilter.log_verdict(f"headline {n}", {"impact": "Positive"})
+    rows = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert len(rows) <= 11
+    assert rows[-1]["news"] == "headline 29"
+    assert all(r["news"].startswith("headline") for r in rows)
+    assert rows[-1]["impact"] == "positive"
@@ -0,0 +1,75 @@
+import time
+import asyncio
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from services import scraper_service
+
+@pytest.fixture
+def pool(monkeypatch):
+    """One worker thread standing in for the extractor process pool, with a short timeout."""
+    monkeypatch.setattr(scraper_service, "ProcessPoolExecutor", lambda max_workers, mp_context: ThreadPoolExecutor(max_workers))
+    monkeypatch.setattr(scraper_service, "EXTRACT_WORKERS", 1)
+    monkeypatch.setattr(scraper_service, "EXTRACT_TIMEOUT", 0.3)
+    scraper_service.shutdown_executor()
+    yield
+    scraper_service.shutdown_executor()
+
+def test_timeout_does_not_count_time_spent_waiting_for_a_worker(pool, monkeypatch):
+    def extract(html):
+        time.sleep(0.2)
+        return html.upper()
+    monkeypatch.setattr(scraper_service, "_extract", extract)
+
+    async def run():
+        # The third page waits 0.4 s for the worker, longer than the timeout
+        return await asyncio.gather(*(scraper_service.extract_text(page) for page in ["a", "b", "c"]))
+
+    assert asyncio.run(run()) == ["A", "B", "C"]
+
+def test_stuck_worker_gets_the_pool_recycled(pool, monkeypatch):
+    unblock = threading.Event()
+
+    def extract(html):
+        if html == "pathological":
+            unblock.wait(5)
+        return html
+
+    monkeypatch.setattr(scraper_service, "_extract", extract)
+
+    async def run():
+        stuck = await scraper_service.extract_text("pathological")
+        executor = scraper_service._executor
+        after = await scraper_service.extract_text("fine")
+        return stuck, executor, after
+
+    try:
+        stuck, executor, after = asyncio.run(run())
+    finally:
+        unblock.set()
+    assert stuck is None and executor is None
+    assert after == "fine"
+    assert not scraper_service._stuck
+
+def test_timed_out_page_keeps_its_worker_until_it_finishes(pool, monkeypatch):
+    monkeypatch.setattr(scraper_service, "EXTRACT_WORKERS", 2)
+    unblock = threading.Event()
+
+    def extract(html):
+        if html == "slow":
+            unblock.wait(5)
+        return html
+
+    monkeypatch.setattr(scraper_service, "_extract", extract)
+
+    async def run():
+        assert await scraper_service.extract_text("slow") is None
+        held = len(scraper_service._stuck)
+        unblock.set()
+        await asyncio.sleep(0.1)
+        return held, len(scraper_service._stuck), await scraper_service.extract_text("fine")
+
+    try:
+        assert asyncio.run(run()) == (1, 0, "fine")
+    finally:
+        unblock.set()
@@ -0,0 +1,44 @@
+import pytest
+from services import seen_links
+from services.database import Database
+from services.seen_links import BloomFilter, SeenLinkStore, BUCKET_SECONDS
+
+@pytest.fixture
+def database(tmp_path):
+    return Database(str(tmp_path / "test.db"))
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    links = [f"https://example.com/{n}" for n in range(1000)]
+    for link in links:
+        bloom.add(link)
+    assert all(link in bloom for link in links)
+    false_positives = sum(f"https://other.example/{n}" in bloom for n in range(10000))
+    assert false_positives < 300
+
+def test_links_survive_a_restart_only_after_flush(database):
+    store = SeenLinkStore(database)
+    store.add("https://example.com/a")
+    assert "https://example.com/a" in store
+    assert "https://example.com/a" not in SeenLinkStore(database)
+    store.flush()
+    assert "https://example.com/a" in SeenLinkStore(database)
+    assert len(SeenLinkStore(database)) == 1
+
+def test_filter_false_positive_is_confirmed_against_the_table(database):
+    store = SeenLinkStore(database)
+    store.filters[store.bucket()] = BloomFilter(capacity=1, error_rate=0.5)
+    store.filters[store.bucket()].bits[:] = b"\xff" * len(store.filters[store.bucket()].bits)
+    assert "https://example.com/never-added" not in store
+
+def test_buckets_outside_retention_are_dropped(database, monkeypatch):
+    now = 1_800_000_000.0
+    monkeypatch.setattr(seen_links.time, "time", lambda: now)
+    store = SeenLinkStore(database, retention_days=2)
+    store.add("https://example.com/old")
+    store.flush()
+    now += 2 * BUCKET_SECONDS
+    store.flush()
+    assert "https://example.com/old" not in store
+    assert not database.has_seen_link("https://example.com/old")
+    assert "https://example.com/old" not in SeenLinkStore(database, retention_days=2)
@@ -0,0 +1,49 @@
+import asyncio
+import time
+import httpx
+import pytest
+from services import social_media_service
+from services.database import Database
+from services.source_cursors import SourceCursors
+
+def post(name, age):
+    return {"data": {"name": name, "title": f"Post {name}", "url": f"https://example.com/{name}",
+                     "created_utc": time.time() - age}}
+
+@pytest.fixture
+def reddit(tmp_path, monkeypatch):
+    listing = {"posts": [], "requests": []}
+
+    def handler(request):
+        before = request.url.params.get("before")
+        listing["requests"].append(before)
+        # Reddit answers `before=<deleted post>` with an empty page
+        posts = [] if before == "t3_deleted" else listing["posts"]
+        return httpx.Response(200, json={"data": {"children": posts}})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    cursors = SourceCursors(Database(str(tmp_path / "test.db")))
+    monkeypatch.setattr(social_media_service, "get_client", lambda *args: client)
+    monkeypatch.setattr(social_media_service, "source_cursors", cursors)
+    monkeypatch.setattr(social_media_service, "SUBREDDITS", ["stocks"])
+    no_wait = asyncio.sleep
+    monkeypatch.setattr(social_media_service.asyncio, "sleep", lambda _: no_wait(0))
+    return listing, cursors
+
+def fetch():
+    return [h["title"] for h in asyncio.run(social_media_service.fetch_social_media_headlines())]
+
+def test_deleted_cursor_post_falls_back_to_the_newest_page(reddit):
+    listing, cursors = reddit
+    cursors.update("reddit:stocks", before="t3_deleted", ts=time.time() - 3600)
+    listing["posts"] = [post("t3_new", 60), post("t3_old", 7200)]
+    assert fetch() == ["r/stocks: Post t3_new"]
+    assert listing["requests"] == ["t3_deleted", None]
+    assert cursors.get("reddit:stocks")["before"] == "t3_new"
+
+def test_cursor_post_is_used_as_before(reddit):
+    listing, cursors = reddit
+    listing["posts"] = [post("t3_b", 0), post("t3_a", 60)]
+    assert fetch() == ["r/stocks: Post t3_b", "r/stocks: Post t3_a"]
+    fetch()
+    assert listing["requests"][-1] == "t3_b"
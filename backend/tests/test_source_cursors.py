@@ -0,0 +1,65 @@
+import time
+import pytest
+from services.database import Database
+from services.checkpoint import Checkpoint
+from services.source_cursors import SourceCursors, CURSOR_GRACE
+
+@pytest.fixture
+def cursors(tmp_path):
+    return SourceCursors(Database(str(tmp_path / "test.db")))
+
+def entries(*ages):
+    now = time.time()
+    return [{"id": n, "ts": now - age} for n, age in enumerate(ages)]
+
+def take(cursors, items):
+    return [entry["id"] for entry, _ in cursors.take_newer("feed", items, lambda e: e["ts"])]
+
+def test_first_poll_keeps_everything_and_learns_order(cursors):
+    assert take(cursors, entries(0, 60, 120)) == [0, 1, 2]
+    assert cursors.get("feed")["ordered"] is True
+
+def test_ordered_feed_stops_at_first_stale_entry(cursors):
+    take(cursors, entries(*range(0, 600, 60)))
+    seen = []
+    stale = entries(*[-60] + [7200 + 60 * n for n in range(20)])
+    cursors.take_newer("feed", stale, lambda e: seen.append(e["id"]) or e["ts"])
+    assert len(seen) < len(stale)
+
+def test_stale_pinned_top_item_does_not_hide_newer_entries(cursors):
+    take(cursors, entries(600, 660, 720))
+    assert cursors.get("feed")["ordered"] is True
+    # A day-old pinned item sits above entries newer than the watermark
+    for _ in range(3):
+        assert take(cursors, entries(86400, 0, 30, 60)) == [1, 2, 3]
+    assert cursors.get("feed")["ordered"] is False
+
+def test_entries_within_grace_and_undated_are_kept(cursors):
+    take(cursors, entries(0))
+    items = entries(CURSOR_GRACE / 2, 2 * CURSOR_GRACE) + [{"id": 2, "ts": None}]
+    assert take(cursors, items) == [0, 2]
+
+def test_save_persists_only_moved_cursors(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    cursors = SourceCursors(db)
+    take(cursors, entries(0, 60))
+    cursors.save()
+    assert cursors.dirty == set()
+    assert SourceCursors(db).get("feed")["ts"] == cursors.get("feed")["ts"]
+
+def test_moves_wait_for_the_checkpoint(cursors):
+    checkpoint = Checkpoint()
+    with checkpoint.active():
+        assert take(cursors, entries(0, 60)) == [0, 1]
+    # Analysis never finished: the same entries are offered again
+    assert cursors.get("feed") == {}
+    assert take(cursors, entries(0, 60)) == [0, 1]
+
+def test_an_older_checkpoint_does_not_roll_a_cursor_back(cursors):
+    older = Checkpoint()
+    with older.active():
+        take(cursors, entries(600))
+    take(cursors, entries(0))
+    newest = cursors.get("feed")["ts"]
+    older.commit()
+    assert cursors.get("feed")["ts"] == newest
@@ -0,0 +1,60 @@
+import pytest
+from services.story_clusters import StoryClusters
+
+FIRST = "Reliance Industries shares surge 5% after record quarterly profit beats estimates"
+COPY = "Reliance Industries shares surge 5% after record quarterly profit beats street estimates"
+
+@pytest.fixture
+def clusters(tmp_path):
+    return StoryClusters(path=str(tmp_path / "story_clusters.json"))
+
+def test_near_duplicate_of_an_analyzed_story_is_suppressed(clusters):
+    cid, is_new = clusters.assign(FIRST, "https://a.example/1")
+    clusters.settle(cid, True)
+    assert clusters.assign(COPY, "https://b.example/2") == (cid, False)
+    assert clusters.links(cid) == ["https://a.example/1", "https://b.example/2"]
+
+def test_near_duplicate_waits_while_the_first_is_in_pass1(clusters):
+    cid, _ = clusters.assign(FIRST, "https://a.example/1")
+    assert clusters.assign(COPY, "https://b.example/2") == (cid, False)
+
+def test_next_member_gets_through_when_pass1_failed(clusters):
+    cid, _ = clusters.assign(FIRST, "https://a.example/1")
+    clusters.settle(cid, False)
+    assert clusters.assign(COPY, "https://b.example/2") == (cid, True)
+    clusters.settle(cid, True)
+    assert clusters.assign(COPY + " today", "https://c.example/3") == (cid, False)
+
+def test_story_left_in_flight_by_a_crashed_run_is_retried(clusters):
+    cid, _ = clusters.assign(FIRST, "https://a.example/1")
+    clusters.begin_cycle()
+    assert clusters.assign(COPY, "https://b.example/2") == (cid, True)
+
+def test_analyzed_flag_is_saved(clusters, tmp_path):
+    cid, _ = clusters.assign(FIRST, "https://a.example/1")
+    clusters.settle(cid, True)
+    clusters.save()
+    reloaded = StoryClusters(path=str(tmp_path / "story_clusters.json"))
+    assert reloaded.assign(COPY, "https://b.example/2") == (cid, False)
+
+@pytest.mark.parametrize("first, second", [
+    ("US Fed raises interest rates by 25 bps", "US Fed cuts interest rates by 25 bps"),
+    ("RBI keeps repo rate unchanged at 6.5%", "RBI hikes repo rate to 6.5%"),
+    ("Rupee falls to record low", "Rupee rises from record low"),
+    ("SEBI bans 10 entities", "SEBI fines 10 entities"),
+    ("Sensex falls 500 points", "Nifty falls 500 points"),
+])
+def test_headlines_about_different_events_are_not_merged(clusters, first, second):
+    cid, _ = clusters.assign(first, "https://a.example/1")
+    clusters.settle(cid, True)
+    assert clusters.assign(second, "https://b.example/2")[1] is True
+
+def test_short_headlines_merge_when_only_filler_differs(clusters):
+    cid, _ = clusters.assign("Sensex falls 500 points", "https://a.example/1")
+    clusters.settle(cid, True)
+    assert clusters.assign("Sensex falls 500 points today", "https://b.example/2") == (cid, False)
+
+def test_same_direction_in_other_words_still_merges(clusters):
+    cid, _ = clusters.assign(FIRST, "https://a.example/1")
+    clusters.settle(cid, True)
+    assert clusters.assign(FIRST.replace("surge", "jump"), "https://b.example/2") == (cid, False)
@@ -0,0 +1,80 @@
+import time
+import email.utils
+import datetime
+import pytest
+from dateutil import parser as date_parser
+from services.timestamps import parse_timestamp, struct_to_epoch, epoch_to_iso
+
+def rfc2822(value):
+    return float(email.utils.mktime_tz(email.utils.parsedate_tz(value)))
+
+def iso(value, default_zone=datetime.timezone.utc):
+    dt = date_parser.parse(value)
+    return dt.replace(tzinfo=dt.tzinfo or default_zone).timestamp()
+
+@pytest.mark.parametrize("value", [
+    "Sat, 21 Feb 2026 12:34:56 +0000",
+    "Sat, 21 Feb 2026 12:34:56 +0530",
+    "Sat, 21 Feb 2026 12:34:56 -0400",
+    "Sat, 21 Feb 2026 12:34:56 GMT",
+    "Sat, 21 Feb 2026 12:34:56 UT",
+    "Sat, 21 Feb 2026 12:34:56 EST",
+    "Sat, 21 Feb 2026 12:34:56 PDT",
+    "Sun, 1 Mar 2026 02:04:05 +0100",
+    "21 Feb 2026 12:34 +0100",
+    "Sat,21 Feb 2026 12:34:56 -0000",
+])
+def test_rfc2822_matches_email_utils(value):
+    assert parse_timestamp(value) == rfc2822(value)
+
+def test_ist_is_india_standard_time():
+    assert parse_timestamp("Sat, 21 Feb 2026 12:34:56 IST") == rfc2822("Sat, 21 Feb 2026 12:34:56 +0530")
+
+@pytest.mark.parametrize("value", [
+    "2026-02-21T12:34:56Z",
+    "2026-02-21T12:34:56z",
+    "2026-02-21T12:34:56+05:30",
+    "2026-02-21T12:34:56-0400",
+    "2026-02-21T12:34:56+00:00",
+    "2026-02-21T12:34",
+    "2026-02-21T12:34:56",
+    "2026-02-21 12:34:56",            # NewsData, UTC without an offset
+    "2026-02-21 12:34:56 +0200",
+])
+def test_iso_matches_dateutil(value):
+    assert parse_timestamp(value) == iso(value)
+
+def test_iso_fractional_seconds_are_truncated():
+    assert parse_timestamp("2026-02-21T12:34:56.987Z") == iso("2026-02-21T12:34:56Z")
+
+@pytest.mark.parametrize("value", [
+    "February 21, 2026 12:34 PM",
+    "2026-02-21",
+    "21/02/2026 12:34",
+])
+def test_other_formats_fall_back_to_dateutil_as_utc(value):
+    assert parse_timestamp(value) == iso(value)
+
+@pytest.mark.parametrize("value", [
+    None, "", "   ", "not a date", "tomorrow", "12345", "2026-13-45T99:99:99Z",
+    "Sat, 32 Feb 2026 12:00:00 +0000", "Sat, 21 Feb 2026 25:00:00 +0000", "2026-02-30T10:00:00Z",
+])
+def test_garbage_is_none(value):
+    assert parse_timestamp(value) is None
+
+def test_unknown_zone_name_is_utc_regardless_of_local_time(monkeypatch):
+    monkeypatch.setenv("TZ", "Asia/Tokyo")
+    time.tzset()
+    parse_timestamp.cache_clear()
+    try:
+        assert parse_timestamp("Sat, 21 Feb 2026 12:34:56 XYZ") == rfc2822("Sat, 21 Feb 2026 12:34:56 +0000")
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+        parse_timestamp.cache_clear()
+
+def test_struct_and_iso_helpers_round_trip():
+    ts = parse_timestamp("2026-02-21T12:34:56Z")
+    assert struct_to_epoch(time.gmtime(ts)) == ts
+    assert epoch_to_iso(ts) == "2026-02-21T12:34:56Z"
+    assert struct_to_epoch(None) is None
@@ -0,0 +1,13 @@
+import os
+import sys
+
+# Retrains the local Pass 1 pre-filter from training_data.jsonl and the logged
+# LLM verdicts. Restart the backend afterwards to load the new model.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.prefilter import train
+
+if __name__ == "__main__":
+    report = train()
+    if report is None:
+        sys.exit(1)